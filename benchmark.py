@@ -0,0 +1,617 @@
+"""
+性能基准测试脚本
+
+用法:
+    python benchmark.py scan [--items 20000] [--workers 16] [--library Eagle库路径]
+    python benchmark.py index [--items 100000] [--changed 50]
+    python benchmark.py memory [--sizes 10000,100000,1000000]
+    python benchmark.py sort [--items 100000]
+    python benchmark.py plan [--items 1000000]
+    python benchmark.py journal [--items 20000]
+    python benchmark.py backup [--items 20000]
+    python benchmark.py apply [--items 2000] [--latency 2] [--workers 4,8,16]
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import builtins
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+from eagle_scanner import (scan_eagle_library, list_info_folders, iter_eagle_items, iter_batches,
+                           read_library_mtimes)
+from eagle_index import EagleIndex
+from eagle_store import EagleItem, EagleItemStore
+from rename_plan import build_plan
+from eagle_journal import JournalEntry, RenameJournal, apply_entry, iter_apply_entries, renamed_actual_file
+from eagle_backup import write_batch_backup, restore_batch_backup
+
+
+def make_synthetic_library(root, count):
+    """
+    生成一个用于测试的Eagle库
+
+    Args:
+        root: 库文件夹路径
+        count: 文件数量
+    """
+    images_folder = os.path.join(root, "images")
+    os.makedirs(images_folder, exist_ok=True)
+    mtimes = {}
+    for i in range(count):
+        file_id = f"K{i:012d}"
+        folder_path = os.path.join(images_folder, f"{file_id}.info")
+        os.makedirs(folder_path, exist_ok=True)
+        name = f"{i // 50 % 100:02d}薛芳菲沈玉容旧家{i % 50:02d}"
+        metadata = {
+            "id": file_id,
+            "name": name,
+            "size": 1024,
+            "btime": 1700000000000,
+            "mtime": 1700000000000,
+            "ext": "mp4",
+            "tags": ["测试", "benchmark"],
+            "folders": [],
+            "isDeleted": False,
+            "url": "",
+            "annotation": "",
+            "modificationTime": 1700000000000,
+            "palettes": [{"color": [12, 34, 56], "ratio": 40}] * 5,
+            "lastModified": 1700000000000
+        }
+        with open(os.path.join(folder_path, "metadata.json"), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        open(os.path.join(folder_path, f"{name}.mp4"), 'wb').close()
+        open(os.path.join(folder_path, f"{name}_thumbnail.png"), 'wb').close()
+        mtimes[file_id] = 1700000000000
+
+    # Eagle在库根目录维护的文件ID到修改时间的映射
+    with open(os.path.join(root, "mtime.json"), 'w', encoding='utf-8') as f:
+        json.dump(mtimes, f)
+
+
+def legacy_scan(eagle_folder):
+    """原EagleRenamerApp.load_eagle_files中的串行扫描循环（去掉界面部分）"""
+    images_folder = os.path.join(eagle_folder, "images")
+    eagle_files = []
+    for folder_name in os.listdir(images_folder):
+        folder_path = os.path.join(images_folder, folder_name)
+        if os.path.isdir(folder_path) and folder_name.endswith(".info"):
+            file_id = folder_name[:-5]
+            metadata_file = os.path.join(folder_path, "metadata.json")
+            if os.path.exists(metadata_file):
+                try:
+                    with open(metadata_file, 'r', encoding='utf-8') as f:
+                        raw_content = f.read()
+                    has_unicode_escapes = '\\u' in raw_content
+                    metadata = json.loads(raw_content)
+                    file_name = metadata.get("name", "未知")
+                    if has_unicode_escapes and ('\\u' in file_name or not re.search('[\u4e00-\u9fff]', file_name)):
+                        name_match = re.search(r'"name"\s*:\s*"(.*?)"', raw_content)
+                        if name_match:
+                            raw_name = name_match.group(1)
+                            try:
+                                file_name = raw_name.encode('utf-8').decode('unicode_escape')
+                            except Exception:
+                                file_name = raw_name
+                    file_ext = metadata.get("ext", "").lower()
+                    actual_files = [f for f in os.listdir(folder_path)
+                                    if os.path.isfile(os.path.join(folder_path, f))
+                                    and not f.endswith('.json')
+                                    and not f.endswith('.png')]
+                    eagle_files.append({
+                        "id": file_id,
+                        "folder": folder_path,
+                        "metadata_file": metadata_file,
+                        "name": file_name,
+                        "type": file_ext,
+                        "actual_file": actual_files[0] if actual_files else None,
+                        "metadata": metadata
+                    })
+                except Exception as e:
+                    print(f"处理文件{metadata_file}时发生错误: {str(e)}")
+    return eagle_files
+
+
+def best_of(func, repeat):
+    """执行多次，返回(最短耗时, 最后一次的结果)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(func):
+    """执行func，返回(tracemalloc统计的峰值内存字节数, 执行结束后仍占用的字节数)"""
+    tracemalloc.start()
+    try:
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak, current
+
+
+def bench_scan(args):
+    """对比原串行扫描与并发扫描引擎的吞吐量"""
+    temp_dir = None
+    library = args.library
+    if not library:
+        temp_dir = tempfile.mkdtemp(prefix="eagle_bench_")
+        library = temp_dir
+        print(f"正在生成 {args.items} 个测试文件: {library}")
+        make_synthetic_library(library, args.items)
+
+    try:
+        legacy_time, legacy_files = best_of(lambda: legacy_scan(library), args.repeat)
+        scan_time, files = best_of(lambda: scan_eagle_library(library, args.workers), args.repeat)
+
+        # 流式扫描：从开始到拿到第一批结果的时间
+        start = time.perf_counter()
+        folders = list_info_folders(os.path.join(library, "images"))
+        batches = iter_batches(iter_eagle_items(folders, args.workers))
+        first_batch = next(batches, [])
+        first_batch_time = time.perf_counter() - start
+        batches.close()
+
+        if len(files) != len(legacy_files):
+            print(f"警告: 结果数量不一致 {len(files)} != {len(legacy_files)}")
+        elif sorted((f.id, f.name) for f in files) != sorted((f["id"], f["name"]) for f in legacy_files):
+            print("警告: 解析出的文件名不一致")
+        count = len(files)
+        del legacy_files, files
+
+        legacy_peak, legacy_kept = peak_memory(lambda: legacy_scan(library))
+        scan_peak, scan_kept = peak_memory(lambda: scan_eagle_library(library, args.workers))
+
+        print(f"\n文件数量: {count}")
+        print(f"原串行扫描: {legacy_time:.3f} 秒, {count / legacy_time:,.0f} 项/秒")
+        print(f"并发扫描:   {scan_time:.3f} 秒, {count / scan_time:,.0f} 项/秒 (线程数 {args.workers or '默认'})")
+        print(f"加速比: {legacy_time / scan_time:.2f}x")
+        print(f"内存峰值/结果占用: 原 {legacy_peak / 1048576:.1f} / {legacy_kept / 1048576:.1f} MB, "
+              f"新 {scan_peak / 1048576:.1f} / {scan_kept / 1048576:.1f} MB")
+        print(f"流式扫描首批 {len(first_batch)} 项耗时: {first_batch_time * 1000:.1f} 毫秒")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def touch_items(eagle_folder, count):
+    """修改库中前count个文件的metadata.json和mtime.json，模拟Eagle中的改动"""
+    mtime_file = os.path.join(eagle_folder, "mtime.json")
+    with open(mtime_file, 'r', encoding='utf-8') as f:
+        mtimes = json.load(f)
+
+    folders = list_info_folders(os.path.join(eagle_folder, "images"))
+    for file_id, folder_path in folders[:count]:
+        mtimes[file_id] += 1
+        metadata_file = os.path.join(folder_path, "metadata.json")
+        with open(metadata_file, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        metadata["name"] = metadata["name"] + "_改"
+        with open(metadata_file, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+
+    with open(mtime_file, 'w', encoding='utf-8') as f:
+        json.dump(mtimes, f)
+
+
+def indexed_scan(library, index):
+    """使用索引（和mtime.json）扫描，返回重新解析的文件数量"""
+    images_folder = os.path.join(library, "images")
+    folders = list_info_folders(images_folder)
+    cached = index.load(images_folder)
+    mtimes = read_library_mtimes(library, folders)
+    records = list(iter_eagle_items(folders, cached=cached, mtimes=mtimes))
+    index.sync(records, cached)
+    return sum(
+        1 for item in records
+        if item.id not in cached or cached[item.id].metadata_mtime != item.metadata_mtime
+    )
+
+
+def bench_index(args):
+    """对比完整扫描、目录列举和基于索引的增量扫描（有无mtime.json）"""
+    temp_dir = tempfile.mkdtemp(prefix="eagle_bench_")
+    library = os.path.join(temp_dir, "library")
+    print(f"正在生成 {args.items} 个测试文件: {library}")
+    make_synthetic_library(library, args.items)
+
+    try:
+        index = EagleIndex(library, path=os.path.join(temp_dir, "index.sqlite"))
+
+        list_time, folders = best_of(lambda: list_info_folders(os.path.join(library, "images")), args.repeat)
+        full_time, _ = best_of(lambda: scan_eagle_library(library), args.repeat)
+
+        start = time.perf_counter()
+        indexed_scan(library, index)
+        build_time = time.perf_counter() - start
+
+        # 不使用mtime.json
+        mtime_file = os.path.join(library, "mtime.json")
+        touch_items(library, args.changed)
+        os.rename(mtime_file, mtime_file + ".off")
+        try:
+            start = time.perf_counter()
+            changed = indexed_scan(library, index)
+            incremental_time = time.perf_counter() - start
+        finally:
+            os.rename(mtime_file + ".off", mtime_file)
+
+        # 使用mtime.json：同样每个文件一次stat，另外读取一次mtime.json
+        indexed_scan(library, index)
+        touch_items(library, args.changed)
+        start = time.perf_counter()
+        fast_changed = indexed_scan(library, index)
+        mtime_time = time.perf_counter() - start
+
+        print(f"\n文件数量: {len(folders)}, 变化文件: {args.changed} (重新解析 {changed} 个)")
+        print(f"目录列举:     {list_time:.3f} 秒")
+        print(f"完整扫描:     {full_time:.3f} 秒")
+        print(f"首次建立索引: {build_time:.3f} 秒")
+        print(f"增量扫描:     {incremental_time:.3f} 秒 ({full_time / incremental_time:.1f}x)")
+        print(f"mtime.json:   {mtime_time:.3f} 秒 ({full_time / mtime_time:.1f}x, 重新解析 {fast_changed} 个)")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def make_dict_items(images_folder, count):
+    """按原load_eagle_files的格式生成count个文件信息字典（不含metadata）"""
+    items = []
+    for i in range(count):
+        file_id = f"K{i:012d}"
+        folder_path = os.path.join(images_folder, f"{file_id}.info")
+        name = f"{i // 50 % 100:02d}薛芳菲沈玉容旧家{i % 50:02d}"
+        items.append({
+            "id": file_id,
+            "folder": folder_path,
+            "metadata_file": os.path.join(folder_path, "metadata.json"),
+            "name": name,
+            "type": "mp4",
+            "actual_file": f"{name}.mp4",
+            "metadata_mtime": 1700000000000000000 + i,
+            "metadata_size": 1024,
+            "eagle_mtime": 1700000000000 + i
+        })
+    return items
+
+
+def make_store_items(images_folder, count):
+    """生成count个EagleItem组成的EagleItemStore"""
+    store = EagleItemStore()
+    for i in range(count):
+        name = f"{i // 50 % 100:02d}薛芳菲沈玉容旧家{i % 50:02d}"
+        # 扩展名模拟从JSON解析得到的新字符串，由EagleItem负责驻留
+        store.append(EagleItem(f"K{i:012d}", name, "".join(["m", "p4"]), f"{name}.mp4", images_folder,
+                               1700000000000000000 + i, 1024, 1700000000000 + i))
+    return store
+
+
+def bench_memory(args):
+    """对比字典列表与EagleItemStore保存同样数量文件时的内存占用"""
+    images_folder = os.path.join(tempfile.gettempdir(), "library", "images")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    print(f"{'文件数量':>10}  {'字典列表':>12}  {'EagleItemStore':>14}  {'节省':>6}")
+    for count in sizes:
+        _, dict_kept = peak_memory(lambda: make_dict_items(images_folder, count))
+        _, store_kept = peak_memory(lambda: make_store_items(images_folder, count))
+        print(f"{count:>10,}  {dict_kept / 1048576:>9.1f} MB  {store_kept / 1048576:>11.1f} MB  "
+              f"{1 - store_kept / dict_kept:>6.0%}")
+
+
+def bench_sort(args):
+    """对比每次重新计算排序键与缓存排序键的排序耗时"""
+    images_folder = os.path.join(tempfile.gettempdir(), "library", "images")
+    store = make_store_items(images_folder, args.items)
+    items = list(store)
+    # 打乱顺序，避免已排序输入带来的优势
+    items = items[1::2] + items[::2]
+
+    def legacy_sort():
+        # 原sort_tree_column：每次点击重新计算排序键并生成新列表
+        return sorted(items, key=lambda x: x.name.lower(), reverse=True)
+
+    legacy_time, _ = best_of(legacy_sort, args.repeat)
+
+    store = EagleItemStore(items)
+    start = time.perf_counter()
+    store.sort_by("name")
+    first_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store.sort_by("name", reverse=True)
+    reverse_time = time.perf_counter() - start
+
+    def cached_sort():
+        store.sort_by("id")
+        store.sort_by("name")
+
+    cached_time, _ = best_of(cached_sort, args.repeat)
+
+    print(f"\n文件数量: {args.items}")
+    print(f"原排序（每次计算排序键）: {legacy_time * 1000:.1f} 毫秒")
+    print(f"首次自然排序（计算并缓存排序键）: {first_time * 1000:.1f} 毫秒")
+    print(f"切换排序方向（只反转）: {reverse_time * 1000:.1f} 毫秒")
+    print(f"使用缓存排序键重新排序: {cached_time / 2 * 1000:.1f} 毫秒")
+
+
+def legacy_plan(names, start_prefix, mode):
+    """原preview_rename/execute_rename中的计划循环（去掉界面部分），返回新文件名列表"""
+    if mode == "increment":
+        current_prefix = min(99, start_prefix + 1)
+    else:
+        current_prefix = max(1, start_prefix - 1)
+    new_names = []
+    last_group = None
+    for original_name in names:
+        match_group = re.match(r'^(\d+)([^0-9]+)', original_name)
+        file_group = match_group.group(2) if match_group else None
+        if not file_group:
+            new_names.append(original_name)
+            continue
+        if last_group is not None and file_group != last_group:
+            current_prefix = min(99, current_prefix + 1)
+        last_group = file_group
+        match = re.match(r'^(\d+)(.*?)$', original_name)
+        if match:
+            prefix, rest = match.groups()
+            new_names.append(f"{current_prefix:0{len(prefix)}d}{rest}")
+        else:
+            new_names.append(original_name)
+    return new_names
+
+
+def bench_plan(args):
+    """对比原计划循环与共享的重命名计划（首次计算和命中缓存）"""
+    groups = ["薛芳菲沈玉容旧家", "姜梨回京", "燕贺登场", "叶世杰"]
+    names = [f"{i // 500 % 100:02d}{groups[i // 500 % len(groups)]}{i % 500:03d}" for i in range(args.items)]
+
+    # 原实现预览和执行各计算一次
+    legacy_time, legacy_names = best_of(lambda: legacy_plan(names, 1, "increment"), args.repeat)
+
+    start = time.perf_counter()
+    plan = build_plan(names, 1, "increment")
+    plan_time = time.perf_counter() - start
+
+    cached_time, cached = best_of(lambda: build_plan(names, 1, "increment"), args.repeat)
+
+    if list(plan.new_names) != legacy_names:
+        print("警告: 计划结果与原实现不一致")
+    if cached is not plan:
+        print("警告: 重复计算没有命中缓存")
+
+    print(f"\n文件数量: {args.items}")
+    print(f"原计划循环:       {legacy_time:.3f} 秒（预览和执行共 {legacy_time * 2:.3f} 秒）")
+    print(f"重命名计划首次:   {plan_time:.3f} 秒")
+    print(f"重命名计划缓存:   {cached_time:.3f} 秒")
+
+
+def bench_journal(args):
+    """模拟批量重命名中途退出，测量写日志、检查点开销和从日志继续完成的耗时"""
+    temp_dir = tempfile.mkdtemp(prefix="eagle_bench_")
+    library = os.path.join(temp_dir, "library")
+    # 日志写在临时的缓存目录中
+    os.environ["XDG_CACHE_HOME"] = os.environ["LOCALAPPDATA"] = os.path.join(temp_dir, "cache")
+    print(f"正在生成 {args.items} 个测试文件: {library}")
+    make_synthetic_library(library, args.items)
+
+    try:
+        items = scan_eagle_library(library)
+        plan = build_plan([item.name for item in items], 1, "increment")
+        entries = [
+            JournalEntry(item.id, item.name, new_name, item.actual_file, renamed_actual_file(item.actual_file, new_name))
+            for item, new_name in zip(items, plan.new_names)
+        ]
+
+        start = time.perf_counter()
+        journal = RenameJournal.create(library, entries)
+        create_time = time.perf_counter() - start
+
+        # 执行到一半时"退出"，不调用finish()
+        interrupted_at = len(entries) // 2
+        start = time.perf_counter()
+        for i in range(interrupted_at):
+            apply_entry(journal.images_folder, entries[i])
+            journal.checkpoint(i + 1)
+        apply_time = time.perf_counter() - start
+        journal._progress.close()
+
+        # 下次启动：找到日志并继续完成
+        start = time.perf_counter()
+        paths = RenameJournal.find_unfinished()
+        recovered = RenameJournal.load(paths[0])
+        load_time = time.perf_counter() - start
+        checkpoint = recovered.done
+        start = time.perf_counter()
+        success, failed = recovered.resume()
+        resume_time = time.perf_counter() - start
+
+        renamed = {item.id: item.name for item in scan_eagle_library(library)}
+        mismatched = sum(1 for entry in entries if renamed.get(entry.id) != entry.new_name)
+        if mismatched or RenameJournal.find_unfinished():
+            print(f"警告: 恢复后有 {mismatched} 个文件名不正确")
+
+        print(f"\n文件数量: {len(entries)}，在第 {interrupted_at} 个文件处中断（检查点 {checkpoint}）")
+        print(f"写入日志:         {create_time:.3f} 秒")
+        print(f"中断前执行:       {apply_time:.3f} 秒")
+        print(f"读取日志:         {load_time:.3f} 秒")
+        print(f"继续完成剩余文件: {resume_time:.3f} 秒（成功 {success}，失败 {failed}）")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def bench_backup(args):
+    """比较每个文件复制metadata.json.bak与整批写一个压缩备份的耗时，并测量从备份整批恢复"""
+    temp_dir = tempfile.mkdtemp(prefix="eagle_bench_")
+    library = os.path.join(temp_dir, "library")
+    os.environ["XDG_CACHE_HOME"] = os.environ["LOCALAPPDATA"] = os.path.join(temp_dir, "cache")
+    print(f"正在生成 {args.items} 个测试文件: {library}")
+    make_synthetic_library(library, args.items)
+
+    try:
+        items = scan_eagle_library(library)
+        plan = build_plan([item.name for item in items], 1, "increment")
+        entries = [
+            JournalEntry(item.id, item.name, new_name, item.actual_file, renamed_actual_file(item.actual_file, new_name))
+            for item, new_name in zip(items, plan.new_names)
+        ]
+
+        # 旧方式：每个文件删除旧的.bak再复制一份
+        start = time.perf_counter()
+        for item in items:
+            backup_file = f"{item.metadata_file}.bak"
+            if os.path.exists(backup_file):
+                os.remove(backup_file)
+            shutil.copy2(item.metadata_file, backup_file)
+        legacy_time = time.perf_counter() - start
+        for item in items:
+            os.remove(f"{item.metadata_file}.bak")
+
+        start = time.perf_counter()
+        names_path = write_batch_backup(library, entries, include_metadata=False)
+        names_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        full_path = write_batch_backup(library, entries, include_metadata=True)
+        full_time = time.perf_counter() - start
+
+        for entry in entries:
+            apply_entry(os.path.join(library, "images"), entry)
+        start = time.perf_counter()
+        _, success, failed, _ = restore_batch_backup(names_path)
+        restore_time = time.perf_counter() - start
+
+        restored = {item.id: item.name for item in scan_eagle_library(library)}
+        mismatched = sum(1 for entry in entries if restored.get(entry.id) != entry.old_name)
+        if mismatched:
+            print(f"警告: 恢复后有 {mismatched} 个文件名不正确")
+
+        print(f"\n文件数量: {len(entries)}")
+        print(f"逐个复制.bak:       {legacy_time:.3f} 秒（{len(entries)} 个文件）")
+        print(f"整批备份名称:       {names_time:.3f} 秒（{os.path.getsize(names_path) / 1024:.0f} KB）")
+        print(f"整批备份metadata:   {full_time:.3f} 秒（{os.path.getsize(full_path) / 1024:.0f} KB）")
+        print(f"从备份整批恢复:     {restore_time:.3f} 秒（成功 {success}，失败 {failed}）")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def simulated_latency(seconds):
+    """模拟网络存储：每次open、stat（包括os.path.exists）和rename都额外等待seconds秒"""
+    def delayed(func):
+        def wrapper(*args, **kwargs):
+            time.sleep(seconds)
+            return func(*args, **kwargs)
+        return wrapper
+
+    originals = (builtins.open, os.stat, os.rename)
+    builtins.open, os.stat, os.rename = (delayed(func) for func in originals)
+    try:
+        yield
+    finally:
+        builtins.open, os.stat, os.rename = originals
+
+
+def bench_apply(args):
+    """在模拟延迟的文件系统上比较逐个执行和并发执行重命名的吞吐量"""
+    temp_dir = tempfile.mkdtemp(prefix="eagle_bench_")
+    library = os.path.join(temp_dir, "library")
+    images_folder = os.path.join(library, "images")
+    print(f"正在生成 {args.items} 个测试文件: {library}")
+    make_synthetic_library(library, args.items)
+
+    try:
+        items = scan_eagle_library(library)
+        plan = build_plan([item.name for item in items], 1, "increment")
+        forward = [
+            JournalEntry(item.id, item.name, new_name, item.actual_file, renamed_actual_file(item.actual_file, new_name))
+            for item, new_name in zip(items, plan.new_names)
+        ]
+        backward = [JournalEntry(e.id, e.new_name, e.old_name, e.new_actual, e.old_actual) for e in forward]
+
+        worker_counts = [1] + [int(count) for count in args.workers.split(",")]
+        print(f"\n文件数量: {len(forward)}，每次文件系统调用延迟 {args.latency} 毫秒")
+        serial_time = None
+        for run, max_workers in enumerate(worker_counts):
+            # 交替正向和反向重命名，每次的工作量相同
+            entries = forward if run % 2 == 0 else backward
+            with simulated_latency(args.latency / 1000):
+                start = time.perf_counter()
+                failed = sum(1 for result in iter_apply_entries(images_folder, entries, max_workers)
+                             if result.error is not None)
+                elapsed = time.perf_counter() - start
+            if serial_time is None:
+                serial_time = elapsed
+            label = "逐个执行" if max_workers == 1 else f"{max_workers} 线程"
+            print(f"{label:<8}: {elapsed:.3f} 秒, {len(entries) / elapsed:,.0f} 项/秒, "
+                  f"加速 {serial_time / elapsed:.1f}x（失败 {failed}）")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    """主入口函数"""
+    parser = argparse.ArgumentParser(description="文件重命名工具性能基准测试")
+    subparsers = parser.add_subparsers(dest="command")
+
+    scan_parser = subparsers.add_parser("scan", help="Eagle库扫描吞吐量")
+    scan_parser.add_argument("--items", type=int, default=20000, help="生成的测试文件数量")
+    scan_parser.add_argument("--library", help="使用已有的Eagle库代替生成的测试库")
+    scan_parser.add_argument("--workers", type=int, default=None, help="扫描线程数")
+    scan_parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最短耗时")
+    scan_parser.set_defaults(func=bench_scan)
+
+    index_parser = subparsers.add_parser("index", help="持久化索引的增量扫描")
+    index_parser.add_argument("--items", type=int, default=100000, help="生成的测试文件数量")
+    index_parser.add_argument("--changed", type=int, default=50, help="扫描之间修改的文件数量")
+    index_parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最短耗时")
+    index_parser.set_defaults(func=bench_index)
+
+    memory_parser = subparsers.add_parser("memory", help="文件列表的内存占用")
+    memory_parser.add_argument("--sizes", default="10000,100000,1000000", help="逗号分隔的文件数量")
+    memory_parser.set_defaults(func=bench_memory)
+
+    sort_parser = subparsers.add_parser("sort", help="文件列表排序")
+    sort_parser.add_argument("--items", type=int, default=100000, help="文件数量")
+    sort_parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最短耗时")
+    sort_parser.set_defaults(func=bench_sort)
+
+    plan_parser = subparsers.add_parser("plan", help="重命名计划生成")
+    plan_parser.add_argument("--items", type=int, default=1000000, help="文件名数量")
+    plan_parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最短耗时")
+    plan_parser.set_defaults(func=bench_plan)
+
+    journal_parser = subparsers.add_parser("journal", help="重命名日志的中断恢复")
+    journal_parser.add_argument("--items", type=int, default=20000, help="生成的测试文件数量")
+    journal_parser.set_defaults(func=bench_journal)
+
+    backup_parser = subparsers.add_parser("backup", help="批量备份与恢复")
+    backup_parser.add_argument("--items", type=int, default=20000, help="生成的测试文件数量")
+    backup_parser.set_defaults(func=bench_backup)
+
+    apply_parser = subparsers.add_parser("apply", help="模拟网络存储上的并发重命名")
+    apply_parser.add_argument("--items", type=int, default=2000, help="生成的测试文件数量")
+    apply_parser.add_argument("--latency", type=float, default=2, help="每次文件系统调用的延迟（毫秒）")
+    apply_parser.add_argument("--workers", default="4,8,16", help="逗号分隔的并发线程数")
+    apply_parser.set_defaults(func=bench_apply)
+
+    args = parser.parse_args()
+    if not hasattr(args, "func"):
+        parser.print_help()
+        sys.exit(1)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+文件夹快照 - 用一次os.scandir得到文件夹中每一项的类型、大小和修改时间
+
+列表显示、文件组识别和重命名都使用同一份快照，不再对每一项调用os.path.isdir；
+在网络共享上每次调用都是一次往返。快照记录了文件夹本身的修改时间，文件夹内容
+（增加、删除、重命名）没有变化时可以直接重用，不必重新读取。
+"""
+import os
+from collections import namedtuple
+
+from name_keys import file_name_key
+
+# 文件夹中的一项；size和mtime（秒）在不读取文件信息的快照中为None
+SnapshotEntry = namedtuple("SnapshotEntry", ["name", "is_dir", "is_link", "size", "mtime"])
+
+
+class DirectorySnapshot:
+    """一个文件夹在某一时刻的内容，按名称自然排序（"11"排在"100"之前）"""
+
+    def __init__(self, path, entries, mtime_ns, with_stat=True):
+        """
+        Args:
+            path: 文件夹路径
+            entries: SnapshotEntry列表
+            mtime_ns: 读取前文件夹本身的修改时间（纳秒）
+            with_stat: entries中是否包含文件大小和修改时间
+        """
+        self.path = path
+        self.with_stat = with_stat
+        # 每个名称只拆分一次，排序、识别文件组和计算新文件名共用；随快照一起失效
+        self.keys = {entry.name: file_name_key(entry.name) for entry in entries}
+        self.entries = sorted(entries, key=lambda entry: self.keys[entry.name].sort_key)
+        self.mtime_ns = mtime_ns
+        self.names = [entry.name for entry in self.entries]
+        self.dir_names = frozenset(entry.name for entry in self.entries if entry.is_dir)
+        self._by_name = {entry.name: entry for entry in self.entries}
+
+    @classmethod
+    def scan(cls, path, with_stat=True):
+        """
+        读取文件夹
+
+        Args:
+            path: 文件夹路径
+            with_stat: 是否读取每个文件的大小和修改时间；Windows上这些信息随目录列表一起返回，
+                       其他系统上每个文件需要一次stat，只需要类型时可以关闭
+
+        Returns:
+            DirectorySnapshot: 快照
+
+        Raises:
+            OSError: 文件夹不存在或无法读取
+        """
+        # 先取修改时间再读取，读取期间发生的变化在下次检查时能被发现
+        mtime_ns = os.stat(path).st_mtime_ns
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                is_dir = entry.is_dir()
+                size = mtime = None
+                if with_stat:
+                    try:
+                        stat = entry.stat()
+                        size, mtime = stat.st_size, stat.st_mtime
+                    except OSError:
+                        # 失效的符号链接等
+                        pass
+                entries.append(SnapshotEntry(entry.name, is_dir, entry.is_symlink(), size, mtime))
+        return cls(path, entries, mtime_ns, with_stat)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def get(self, name):
+        """按名称查找，不存在时为None"""
+        return self._by_name.get(name)
+
+    def key(self, name):
+        """名称的拆分结果（FileNameKey），不在快照中的名称现场计算"""
+        key = self.keys.get(name)
+        return key if key is not None else file_name_key(name)
+
+    def is_dir(self, name):
+        return name in self.dir_names
+
+    def is_current(self):
+        """
+        文件夹的修改时间是否与读取时相同
+
+        只反映文件夹中项目的增加、删除和重命名，文件内容的变化不会改变文件夹的修改时间；
+        修改时间精度较低的文件系统（例如FAT）上，同一时间单位内的变化也无法发现。
+        """
+        try:
+            return os.stat(self.path).st_mtime_ns == self.mtime_ns
+        except OSError:
+            return False
+
+    def refresh(self, force=False):
+        """
+        文件夹有变化（或force为True）时重新读取
+
+        Returns:
+            DirectorySnapshot: 没有变化时返回自身，否则返回新的快照
+        """
+        if not force and self.is_current():
+            return self
+        return type(self).scan(self.path, self.with_stat)
@@ -0,0 +1,248 @@
+"""
+Eagle批量重命名备份 - 把一批文件的原始名称和metadata.json顺序写入一个压缩文件，并可以整批恢复
+
+代替每个.info文件夹中的metadata.json.bak：整批只写一个文件，保留多次重命名的备份。
+默认同时保存完整的原始metadata.json（多线程读取），恢复时只改回名称，
+当前的metadata.json缺失或损坏时才用完整备份覆盖。
+
+用法:
+    python eagle_backup.py list [--library Eagle库路径]
+    python eagle_backup.py restore 备份文件路径
+"""
+import os
+import sys
+import gzip
+import json
+import glob
+import time
+import argparse
+
+from eagle_index import EagleIndex, user_cache_dir, library_key
+from eagle_scanner import load_metadata
+from eagle_journal import JournalEntry, revert_entry, move_actual_file, write_metadata_file, iter_ordered
+
+# 备份格式版本
+BACKUP_VERSION = 1
+
+# 每个Eagle库最多保留的备份数量
+MAX_BACKUPS = 50
+
+
+def backup_dir():
+    """批量备份所在的目录（不存在时自动创建）"""
+    path = os.path.join(user_cache_dir(), "backups")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _read_metadata_text(metadata_file):
+    """读取metadata.json的原始内容，不存在时为None"""
+    try:
+        with open(metadata_file, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_batch_backup(eagle_folder, entries, include_metadata=True, max_workers=None):
+    """
+    备份一批文件的原始名称和metadata.json
+
+    Args:
+        eagle_folder: Eagle库文件夹路径
+        entries: JournalEntry列表
+        include_metadata: 是否同时保存每个文件完整的原始metadata.json；为False时只保存名称，
+                          备份更小，但metadata.json损坏时无法恢复
+        max_workers: 读取metadata.json的线程数，见iter_ordered()；网络存储上并发读取重叠等待时间
+
+    Returns:
+        str: 备份文件路径
+    """
+    key = library_key(eagle_folder)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(backup_dir(), f"{key}-{stamp}.jsonl.gz")
+    counter = 1
+    while os.path.exists(path):
+        counter += 1
+        path = os.path.join(backup_dir(), f"{key}-{stamp}-{counter}.jsonl.gz")
+
+    images_folder = os.path.join(eagle_folder, "images")
+    header = {
+        "version": BACKUP_VERSION,
+        "eagle_folder": os.path.abspath(eagle_folder),
+        "created": time.time(),
+        "count": len(entries),
+        "metadata": include_metadata
+    }
+
+    # 先写临时文件再改名，不会留下不完整的备份
+    temp_path = path + ".tmp"
+    with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        if include_metadata:
+            metadata_files = (os.path.join(images_folder, f"{entry.id}.info", "metadata.json") for entry in entries)
+            texts = iter_ordered(_read_metadata_text, metadata_files, max_workers)
+        else:
+            texts = None
+        for entry in entries:
+            record = list(entry)
+            if texts is not None:
+                record.append(next(texts))
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(temp_path, path)
+
+    _prune_backups(key)
+    return path
+
+
+def _prune_backups(key):
+    """删除超出MAX_BACKUPS的旧备份"""
+    paths = sorted(glob.glob(os.path.join(backup_dir(), f"{key}-*.jsonl.gz")), key=os.path.getmtime)
+    for old_path in paths[:-MAX_BACKUPS]:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+
+
+def list_batch_backups(eagle_folder=None):
+    """
+    列出批量备份，最新的在前
+
+    Args:
+        eagle_folder: 只列出这个Eagle库的备份，为None时列出全部
+
+    Returns:
+        list: 备份文件路径
+    """
+    pattern = f"{library_key(eagle_folder)}-*.jsonl.gz" if eagle_folder else "*.jsonl.gz"
+    return sorted(glob.glob(os.path.join(backup_dir(), pattern)), key=os.path.getmtime, reverse=True)
+
+
+def read_batch_backup(path):
+    """
+    读取备份
+
+    Returns:
+        tuple: (头信息字典, [(JournalEntry, 原始metadata.json内容或None), ...])
+    """
+    records = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get("version") != BACKUP_VERSION:
+            raise ValueError(f"不支持的备份版本: {header.get('version')}")
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            metadata = record[5] if len(record) > 5 else None
+            records.append((JournalEntry(*record[:5]), metadata))
+    if len(records) != header["count"]:
+        raise ValueError(f"备份不完整: {path}")
+    return header, records
+
+
+def _check_actual_file(folder_path, entry):
+    """
+    确认实际文件仍是备份时的原名或重命名后的新名
+
+    备份之后又被重命名过的文件两个名称都找不到，这时只恢复metadata.json会让名称和实际文件不一致。
+
+    Raises:
+        FileNotFoundError: 两个名称的实际文件都不存在
+    """
+    if not entry.old_actual:
+        return
+    for name in (entry.new_actual, entry.old_actual):
+        if name and os.path.exists(os.path.join(folder_path, name)):
+            return
+    raise FileNotFoundError(f"实际文件 {entry.new_actual} 和 {entry.old_actual} 都不存在，"
+                            f"可能在备份后又被重命名，未恢复")
+
+
+def _metadata_readable(metadata_file):
+    """metadata.json是否存在且能够解析"""
+    try:
+        load_metadata(metadata_file)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def restore_batch_backup(path, on_error=None):
+    """
+    把备份中的所有文件恢复为原始名称
+
+    只改回名称（metadata.json中的name和实际文件名），备份之后在Eagle中修改的标签、注释等保持不变；
+    当前的metadata.json缺失或无法解析时才用备份中完整的metadata.json覆盖。
+    实际文件既不是原名也不是新名的文件不修改，计为失败并通过on_error报告原因。
+
+    Args:
+        path: 备份文件路径
+        on_error: 出错回调 on_error(JournalEntry, 异常)
+
+    Returns:
+        tuple: (Eagle库文件夹路径, 成功数量, 失败数量, 恢复的文件ID列表)
+    """
+    header, records = read_batch_backup(path)
+    images_folder = os.path.join(header["eagle_folder"], "images")
+    success = failed = 0
+    restored_ids = []
+    for entry, metadata in records:
+        try:
+            folder_path = os.path.join(images_folder, f"{entry.id}.info")
+            metadata_file = os.path.join(folder_path, "metadata.json")
+            _check_actual_file(folder_path, entry)
+            if metadata is not None and not _metadata_readable(metadata_file):
+                # metadata.json已损坏：用完整备份写回
+                move_actual_file(folder_path, entry.new_actual, entry.old_actual)
+                write_metadata_file(metadata_file, metadata)
+            else:
+                revert_entry(images_folder, entry)
+            success += 1
+            restored_ids.append(entry.id)
+        except Exception as e:
+            failed += 1
+            if on_error:
+                on_error(entry, e)
+    return header["eagle_folder"], success, failed, restored_ids
+
+
+def main():
+    """命令行入口：列出或恢复批量备份"""
+    parser = argparse.ArgumentParser(description="Eagle批量重命名备份")
+    subparsers = parser.add_subparsers(dest="command")
+
+    list_parser = subparsers.add_parser("list", help="列出批量备份")
+    list_parser.add_argument("--library", help="只列出这个Eagle库的备份")
+
+    restore_parser = subparsers.add_parser("restore", help="把一个备份中的文件全部恢复为原始名称")
+    restore_parser.add_argument("path", help="备份文件路径")
+
+    args = parser.parse_args()
+    if args.command == "list":
+        for path in list_batch_backups(args.library):
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    header = json.loads(f.readline())
+            except (OSError, ValueError) as e:
+                print(f"{path}  无法读取: {str(e)}")
+                continue
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(header["created"]))
+            print(f"{path}  {created}  {header['count']} 个文件  {header['eagle_folder']}")
+    elif args.command == "restore":
+        def on_error(entry, error):
+            print(f"恢复文件{entry.id}时发生错误: {str(error)}")
+
+        eagle_folder, success, failed, restored_ids = restore_batch_backup(args.path, on_error)
+        # mtime.json没有变化，从索引中移除这些文件，下次加载时重新解析
+        EagleIndex(eagle_folder).forget(restored_ids)
+        print(f"恢复完成：成功 {success} 个，失败 {failed} 个")
+        sys.exit(1 if failed else 0)
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Eagle批量重命名命令行工具 - 不需要图形界面，可以在定时任务或SSH中运行
+
+不导入tkinter，在没有显示器的机器上也能快速启动。计划以JSON或CSV输出到标准输出，
+进度和日志输出到标准错误。
+
+用法:
+    python eagle_cli.py Eagle库路径 --prefix 03 --dry-run
+    python eagle_cli.py Eagle库路径 --prefix 03 --format csv --dry-run > plan.csv
+    python eagle_cli.py Eagle库路径 --from-id ID1 --to-id ID2 --start 5 --mode decrement
+    python eagle_cli.py Eagle库路径 --recover resume
+
+退出码: 0 成功，1 部分文件失败，2 参数错误或无法执行
+"""
+import os
+import sys
+import csv
+import json
+import time
+import sqlite3
+import argparse
+
+from eagle_scanner import scan_eagle_library
+from eagle_index import EagleIndex, library_key
+from eagle_store import EagleItemStore
+from rename_plan import build_plan
+from eagle_journal import (JournalEntry, RenameJournal, iter_apply_entries, renamed_actual_file,
+                           journal_dir, DEFAULT_APPLY_WORKERS)
+from eagle_backup import write_batch_backup
+from metrics import RunMetrics
+
+# 排序方式，与界面中的表格列对应
+SORT_CHOICES = ("order", "id", "name", "ext")
+
+# 进度输出的最短间隔（秒）
+PROGRESS_INTERVAL = 1.0
+
+
+def log(message):
+    """日志写到标准错误，标准输出只用于计划"""
+    print(message, file=sys.stderr)
+
+
+class SelectionError(Exception):
+    """无法按参数选择文件"""
+
+
+class BackupError(Exception):
+    """无法写入批量备份，没有修改任何文件"""
+
+
+def select_items(store, prefix=None, from_id=None, to_id=None):
+    """
+    按与界面相同的规则选择文件
+
+    Args:
+        store: 已排序的EagleItemStore
+        prefix: 数字前缀字符串，选择第一个以它开头的文件到最后一个文件（同“自动选择”）
+        from_id: 选择范围第一个文件的ID
+        to_id: 选择范围最后一个文件的ID，默认到最后一个文件
+
+    Returns:
+        list: 选中的EagleItem，按显示顺序
+
+    Raises:
+        SelectionError: 找不到指定的前缀或文件ID
+    """
+    if prefix is not None:
+        start = store.prefix_index().first_with_prefix(prefix)
+        if start < 0:
+            raise SelectionError(f"未找到前缀为 {prefix} 的文件")
+        return list(store[start:])
+
+    start = store.position(from_id)
+    if start < 0:
+        raise SelectionError(f"未找到文件ID: {from_id}")
+    end = len(store) - 1
+    if to_id is not None:
+        end = store.position(to_id)
+        if end < 0:
+            raise SelectionError(f"未找到文件ID: {to_id}")
+        if end < start:
+            start, end = end, start
+    return list(store[start:end + 1])
+
+
+def make_entries(items, plan):
+    """根据计划生成日志条目"""
+    return [
+        JournalEntry(item.id, item.name, new_name, item.actual_file, renamed_actual_file(item.actual_file, new_name))
+        for item, new_name in zip(items, plan.new_names)
+    ]
+
+
+def write_plan(out, fmt, eagle_folder, plan, entries, changed_only=False):
+    """
+    输出重命名计划
+
+    JSON逐行写出每个文件，百万级计划也不需要先在内存中拼出整个文本。
+
+    Args:
+        out: 输出文件对象
+        fmt: "json"或"csv"
+        eagle_folder: Eagle库路径
+        plan: RenamePlan
+        entries: 与计划对应的JournalEntry列表
+        changed_only: 只输出文件名会改变的文件
+    """
+    rows = zip(entries, plan.groups, plan.changed)
+    if changed_only:
+        rows = (row for row in rows if row[2])
+
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["id", "old_name", "new_name", "group", "changed", "old_actual", "new_actual"])
+        for entry, group, changed in rows:
+            writer.writerow([entry.id, entry.old_name, entry.new_name, group or "", int(changed),
+                             entry.old_actual or "", entry.new_actual or ""])
+        return
+
+    header = {
+        "library": os.path.abspath(eagle_folder),
+        "start_prefix": plan.start_prefix,
+        "first_prefix": plan.first_prefix,
+        "mode": plan.mode,
+        "count": len(entries),
+        "changed": plan.changed_count,
+    }
+    out.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "items": [\n')
+    first = True
+    for entry, group, changed in rows:
+        item = {
+            "id": entry.id,
+            "old_name": entry.old_name,
+            "new_name": entry.new_name,
+            "group": group,
+            "changed": changed,
+            "old_actual": entry.old_actual,
+            "new_actual": entry.new_actual,
+        }
+        out.write(("" if first else ",\n") + json.dumps(item, ensure_ascii=False))
+        first = False
+    out.write("\n]}\n")
+
+
+def apply_plan(eagle_folder, items, entries, index, max_workers, run):
+    """
+    执行重命名：备份和写日志，并发修改文件，最后更新索引
+
+    Returns:
+        tuple: (成功数量, 失败数量)
+
+    Raises:
+        BackupError: 备份失败
+        FileExistsError: 这个库还有未完成的重命名日志
+    """
+    # 先备份再写日志：备份失败时不会留下没有备份的日志
+    try:
+        with run.phase("备份", len(entries)):
+            backup_path = write_batch_backup(eagle_folder, entries, max_workers=max_workers)
+    except OSError as e:
+        raise BackupError(f"备份失败，没有修改任何文件: {str(e)}") from e
+    log(f"已备份原文件名到 {backup_path}")
+    with run.phase("写入日志", len(entries)):
+        journal = RenameJournal.create(eagle_folder, entries)
+
+    images_folder = os.path.join(eagle_folder, "images")
+    success = failed = 0
+    renamed = []
+    total = len(entries)
+    last_report = time.perf_counter()
+    started = last_report
+    results = iter_apply_entries(images_folder, entries, max_workers, run)
+    for i, (item, result) in enumerate(zip(items, results)):
+        entry = result.entry
+        if result.error is None:
+            item.actual_file = result.actual_file
+            if result.metadata_stat is not None:
+                item.metadata_mtime = result.metadata_stat.st_mtime_ns
+                item.metadata_size = result.metadata_stat.st_size
+            item.name = entry.new_name
+            renamed.append(item)
+            success += 1
+        else:
+            log(f"重命名失败: {entry.old_name} -> {entry.new_name}: {str(result.error)}")
+            failed += 1
+        journal.checkpoint(i + 1)
+
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL:
+            rate = (i + 1) / (now - started)
+            log(f"已处理 {i + 1} / {total}，每秒 {rate:,.0f} 个")
+            last_report = now
+    journal.finish()
+
+    # 重命名不会修改Eagle的mtime.json，需要把新文件名写入索引
+    if index is not None and renamed:
+        try:
+            with run.phase("更新索引", len(renamed)):
+                index.upsert(renamed)
+        except (sqlite3.Error, OSError) as e:
+            log(f"更新索引失败: {str(e)}")
+    return success, failed
+
+
+def recover(eagle_folder, action, max_workers):
+    """继续完成或撤销这个库未完成的重命名日志"""
+    path = os.path.join(journal_dir(), f"{library_key(eagle_folder)}.journal")
+    if not os.path.exists(path):
+        log("这个库没有未完成的重命名")
+        return 0
+    journal = RenameJournal.load(path)
+    if journal.is_active():
+        owner = journal.owner
+        log(f"这个库的批量重命名正在由进程 {owner.get('pid')}（{owner.get('host')}）执行，不能同时处理；"
+            f"如果该进程已经不存在，请删除 {path}")
+        return 2
+
+    def on_error(entry, error):
+        log(f"处理文件{entry.id}时发生错误: {str(error)}")
+
+    if action == "resume":
+        log(f"继续完成上次的批量重命名，从第 {journal.done + 1} 个文件开始...")
+        success, failed = journal.resume(on_error, max_workers)
+    else:
+        log("正在撤销上次的批量重命名...")
+        success, failed = journal.rollback(on_error)
+
+    # mtime.json没有变化，从索引中移除这些文件，下次加载时重新解析
+    try:
+        EagleIndex(journal.eagle_folder).forget(entry.id for entry in journal.entries)
+    except (sqlite3.Error, OSError) as e:
+        log(f"更新索引失败: {str(e)}")
+    log(f"完成：成功 {success} 个，失败 {failed} 个")
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Eagle批量重命名（命令行）：按前缀或文件ID范围选择文件，按文件组重新编号前缀")
+    parser.add_argument("library", help="Eagle库文件夹路径")
+
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--prefix", help="从第一个以该数字开头的文件选到最后（同界面中的“自动选择”）")
+    selection.add_argument("--from-id", help="选择范围第一个文件的ID")
+    parser.add_argument("--to-id", help="选择范围最后一个文件的ID，默认到最后一个文件")
+
+    parser.add_argument("--start", type=int, help="起始索引，默认为--prefix的数值，否则为1")
+    parser.add_argument("--mode", choices=("increment", "decrement"), default="increment", help="前缀变化方式")
+    parser.add_argument("--sort", choices=SORT_CHOICES, default="name",
+                        help="选择前的排序方式：order为扫描顺序，默认按文件名自然排序")
+    parser.add_argument("--reverse", action="store_true", help="倒序排列")
+
+    parser.add_argument("--dry-run", action="store_true", help="只输出计划，不修改任何文件")
+    parser.add_argument("--format", choices=("json", "csv"), default="json", help="计划的输出格式")
+    parser.add_argument("--output", help="计划输出到文件，默认输出到标准输出")
+    parser.add_argument("--changed-only", action="store_true", help="计划中只包含文件名会改变的文件")
+
+    parser.add_argument("--workers", type=int, default=DEFAULT_APPLY_WORKERS, help="执行重命名的并发线程数")
+    parser.add_argument("--no-index", action="store_true", help="不使用持久化索引，完整扫描")
+    parser.add_argument("--metrics", help="把各阶段耗时以JSON写入该文件")
+    parser.add_argument("--recover", choices=("resume", "rollback"),
+                        help="继续完成或撤销这个库上次未完成的重命名，然后退出")
+    return parser
+
+
+def main(argv=None):
+    """命令行入口，返回退出码"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    eagle_folder = args.library
+    if not os.path.isdir(os.path.join(eagle_folder, "images")):
+        log(f"未找到images文件夹，这可能不是一个有效的Eagle库: {eagle_folder}")
+        return 2
+
+    if args.recover:
+        return recover(eagle_folder, args.recover, args.workers)
+
+    if args.prefix is None and args.from_id is None:
+        parser.error("需要--prefix或--from-id指定要重命名的文件")
+    if args.to_id is not None and args.from_id is None:
+        parser.error("--to-id需要与--from-id一起使用")
+    if args.prefix is not None and not args.prefix.isdigit():
+        parser.error("--prefix必须是数字，例如03")
+
+    run = RunMetrics("eagle_cli", library=os.path.abspath(eagle_folder), dry_run=args.dry_run)
+
+    index = None
+    if not args.no_index:
+        try:
+            index = EagleIndex(eagle_folder)
+        except (sqlite3.Error, OSError) as e:
+            log(f"索引不可用，将进行完整扫描: {str(e)}")
+
+    def on_error(metadata_file, error):
+        log(f"处理文件{metadata_file}时发生错误: {str(error)}")
+
+    items = scan_eagle_library(eagle_folder, on_error=on_error, index=index, metrics=run)
+    log(f"扫描完成，共 {len(items)} 个文件")
+
+    with run.phase("排序", len(items)):
+        store = EagleItemStore(items)
+        store.sort_by(args.sort, args.reverse)
+
+    try:
+        selected = select_items(store, args.prefix, args.from_id, args.to_id)
+    except SelectionError as e:
+        log(str(e))
+        return 2
+
+    if args.start is not None:
+        start_prefix = args.start
+    elif args.prefix is not None:
+        start_prefix = int(args.prefix)
+    else:
+        start_prefix = 1
+
+    with run.phase("生成计划", len(selected)):
+        plan = build_plan([item.name for item in selected], start_prefix, args.mode)
+        entries = make_entries(selected, plan)
+    log(f"选中 {len(selected)} 个文件，其中 {plan.changed_count} 个文件名会改变，"
+        f"第一组前缀 {start_prefix:02d} -> {plan.first_prefix:02d}")
+
+    # 执行时默认不输出完整计划，指定--output时仍然写出
+    if args.dry_run or args.output:
+        out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+        try:
+            with run.phase("输出计划", len(entries)):
+                write_plan(out, args.format, eagle_folder, plan, entries, args.changed_only)
+        finally:
+            if args.output:
+                out.close()
+
+    exit_code = 0
+    if not args.dry_run:
+        # 文件名不变的文件不需要执行
+        changed = [(item, entry) for item, entry, is_changed in zip(selected, entries, plan.changed) if is_changed]
+        if not changed:
+            log("没有需要重命名的文件")
+        else:
+            try:
+                success, failed = apply_plan(eagle_folder, [item for item, _ in changed],
+                                             [entry for _, entry in changed], index, args.workers, run)
+            except FileExistsError as e:
+                log(f"{str(e)}\n请先使用 --recover resume 或 --recover rollback 处理")
+                return 2
+            except BackupError as e:
+                log(str(e))
+                return 2
+            log(f"重命名完成：成功 {success} 个，失败 {failed} 个")
+            exit_code = 1 if failed else 0
+
+    run.finish()
+    run.save()
+    for line in run.report():
+        log(f"  {line}")
+    if args.metrics:
+        run.export(args.metrics)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
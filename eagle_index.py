@@ -0,0 +1,168 @@
+"""
+Eagle库的持久化索引 - 在用户缓存目录中用SQLite保存每个文件的扫描结果
+
+重新加载时只需要对比metadata.json的修改时间和大小，未变化的文件直接使用索引中的记录。
+"""
+import os
+import sys
+import sqlite3
+import hashlib
+
+from eagle_store import EagleItem
+
+# 索引结构版本，结构变化时旧索引会被丢弃重建
+SCHEMA_VERSION = 3
+
+
+def user_cache_dir():
+    """
+    获取本工具的用户缓存目录（不存在时自动创建）
+
+    Returns:
+        str: 缓存目录路径
+    """
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+    path = os.path.join(base, "eagle_tools")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def library_key(eagle_folder):
+    """根据Eagle库的绝对路径生成固定的缓存文件名"""
+    normalized = os.path.normcase(os.path.abspath(eagle_folder))
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class EagleIndex:
+    """Eagle库的持久化索引"""
+
+    def __init__(self, eagle_folder, path=None):
+        self.eagle_folder = eagle_folder
+        if path is None:
+            index_dir = os.path.join(user_cache_dir(), "index")
+            os.makedirs(index_dir, exist_ok=True)
+            path = os.path.join(index_dir, f"{library_key(eagle_folder)}.sqlite")
+        self.path = path
+        self._ensure_schema()
+
+    def _connect(self):
+        # 每次操作单独建立连接，索引可以在任意线程中使用
+        return sqlite3.connect(self.path)
+
+    def _ensure_schema(self):
+        conn = self._connect()
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS items")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "id TEXT PRIMARY KEY, "
+                "name TEXT, "
+                "ext TEXT, "
+                "actual_file TEXT, "
+                "metadata_mtime INTEGER, "
+                "metadata_size INTEGER, "
+                "eagle_mtime INTEGER)"
+            )
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def load(self, images_folder):
+        """
+        读取索引中的所有记录
+
+        Args:
+            images_folder: Eagle库的images文件夹路径，所有记录共用
+
+        Returns:
+            dict: {文件ID: EagleItem}
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, name, ext, actual_file, metadata_mtime, metadata_size, eagle_mtime FROM items"
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return {row[0]: EagleItem(row[0], row[1], row[2], row[3], images_folder, row[4], row[5], row[6]) for row in rows}
+
+    def sync(self, records, cached):
+        """
+        把本次扫描结果写回索引，只写入新增或变化的记录
+
+        Args:
+            records: 本次扫描得到的EagleItem列表
+            cached: 扫描前load()返回的字典
+
+        Returns:
+            tuple: (写入的记录数, 删除的记录数)
+        """
+        changed = []
+        seen = set()
+        for item in records:
+            seen.add(item.id)
+            old = cached.get(item.id)
+            # 未变化的记录直接沿用了索引中的对象
+            if old is item:
+                continue
+            if (old is None
+                    or old.metadata_mtime != item.metadata_mtime
+                    or old.metadata_size != item.metadata_size
+                    or old.name != item.name
+                    or old.actual_file != item.actual_file
+                    or old.eagle_mtime != item.eagle_mtime):
+                changed.append(item)
+        removed = [file_id for file_id in cached if file_id not in seen]
+
+        self._write(changed, removed)
+        return len(changed), len(removed)
+
+    def upsert(self, records):
+        """
+        写入指定的记录，例如重命名之后的文件
+
+        重命名不会修改Eagle的mtime.json，必须及时更新索引，否则快速加载会读到旧的文件名。
+
+        Args:
+            records: EagleItem列表
+        """
+        self._write(records, [])
+
+    def forget(self, file_ids):
+        """
+        从索引中移除指定的文件，下次扫描时重新解析
+
+        用于在索引之外被修改过的文件，例如从重命名日志恢复的文件。
+
+        Args:
+            file_ids: 文件ID列表
+        """
+        self._write([], list(file_ids))
+
+    def _write(self, records, removed_ids):
+        if not records and not removed_ids:
+            return
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (item.id, item.name, item.ext, item.actual_file,
+                     item.metadata_mtime, item.metadata_size, item.eagle_mtime)
+                    for item in records
+                ]
+            )
+            conn.executemany("DELETE FROM items WHERE id = ?", [(file_id,) for file_id in removed_ids])
+            conn.commit()
+        finally:
+            conn.close()
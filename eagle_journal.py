@@ -0,0 +1,439 @@
+"""
+Eagle重命名日志 - 预写式日志，保证中断的批量重命名可以继续完成或撤销
+
+执行前把整个计划一次写入用户缓存目录中的日志文件，执行过程中每完成一批
+在进度文件中追加一个检查点。程序中途退出后，下次启动时根据日志继续完成
+剩余的文件或撤销已完成的文件，不需要重新扫描Eagle库。
+"""
+import os
+import json
+import glob
+import time
+import socket
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from eagle_index import user_cache_dir, library_key
+from eagle_scanner import load_metadata
+
+# 日志格式版本
+JOURNAL_VERSION = 1
+
+# 并发执行重命名的默认线程数：网络存储上每个文件需要多次往返，重叠等待时间
+DEFAULT_APPLY_WORKERS = 8
+
+# 日志中的一个文件：原名和新名，以及.info文件夹中实际文件的原名和新名（没有实际文件时为None）
+JournalEntry = namedtuple("JournalEntry", ["id", "old_name", "new_name", "old_actual", "new_actual"])
+
+# 一个文件的执行结果：实际文件当前的文件名、执行后metadata.json的os.stat结果（不存在时为None）、
+# 出错时的异常（成功时为None）
+ApplyResult = namedtuple("ApplyResult", ["entry", "actual_file", "metadata_stat", "error"])
+
+
+def journal_dir():
+    """重命名日志所在的目录（不存在时自动创建）"""
+    path = os.path.join(user_cache_dir(), "journal")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def process_alive(pid):
+    """本机上进程号为pid的进程是否还在运行"""
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        process_query_limited_information = 0x1000
+        still_active = 259
+        handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+        if not handle:
+            # 没有权限打开时进程仍然存在（ERROR_ACCESS_DENIED）
+            return ctypes.get_last_error() == 5
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return True
+            return exit_code.value == still_active
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def renamed_actual_file(actual_file, new_name):
+    """实际文件重命名后的文件名，保持原扩展名"""
+    if not actual_file:
+        return None
+    _, ext = os.path.splitext(actual_file)
+    return f"{new_name}{ext}"
+
+
+def write_metadata_file(metadata_file, text):
+    """
+    原子地替换metadata.json的内容
+
+    先写入同一文件夹中的临时文件并刷新到磁盘，再用os.replace替换原文件；
+    中途崩溃或断电时原文件保持完整，不会留下只写了一半的metadata.json。
+    """
+    root, ext = os.path.splitext(metadata_file)
+    # 临时文件保留.json扩展名，残留时扫描也不会把它当作实际文件
+    temp_path = f"{root}.tmp-{os.getpid()}{ext}"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, metadata_file)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _write_name(metadata_file, name):
+    """把metadata.json中的name改为name，已经是name时不写入"""
+    metadata = load_metadata(metadata_file)
+    if metadata.get("name") == name:
+        return
+
+    metadata["name"] = name
+    write_metadata_file(metadata_file, json.dumps(metadata, ensure_ascii=False))
+
+
+def move_actual_file(folder_path, source, target):
+    """把实际文件从source改名为target，已经改过时不做任何事，返回当前的文件名"""
+    if not source or source == target:
+        return source
+    source_path = os.path.join(folder_path, source)
+    if os.path.exists(source_path):
+        os.rename(source_path, os.path.join(folder_path, target))
+        return target
+    if os.path.exists(os.path.join(folder_path, target)):
+        return target
+    # 实际文件不存在，保持原样
+    return source
+
+
+def apply_entry(images_folder, entry, metrics=None):
+    """
+    执行一个文件的重命名：先修改metadata.json，再重命名实际文件
+
+    操作是幂等的，对已经完成（或部分完成）的文件重复执行是安全的；
+    中途出错时撤销这个文件已做的修改后再抛出异常。
+
+    Args:
+        images_folder: Eagle库的images文件夹路径
+        entry: JournalEntry
+        metrics: RunMetrics，提供时分别记录修改metadata.json和重命名实际文件的耗时
+
+    Returns:
+        str: 实际文件当前的文件名，没有实际文件时为None
+    """
+    folder_path = os.path.join(images_folder, f"{entry.id}.info")
+    metadata_file = os.path.join(folder_path, "metadata.json")
+    try:
+        start = time.perf_counter()
+        if os.path.exists(metadata_file):
+            _write_name(metadata_file, entry.new_name)
+        written = time.perf_counter()
+        actual_file = move_actual_file(folder_path, entry.old_actual, entry.new_actual)
+        if metrics is not None:
+            metrics.record("写入metadata", written - start)
+            metrics.record("重命名文件", time.perf_counter() - written)
+        return actual_file
+    except Exception:
+        try:
+            revert_entry(images_folder, entry)
+        except Exception:
+            pass
+        raise
+
+
+def _apply_and_stat(images_folder, entry, metrics=None):
+    """执行一个文件的重命名并读取metadata.json的新状态，在线程池中运行"""
+    try:
+        actual_file = apply_entry(images_folder, entry, metrics)
+    except Exception as e:
+        return ApplyResult(entry, None, None, e)
+    try:
+        metadata_stat = os.stat(os.path.join(images_folder, f"{entry.id}.info", "metadata.json"))
+    except OSError:
+        metadata_stat = None
+    return ApplyResult(entry, actual_file, metadata_stat, None)
+
+
+def iter_ordered(func, items, max_workers=None):
+    """
+    在线程池中对每一项调用func，按输入顺序逐个产出结果
+
+    不同项目之间的I/O重叠进行，同时在途的任务数量有上限，项目数量很多时内存占用固定。
+
+    Args:
+        func: 处理一项的函数 func(item)
+        items: 项目序列
+        max_workers: 线程数，默认DEFAULT_APPLY_WORKERS；为1时在调用方线程中逐个执行
+
+    Yields:
+        func(item)的返回值
+    """
+    max_workers = max_workers or DEFAULT_APPLY_WORKERS
+    if max_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    window = max_workers * 2
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # 调用方提前结束迭代时取消尚未开始的任务
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def iter_apply_entries(images_folder, entries, max_workers=None, metrics=None):
+    """
+    并发执行一批重命名，按输入顺序逐个产出结果
+
+    每个文件在同一个任务中依次修改metadata.json和重命名实际文件，不同文件之间的I/O重叠进行。
+    结果总是按输入顺序在调用方线程中产出，调用方可以直接累加计数和写检查点，
+    第i个结果产出时前i个文件都已处理完毕。同时在途的任务数量有上限。
+
+    Args:
+        images_folder: Eagle库的images文件夹路径
+        entries: JournalEntry列表
+        max_workers: 线程数，默认DEFAULT_APPLY_WORKERS；为1时在调用方线程中逐个执行
+        metrics: RunMetrics，提供时记录每个文件各步骤的耗时
+
+    Yields:
+        ApplyResult: 执行结果
+    """
+    return iter_ordered(lambda entry: _apply_and_stat(images_folder, entry, metrics), entries, max_workers)
+
+
+def revert_entry(images_folder, entry):
+    """
+    撤销一个文件的重命名，同样是幂等的
+
+    Returns:
+        str: 实际文件当前的文件名，没有实际文件时为None
+    """
+    folder_path = os.path.join(images_folder, f"{entry.id}.info")
+    metadata_file = os.path.join(folder_path, "metadata.json")
+    actual_file = move_actual_file(folder_path, entry.new_actual, entry.old_actual)
+    if os.path.exists(metadata_file):
+        _write_name(metadata_file, entry.old_name)
+    return actual_file
+
+
+class RenameJournal:
+    """一次批量重命名的日志"""
+
+    # 每完成多少个文件写一次检查点
+    CHECKPOINT_EVERY = 256
+
+    def __init__(self, path, eagle_folder, entries, done=0, owner=None):
+        """
+        Args:
+            path: 日志文件路径
+            eagle_folder: Eagle库文件夹路径
+            entries: JournalEntry列表
+            done: 最近一次检查点记录的已完成数量
+            owner: 创建日志的进程 {"pid": 进程号, "host": 主机名}，旧版本的日志中没有
+        """
+        self.path = path
+        self.owner = owner
+        self.eagle_folder = eagle_folder
+        self.images_folder = os.path.join(eagle_folder, "images")
+        self.entries = entries
+        self.done = done
+        self._progress = None
+        self._checkpointed = done
+
+    @property
+    def progress_path(self):
+        return self.path + ".progress"
+
+    @classmethod
+    def create(cls, eagle_folder, entries):
+        """
+        把计划写入新的日志文件
+
+        Raises:
+            FileExistsError: 这个库还有未完成的日志，需要先处理
+        """
+        path = os.path.join(journal_dir(), f"{library_key(eagle_folder)}.journal")
+        if os.path.exists(path):
+            raise FileExistsError(f"Eagle库还有未完成的重命名日志: {path}")
+
+        # 记录创建日志的进程，其他进程（例如同时运行的图形界面和eagle_cli.py）不会接手正在执行的日志
+        owner = {"pid": os.getpid(), "host": socket.gethostname()}
+        header = {"version": JOURNAL_VERSION, "eagle_folder": os.path.abspath(eagle_folder), "count": len(entries),
+                  "owner": owner}
+        lines = [json.dumps(header, ensure_ascii=False)]
+        lines.extend(json.dumps(list(entry), ensure_ascii=False) for entry in entries)
+
+        # 先写临时文件再改名，日志要么完整存在要么不存在
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+            f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+        journal = cls(path, eagle_folder, list(entries), owner=owner)
+        journal._progress = open(journal.progress_path, 'w', encoding='utf-8')
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        """读取日志文件和最后一个检查点"""
+        with open(path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get("version") != JOURNAL_VERSION:
+                raise ValueError(f"不支持的日志版本: {header.get('version')}")
+            entries = [JournalEntry(*json.loads(line)) for line in f if line.strip()]
+        if len(entries) != header["count"]:
+            raise ValueError(f"日志不完整: {path}")
+
+        done = 0
+        try:
+            with open(path + ".progress", 'r', encoding='utf-8') as f:
+                for line in f:
+                    # 最后一行可能只写了一半
+                    if line.endswith("\n"):
+                        done = int(line)
+        except FileNotFoundError:
+            pass
+        return cls(path, header["eagle_folder"], entries, done, header.get("owner"))
+
+    @staticmethod
+    def owner_is_active(owner):
+        """
+        创建日志的进程是否还在运行（即日志仍在被执行）
+
+        当前进程自己的日志不算；其他主机上的进程无法检查，按仍在运行处理。
+        """
+        if not owner:
+            return False
+        if owner.get("host") != socket.gethostname():
+            return True
+        pid = owner.get("pid")
+        return pid != os.getpid() and process_alive(pid)
+
+    def is_active(self):
+        """日志是否仍在被其他进程执行，这时不能继续完成或撤销"""
+        return self.owner_is_active(self.owner)
+
+    @classmethod
+    def find_unfinished(cls, include_active=False):
+        """
+        查找所有未完成的日志
+
+        Args:
+            include_active: 是否包括仍在被其他进程执行的日志
+
+        Returns:
+            list: 日志文件路径
+        """
+        paths = sorted(glob.glob(os.path.join(journal_dir(), "*.journal")))
+        if include_active:
+            return paths
+        unfinished = []
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    owner = json.loads(f.readline()).get("owner")
+            except (OSError, ValueError):
+                owner = None
+            if not cls.owner_is_active(owner):
+                unfinished.append(path)
+        return unfinished
+
+    def checkpoint(self, done, force=False):
+        """
+        记录前done个文件已经完成
+
+        距上一个检查点不足CHECKPOINT_EVERY个文件时不写入，除非force为True。
+        """
+        self.done = done
+        if not force and done - self._checkpointed < self.CHECKPOINT_EVERY:
+            return
+        if self._progress is None:
+            self._progress = open(self.progress_path, 'a', encoding='utf-8')
+        self._progress.write(f"{done}\n")
+        self._progress.flush()
+        os.fsync(self._progress.fileno())
+        self._checkpointed = done
+
+    def resume(self, on_error=None, max_workers=None):
+        """
+        从最后一个检查点继续完成剩余的文件
+
+        检查点之后的文件可能已经部分完成，重复执行是安全的。
+
+        Args:
+            on_error: 出错回调 on_error(JournalEntry, 异常)
+            max_workers: 并发线程数，见iter_apply_entries()
+
+        Returns:
+            tuple: (成功数量, 失败数量)
+        """
+        success = failed = 0
+        done = self.done
+        for result in iter_apply_entries(self.images_folder, self.entries[done:], max_workers):
+            if result.error is None:
+                success += 1
+            else:
+                failed += 1
+                if on_error:
+                    on_error(result.entry, result.error)
+            done += 1
+            self.checkpoint(done)
+        self.finish()
+        return success, failed
+
+    def rollback(self, on_error=None):
+        """
+        撤销日志中的所有文件（倒序），没有执行过的文件不会被修改
+
+        Returns:
+            tuple: (成功数量, 失败数量)
+        """
+        success = failed = 0
+        for entry in reversed(self.entries):
+            try:
+                revert_entry(self.images_folder, entry)
+                success += 1
+            except Exception as e:
+                failed += 1
+                if on_error:
+                    on_error(entry, e)
+        self.finish()
+        return success, failed
+
+    def finish(self):
+        """批量重命名已全部处理，删除日志"""
+        if self._progress is not None:
+            self._progress.close()
+            self._progress = None
+        for path in (self.progress_path, self.path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -1,56 +1,35 @@
 import os
-import re
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
-import json
-import shutil
 import sys
-import codecs  # 添加codecs模块
-
-# 移除原有的decode_eagle_unicode函数
-# 添加新的Eagle元数据处理函数
-def fix_unicode_name(text):
-    """修复Eagle元数据中的Unicode编码问题"""
-    if not text or not isinstance(text, str):
-        return text
-        
-    # 检查是否可能是Unicode转义序列形式
-    if '\\u' in repr(text) and not '\\u' in text:
-        # 原始的JSON解析已经将Unicode转义序列转换为Unicode字符
-        return text
-    elif '\\u' in text:
-        # 如果文本中直接包含'\u'序列，尝试解码
-        try:
-            # 将原始字符串中的Unicode转义序列直接解码
-            return text.encode('utf-8').decode('unicode_escape')
-        except Exception:
-            pass
-    
-    return text
-
-class RedirectText:
-    """用于将控制台输出重定向到Tkinter文本控件"""
-    def __init__(self, text_widget):
-        self.text_widget = text_widget
-        self.buffer = ""
-        
-    def write(self, string):
-        self.buffer += string
-        self.update_text_widget()
-    
-    def flush(self):
-        self.update_text_widget()
-        self.buffer = ""
-    
-    def update_text_widget(self):
-        self.text_widget.configure(state=tk.NORMAL)
-        self.text_widget.insert(tk.END, self.buffer)
-        self.text_widget.see(tk.END)
-        self.text_widget.configure(state=tk.DISABLED)
-        self.buffer = ""
+import queue
+import time
+import sqlite3
+import collections
+from eagle_scanner import list_info_folders, iter_eagle_items, iter_batches, read_library_mtimes
+from eagle_index import EagleIndex
+from eagle_watcher import LibraryWatcher
+from eagle_store import EagleItemStore
+from virtual_list import VirtualTreeview
+from name_search import NgramIndex
+from rename_plan import build_plan
+from eagle_journal import (JournalEntry, RenameJournal, iter_apply_entries, renamed_actual_file,
+                           DEFAULT_APPLY_WORKERS)
+from eagle_backup import backup_dir, write_batch_backup, restore_batch_backup
+from ui_events import UIEventBus, ProgressDialog
+from log_sink import LogSink
+from metrics import RunMetrics, record_run
+from metrics_panel import show_metrics
 
 class EagleRenamerApp:
+    # 扫描期间轮询队列的间隔（毫秒）
+    SCAN_POLL_MS = 30
+    # 监视模式下应用库变化的间隔（毫秒）
+    WATCH_POLL_MS = 200
+    # 表格列对应的排序字段，序号列按扫描顺序排列
+    SORT_FIELDS = {"序号": "order", "文件ID": "id", "文件名": "name", "类型": "ext"}
+    
     def __init__(self, root=None):
         if root is None:
             self.root = tk.Tk()
@@ -72,18 +51,40 @@ class EagleRenamerApp:
         
         # 初始化变量
         self.eagle_folder = None
-        self.eagle_files = []  # 存储Eagle文件信息
+        self.eagle_files = EagleItemStore()  # 存储Eagle文件信息，可按文件ID查找
+        self.view = self.eagle_files  # 当前显示的文件（筛选时是eagle_files的子集）
+        self.name_index = NgramIndex()  # 文件名搜索索引
+        self._filter_result = None  # 最近一次筛选的(查询文本, 文件ID集合)
         self.selected_files = []  # 存储选中的文件
         self.start_index = tk.IntVar(value=1)
         self.prefix_mode = tk.StringVar(value="increment")
+        self.apply_workers = tk.IntVar(value=DEFAULT_APPLY_WORKERS)  # 执行重命名的并发线程数
         
         # 排序相关变量
         self.sort_column = "序号"  # 默认排序列
         self.sort_reverse = False  # 默认不逆序
         
+        # 当前正在进行的扫描
+        self._scan_queue = None
+        # 最近一次扫描的指标
+        self.last_scan_metrics = {}
+        # 最近几次加载和重命名的分阶段性能统计
+        self.run_metrics = collections.deque(maxlen=20)
+        self._load_metrics = None
+        
+        # 库监视器（监视模式开启且库已加载时运行）
+        self.watcher = None
+        self._watch_queue = queue.Queue()
+        
+        # 后台线程通过事件总线报告进度、输出日志和更新界面
+        self.bus = UIEventBus(self.root)
+        
         # 创建界面
         self.create_widgets()
         
+        # 检查上次是否有未完成的批量重命名
+        self.root.after(200, self.check_unfinished_journals)
+        
     def create_widgets(self):
         # 创建主框架
         main_frame = ttk.Frame(self.root, padding="10")
@@ -127,6 +128,27 @@ class EagleRenamerApp:
         sort_btn = ttk.Button(buttons_frame, text="按文件名排序", command=lambda: self.sort_tree_column("文件名"))
         sort_btn.pack(side=tk.LEFT, padx=(0, 5))
         
+        # 监视模式：库中单个文件的变化直接同步到列表
+        self.watch_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            buttons_frame,
+            text="监视库变化",
+            variable=self.watch_var,
+            command=self.toggle_watch
+        ).pack(side=tk.LEFT, padx=(0, 5))
+        
+        # 查看各阶段耗时
+        metrics_btn = ttk.Button(buttons_frame, text="性能统计", command=lambda: show_metrics(self.root, self.run_metrics))
+        metrics_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
+        # 从批量备份恢复原文件名
+        restore_btn = ttk.Button(buttons_frame, text="恢复备份...", command=self.restore_backup)
+        restore_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
+        # 扫描进度
+        self.scan_status_var = tk.StringVar(value="")
+        ttk.Label(buttons_frame, textvariable=self.scan_status_var).pack(side=tk.LEFT, padx=(10, 0))
+        
         # 创建中间部分 - 左侧文件列表、右侧选项
         middle_frame = ttk.Frame(main_frame)
         middle_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -135,9 +157,24 @@ class EagleRenamerApp:
         files_frame = ttk.LabelFrame(middle_frame, text="Eagle文件列表", padding="10")
         files_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
         
-        # 创建表格
+        # 文件名筛选
+        filter_row = ttk.Frame(files_frame)
+        filter_row.pack(fill=tk.X, pady=(0, 5))
+        
+        ttk.Label(filter_row, text="筛选:").pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self.apply_filter())
+        ttk.Entry(filter_row, textvariable=self.filter_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # 创建表格（虚拟列表，只显示可见区域的行）
         columns = ("序号", "文件ID", "文件名", "类型")
-        self.file_tree = ttk.Treeview(files_frame, columns=columns, show="headings", selectmode="extended")
+        self.file_tree = VirtualTreeview(
+            files_frame,
+            columns=columns,
+            row_values=lambda i, item: (i+1, item.id, item.name, item.ext.upper())
+        )
+        self.file_tree.set_items(self.eagle_files)
         
         # 定义列
         self.file_tree.heading("序号", text="序号", command=lambda: self.sort_tree_column("序号"))
@@ -150,15 +187,10 @@ class EagleRenamerApp:
         self.file_tree.column("文件名", width=500)
         self.file_tree.column("类型", width=100, anchor="center")
         
-        # 添加滚动条
-        tree_scroll = ttk.Scrollbar(files_frame, orient="vertical", command=self.file_tree.yview)
-        self.file_tree.configure(yscrollcommand=tree_scroll.set)
-        
-        tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.file_tree.pack(fill=tk.BOTH, expand=True)
         
         # 绑定选择事件
-        self.file_tree.bind("<<TreeviewSelect>>", self.on_file_select)
+        self.file_tree.bind("<<ListSelect>>", self.on_file_select)
         
         # 右侧 - 操作选项
         options_frame = ttk.LabelFrame(middle_frame, text="重命名选项", padding="10", width=380)
@@ -194,6 +226,14 @@ class EagleRenamerApp:
         )
         auto_select_btn.pack(side=tk.LEFT)
         
+        # 选择第一个选中文件所在的整组
+        select_group_btn = ttk.Button(
+            index_row,
+            text="选择本组",
+            command=self.select_current_group
+        )
+        select_group_btn.pack(side=tk.LEFT, padx=(5, 0))
+        
         # 前缀模式选择
         mode_row = ttk.Frame(index_frame)
         mode_row.pack(fill=tk.X, pady=10)
@@ -215,6 +255,19 @@ class EagleRenamerApp:
             variable=self.prefix_mode
         ).pack(side=tk.LEFT)
         
+        # 并发数：网络存储上同时处理多个文件，为1时逐个执行
+        workers_row = ttk.Frame(index_frame)
+        workers_row.pack(fill=tk.X)
+        
+        ttk.Label(workers_row, text="并发数:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Spinbox(
+            workers_row,
+            from_=1,
+            to=64,
+            textvariable=self.apply_workers,
+            width=5
+        ).pack(side=tk.LEFT)
+        
         # 预览和执行按钮
         preview_btn = ttk.Button(options_frame, text="预览重命名", command=self.preview_rename)
         preview_btn.pack(fill=tk.X, pady=(20, 5))
@@ -234,8 +287,8 @@ class EagleRenamerApp:
         log_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
-        # 重定向标准输出到日志窗口
-        self.redirect = RedirectText(self.log_text)
+        # 重定向标准输出到日志窗口，定时批量刷新，完整日志写入日志文件
+        self.redirect = LogSink(self.log_text, "eagle_rename")
         sys.stdout = self.redirect
         
         # 设置样式
@@ -260,8 +313,11 @@ class EagleRenamerApp:
             self.eagle_path_var.set(folder_path)
             print(f"已选择Eagle文件夹: {folder_path}")
     
-    def load_eagle_files(self):
-        """加载Eagle文件夹中的文件"""
+    def load_eagle_files(self, on_loaded=None):
+        """加载Eagle文件夹中的文件
+        
+        扫描在后台线程中进行，完成后在界面线程中调用on_loaded
+        """
         eagle_folder = self.eagle_path_var.get().strip()
         
         if not eagle_folder:
@@ -275,9 +331,17 @@ class EagleRenamerApp:
         # 保存Eagle文件夹路径
         self.eagle_folder = eagle_folder
         
+        # 重新加载期间停止监视，加载完成后重新开始
+        self.stop_watch()
+        
         # 清空文件树和数据
-        self.file_tree.delete(*self.file_tree.get_children())
-        self.eagle_files = []
+        self.eagle_files.clear()
+        self.name_index = NgramIndex()
+        self._filter_result = None
+        self.view = self.eagle_files
+        self.selected_files = []
+        self.file_tree.set_items(self.eagle_files)
+        self.file_tree.clear_selection()
         
         # 检查images文件夹
         images_folder = os.path.join(eagle_folder, "images")
@@ -287,90 +351,250 @@ class EagleRenamerApp:
         
         print(f"开始扫描Eagle文件夹: {eagle_folder}")
         
+        # 在后台线程中扫描，扫描结果分批通过队列交回界面线程
+        scan_queue = queue.Queue()
+        self._scan_queue = scan_queue
+        self.last_scan_metrics = {"start": time.perf_counter(), "total": None, "folder_count": 0}
+        self._load_metrics = RunMetrics("load_eagle_files", library=eagle_folder)
+        self.scan_status_var.set("正在列举文件夹...")
+        threading.Thread(
+            target=self._scan_worker,
+            args=(eagle_folder, images_folder, scan_queue, self._load_metrics),
+            daemon=True
+        ).start()
+        self.root.after(self.SCAN_POLL_MS, lambda: self._poll_scan_queue(scan_queue, on_loaded))
+    
+    def _scan_worker(self, eagle_folder, images_folder, scan_queue, metrics):
+        """后台扫描线程：并发解析所有.info文件夹，有索引时只解析变化的文件"""
         try:
-            # 扫描images文件夹中所有的子文件夹
-            folder_count = 0
-            for folder_name in os.listdir(images_folder):
-                folder_path = os.path.join(images_folder, folder_name)
-                
-                # 只处理文件夹，而且是以.info结尾的
-                if os.path.isdir(folder_path) and folder_name.endswith(".info"):
-                    folder_count += 1
-                    
-                    # 文件ID (去掉.info后缀)
-                    file_id = folder_name[:-5] if folder_name.endswith(".info") else folder_name
-                    
-                    # 查找metadata.json文件
-                    metadata_file = os.path.join(folder_path, "metadata.json")
-                    if os.path.exists(metadata_file):
-                        try:
-                            # 直接以文本形式读取原始内容
-                            with open(metadata_file, 'r', encoding='utf-8') as f:
-                                raw_content = f.read()
-                            
-                            # 尝试检测文件中是否有Unicode转义序列
-                            has_unicode_escapes = '\\u' in raw_content
-                            
-                            # 解析JSON
-                            metadata = json.loads(raw_content)
-                            
-                            # 获取文件名
-                            file_name = metadata.get("name", "未知")
-                            
-                            # 如果原始文件包含Unicode转义序列并且文件名看起来不正确
-                            if has_unicode_escapes and ('\\u' in file_name or not re.search('[\u4e00-\u9fff]', file_name)):
-                                # 尝试直接从原始内容中提取name字段的值
-                                name_match = re.search(r'"name"\s*:\s*"(.*?)"', raw_content)
-                                if name_match:
-                                    # 提取匹配的name值并解码Unicode转义序列
-                                    raw_name = name_match.group(1)
-                                    try:
-                                        file_name = raw_name.encode('utf-8').decode('unicode_escape')
-                                    except Exception:
-                                        # 如果解码失败，保留原始名称
-                                        file_name = raw_name
-                            
-                            # 获取文件类型
-                            file_ext = metadata.get("ext", "").lower()
-                            
-                            # 找到对应的实际文件
-                            actual_files = [f for f in os.listdir(folder_path) 
-                                          if os.path.isfile(os.path.join(folder_path, f)) 
-                                          and not f.endswith('.json') 
-                                          and not f.endswith('.png')]
-                            
-                            actual_file = actual_files[0] if actual_files else None
-                            
-                            # 保存文件信息
-                            file_info = {
-                                "id": file_id,
-                                "folder": folder_path,
-                                "metadata_file": metadata_file,
-                                "name": file_name,
-                                "type": file_ext,
-                                "actual_file": actual_file,
-                                "metadata": metadata
-                            }
-                            
-                            self.eagle_files.append(file_info)
-                            
-                            # 添加到界面
-                            self.file_tree.insert("", "end", values=(
-                                folder_count,
-                                file_id,
-                                file_name,
-                                file_ext.upper()
-                            ))
-                        except Exception as e:
-                            print(f"处理文件{metadata_file}时发生错误: {str(e)}")
+            with metrics.phase("列举文件夹"):
+                folders = list_info_folders(images_folder)
+            scan_queue.put(("total", len(folders)))
+            
+            # 读取持久化索引，索引不可用时退回完整扫描
+            index = None
+            cached = None
+            mtimes = None
+            try:
+                with metrics.phase("读取索引"):
+                    index = EagleIndex(eagle_folder)
+                    cached = index.load(images_folder)
+            except (sqlite3.Error, OSError) as e:
+                index = None
+                scan_queue.put(("log", f"索引不可用，将进行完整扫描: {str(e)}"))
             
-            print(f"扫描完成，共找到 {folder_count} 个Eagle文件，有效文件 {len(self.eagle_files)} 个")
+            # 有索引时读取库根目录的mtime.json，记录Eagle中的修改时间
+            if index is not None:
+                mtimes = read_library_mtimes(eagle_folder, folders)
+                if mtimes is None:
+                    scan_queue.put(("log", "mtime.json不存在或与文件夹不一致，索引中不记录Eagle的修改时间"))
             
-            if not self.eagle_files:
-                messagebox.showinfo("提示", "未找到Eagle文件，请确认选择了正确的Eagle库文件夹。")
+            def on_error(metadata_file, error):
+                scan_queue.put(("log", f"处理文件{metadata_file}时发生错误: {str(error)}"))
             
+            records = []
+            name_index = NgramIndex()
+            items = iter_eagle_items(folders, on_error=on_error, cached=cached, mtimes=mtimes, metrics=metrics)
+            for batch in iter_batches(items):
+                # 已经开始了新的扫描，放弃本次扫描
+                if scan_queue is not self._scan_queue:
+                    return
+                records.extend(batch)
+                scan_queue.put(("records", batch))
+                # 在后台线程中建立文件名搜索索引
+                with metrics.phase("建立搜索索引", len(batch)):
+                    for item in batch:
+                        name_index.add(item.id, item.name)
+            scan_queue.put(("name_index", name_index))
+            
+            if index is not None:
+                try:
+                    with metrics.phase("更新索引", len(records)):
+                        updated, removed = index.sync(records, cached)
+                    scan_queue.put(("log", f"索引已更新：{updated} 个文件有变化，移除 {removed} 个"))
+                except sqlite3.Error as e:
+                    scan_queue.put(("log", f"更新索引失败: {str(e)}"))
+            
+            scan_queue.put(("done", len(folders)))
         except Exception as e:
-            messagebox.showerror("错误", f"扫描Eagle文件夹时发生错误: {str(e)}")
+            scan_queue.put(("failed", e))
+    
+    def _update_scan_status(self):
+        """更新“已扫描 N / M”进度"""
+        total = self.last_scan_metrics.get("total")
+        if total is None:
+            self.scan_status_var.set("正在列举文件夹...")
+        else:
+            self.scan_status_var.set(f"已扫描 {len(self.eagle_files)} / {total}")
+    
+    def _poll_scan_queue(self, scan_queue, on_loaded=None):
+        """在界面线程中接收扫描结果，刷新列表的可见区域"""
+        # 已经开始了新的扫描，丢弃旧结果
+        if scan_queue is not self._scan_queue:
+            return
+        
+        done = False
+        while True:
+            try:
+                message = scan_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            kind = message[0]
+            if kind == "total":
+                self.last_scan_metrics["total"] = message[1]
+            elif kind == "records":
+                start = time.perf_counter()
+                self.eagle_files.extend(message[1])
+                self._load_metrics.add("表格插入", time.perf_counter() - start, len(message[1]))
+            elif kind == "name_index":
+                self.name_index = message[1]
+            elif kind == "log":
+                print(message[1])
+            elif kind == "failed":
+                self._scan_queue = None
+                self.scan_status_var.set("")
+                messagebox.showerror("错误", f"扫描Eagle文件夹时发生错误: {str(message[1])}")
+                return
+            elif kind == "done":
+                self._scan_queue = None
+                self.last_scan_metrics["folder_count"] = message[1]
+                done = True
+        
+        # 虚拟列表只需要刷新可见的行，与已加载的数量无关
+        with self._load_metrics.phase("刷新列表"):
+            self.file_tree.refresh()
+        self._update_scan_status()
+        
+        # 记录首行显示耗时
+        if self.eagle_files and "time_to_first_row" not in self.last_scan_metrics:
+            self.root.update_idletasks()
+            self.last_scan_metrics["time_to_first_row"] = time.perf_counter() - self.last_scan_metrics["start"]
+        
+        if done:
+            self._finish_scan(on_loaded)
+            return
+        
+        self.root.after(self.SCAN_POLL_MS, lambda: self._poll_scan_queue(scan_queue, on_loaded))
+    
+    def _finish_scan(self, on_loaded=None):
+        """扫描和表格插入全部完成"""
+        metrics = self.last_scan_metrics
+        metrics["elapsed"] = time.perf_counter() - metrics["start"]
+        folder_count = metrics["folder_count"]
+        
+        print(f"扫描完成，共找到 {folder_count} 个Eagle文件，有效文件 {len(self.eagle_files)} 个")
+        if "time_to_first_row" in metrics:
+            print(f"首行显示耗时 {metrics['time_to_first_row'] * 1000:.0f} 毫秒，总耗时 {metrics['elapsed']:.2f} 秒")
+        
+        if not self.eagle_files:
+            messagebox.showinfo("提示", "未找到Eagle文件，请确认选择了正确的Eagle库文件夹。")
+        
+        run = self._load_metrics
+        with run.phase("排序和筛选", len(self.eagle_files)):
+            # 扫描结果按扫描顺序加入，恢复当前的排序方式和筛选
+            self.eagle_files.sort_by(self.SORT_FIELDS[self.sort_column], self.sort_reverse)
+            self.apply_filter()
+            
+            # 预先建立前缀和文件组索引，自动选择时直接查找
+            self.view.prefix_index()
+        
+        run.info["files"] = len(self.eagle_files)
+        if "time_to_first_row" in metrics:
+            run.info["time_to_first_row"] = round(metrics["time_to_first_row"], 3)
+        record_run(run, self.run_metrics)
+        
+        if self.watch_var.get():
+            self.start_watch()
+        
+        if on_loaded:
+            on_loaded()
+    
+    def toggle_watch(self):
+        """切换监视模式"""
+        if self.watch_var.get():
+            # 库正在加载时，加载完成后会自动开始监视
+            if self.eagle_folder and self._scan_queue is None:
+                self.start_watch()
+        else:
+            self.stop_watch()
+            print("已停止监视Eagle库")
+    
+    def start_watch(self):
+        """开始监视当前Eagle库"""
+        self.stop_watch()
+        
+        # 用扫描时记录的metadata.json状态作为初始快照，避免重新统计整个库
+        snapshot = {item.id: (item.metadata_mtime, item.metadata_size) for item in self.eagle_files}
+        watch_queue = queue.Queue()
+        self._watch_queue = watch_queue
+        self.watcher = LibraryWatcher(
+            os.path.join(self.eagle_folder, "images"),
+            on_changes=lambda changes: watch_queue.put(("changes", changes)),
+            snapshot=snapshot,
+            on_log=lambda message: watch_queue.put(("log", message))
+        )
+        self.watcher.start()
+        self.root.after(self.WATCH_POLL_MS, lambda: self._poll_watch_queue(watch_queue))
+        print(f"开始监视Eagle库: {self.eagle_folder}")
+    
+    def stop_watch(self):
+        """停止监视"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+    
+    def _poll_watch_queue(self, watch_queue):
+        """在界面线程中应用监视器发现的变化"""
+        if watch_queue is not self._watch_queue or self.watcher is None:
+            return
+        
+        while True:
+            try:
+                kind, payload = watch_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            if kind == "log":
+                print(payload)
+            else:
+                self._apply_library_changes(payload)
+        
+        self.root.after(self.WATCH_POLL_MS, lambda: self._poll_watch_queue(watch_queue))
+    
+    def _apply_library_changes(self, changes):
+        """把单个文件的新增、删除和修改应用到eagle_files和表格"""
+        added = 0
+        removed = 0
+        modified = 0
+        for kind, file_id, new_item in changes:
+            item = self.eagle_files.get(file_id)
+            
+            if kind == "removed":
+                if item is None:
+                    continue
+                self.eagle_files.remove(file_id)
+                self.name_index.remove(file_id)
+                self.file_tree.discard(file_id)
+                removed += 1
+            elif item is not None:
+                # 原地更新，保持已选择文件的引用有效
+                if (item.name, item.ext, item.actual_file) != (new_item.name, new_item.ext, new_item.actual_file):
+                    modified += 1
+                item.update_from(new_item)
+                self.eagle_files.invalidate(item)
+                self.name_index.add(file_id, item.name)
+            else:
+                self.eagle_files.append(new_item)
+                self.name_index.add(file_id, new_item.name)
+                added += 1
+        
+        # 文件名可能变化，重新筛选
+        self._filter_result = None
+        self.apply_filter()
+        
+        if added or removed or modified:
+            print(f"Eagle库有变化：新增 {added} 个，删除 {removed} 个，修改 {modified} 个")
     
     def sort_tree_column(self, column):
         """对树形控件的指定列进行排序"""
@@ -382,70 +606,58 @@ class EagleRenamerApp:
                 self.sort_reverse = False
                 self.sort_column = column
             
-            # 获取所有项目
-            items = self.file_tree.get_children("")
-            
-            # 保存当前选择
-            selected_ids = [self.file_tree.item(item_id, 'values')[1] for item_id in self.file_tree.selection()]
+            # 使用缓存的排序键原地重排，切换方向时只反转
+            self.eagle_files.sort_by(self.SORT_FIELDS[column], self.sort_reverse)
             
-            # 清空树形控件
-            self.file_tree.delete(*items)
-            
-            # 获取排序索引
-            column_index = {"序号": 0, "文件ID": 1, "文件名": 2, "类型": 3}[column]
-            
-            # 排序Eagle文件列表
-            if column == "序号":
-                # 序号是数字，需要转换
-                sorted_files = sorted(
-                    self.eagle_files,
-                    key=lambda x: int(self.file_tree.set(x, column_index)) if x.get(column_index, "").isdigit() else 0,
-                    reverse=self.sort_reverse
-                )
-            elif column == "文件名":
-                # 按文件名排序
-                sorted_files = sorted(
-                    self.eagle_files, 
-                    key=lambda x: x["name"].lower(),
-                    reverse=self.sort_reverse
-                )
-            else:
-                # 其他列使用普通字符串排序
-                sorted_files = sorted(
-                    self.eagle_files,
-                    key=lambda x: str(x.get(column.lower(), "")),
-                    reverse=self.sort_reverse
-                )
-            
-            # 更新Eagle文件列表
-            self.eagle_files = sorted_files
-            
-            # 重新填充树形控件
-            for i, file_info in enumerate(sorted_files):
-                self.file_tree.insert("", "end", values=(
-                    i+1,  # 重新编号
-                    file_info["id"],
-                    file_info["name"],
-                    file_info["type"].upper()
-                ))
-            
-            # 恢复选择
-            for item_id in self.file_tree.get_children(""):
-                if self.file_tree.item(item_id, 'values')[1] in selected_ids:
-                    self.file_tree.selection_add(item_id)
+            # 选择按文件ID保存，排序后只需按新顺序重建显示的列表
+            self._show_filtered()
             
             # 更新选择状态
             self.on_file_select(None)
             
             print(f"已按{column}{'降序' if self.sort_reverse else '升序'}排序")
     
+    def apply_filter(self):
+        """按筛选框中的文本筛选显示的文件"""
+        query = self.filter_var.get().strip()
+        if not query or self._scan_queue is not None:
+            # 扫描期间先显示全部文件，扫描完成后再筛选
+            self._filter_result = None
+        else:
+            # 在上一次较短查询的结果中继续缩小范围
+            within = None
+            if self._filter_result is not None and self._filter_result[0] in query:
+                within = self._filter_result[1]
+            self._filter_result = (query, self.name_index.search(query, within))
+        self._show_filtered()
+    
+    def _show_filtered(self):
+        """按eagle_files的当前顺序显示筛选结果"""
+        if self._filter_result is None or len(self._filter_result[1]) == len(self.eagle_files):
+            view = self.eagle_files
+        else:
+            ids = sorted(self._filter_result[1], key=self.eagle_files.position)
+            view = EagleItemStore(self.eagle_files.get(file_id) for file_id in ids)
+        
+        if view is self.view:
+            self.file_tree.refresh()
+        else:
+            self.view = view
+            self.file_tree.set_items(view)
+        # 只有显示出来的已选文件参与预览和重命名
+        self.selected_files = self.file_tree.selection_items()
+    
+    def _names_changed(self, items):
+        """重命名之后更新排序键、搜索索引和筛选结果"""
+        for item in items:
+            self.eagle_files.invalidate(item)
+            self.name_index.add(item.id, item.name)
+        self._filter_result = None
+        self.apply_filter()
+    
     def on_file_select(self, event):
         """处理文件选择事件"""
-        self.selected_files = []
-        for item_id in self.file_tree.selection():
-            item_index = self.file_tree.index(item_id)
-            if 0 <= item_index < len(self.eagle_files):
-                self.selected_files.append(self.eagle_files[item_index])
+        self.selected_files = self.file_tree.selection_items()
         
         print(f"已选择 {len(self.selected_files)} 个文件")
     
@@ -465,37 +677,40 @@ class EagleRenamerApp:
         start_prefix_str = f"{start_prefix:02d}"
         print(f"查找前缀为 {start_prefix_str} 的文件...")
         
-        found = False
-        first_matching_item = None
-        
-        # 首先找到第一个匹配的文件
-        for i, item_id in enumerate(self.file_tree.get_children()):
-            item_values = self.file_tree.item(item_id, 'values')
-            file_name = item_values[2]  # 文件名在第3列
-            
-            if file_name.startswith(start_prefix_str):
-                first_matching_item = item_id
-                found = True
-                break
+        # 通过前缀索引找到第一个匹配的文件
+        start_index = self.view.prefix_index().first_with_prefix(start_prefix_str)
         
         # 如果找到了匹配的文件，选择从该文件到最后的所有文件
-        if found and first_matching_item:
-            items = self.file_tree.get_children()
-            start_index = items.index(first_matching_item)
-            
-            for item in items[start_index:]:
-                self.file_tree.selection_add(item)
+        if start_index >= 0:
+            self.file_tree.select_range(start_index, len(self.view) - 1)
             
             # 更新选择状态
             self.on_file_select(None)
             
             # 自动滚动到第一个选中的项目
-            self.file_tree.see(first_matching_item)
+            self.file_tree.see(start_index)
             
             print(f"已自动选择 {len(self.selected_files)} 个文件，从前缀 {start_prefix_str} 开始")
         else:
             messagebox.showinfo("提示", f"未找到前缀为 {start_prefix_str} 的文件")
     
+    def select_current_group(self):
+        """选择第一个选中文件所在的连续文件组"""
+        if not self.selected_files:
+            messagebox.showwarning("警告", "请先选择文件组中的一个文件!")
+            return
+        
+        position = self.view.position(self.selected_files[0].id)
+        if position < 0:
+            return
+        
+        start, end = self.view.prefix_index().group_run(position)
+        self.file_tree.select_range(start, end)
+        self.on_file_select(None)
+        self.file_tree.see(start)
+        
+        print(f"已选择文件组中的 {end - start + 1} 个文件")
+    
     def preview_rename(self):
         """预览重命名结果"""
         # 如果没有选择文件，自动尝试基于起始索引选择
@@ -544,66 +759,25 @@ class EagleRenamerApp:
             messagebox.showwarning("警告", "没有文件可以重命名。")
             return
         
-        # 计算新前缀 - 修复递增逻辑
-        if mode == "increment":
-            # 递增模式：使用起始索引值+1
-            current_prefix = min(99, start_prefix + 1)  # 限制最大为99
-            change_text = "递增为"
-        else:
-            # 递减模式：使用起始索引值-1
-            current_prefix = max(1, start_prefix - 1)  # 最小为01
-            change_text = "递减为"
-        
-        print(f"\n预览重命名结果，起始索引 {start_prefix:02d} {change_text} {current_prefix:02d}")
-        
-        # 生成预览数据
-        original_names = []
-        new_names = []
-        
-        # 提取文件组并进行重命名
-        last_group = None
-        
-        for i, file_info in enumerate(self.selected_files):
-            original_name = file_info["name"]
-            original_names.append(original_name)
-            
-            # 提取文件组名
-            match_group = re.match(r'^(\d+)([^0-9]+)', original_name)
-            file_group = match_group.group(2) if match_group else None
-            
-            if not file_group:
-                print(f"跳过 {original_name}（无法识别文件组）")
-                new_names.append(original_name)  # 保持原名
-                preview_tree.insert("", "end", values=(i+1, original_name, original_name))
-                continue
-            
-            # 如果是新的文件组，根据递增/递减选项调整前缀数字
-            if last_group is not None and file_group != last_group:
-                # 无论递增或递减模式，新组前缀都递增
-                current_prefix = min(99, current_prefix + 1)  # 限制最大为99
-                print(f"\n检测到新文件组 '{file_group}'，前缀递增至 {current_prefix:02d}")
-            
-            last_group = file_group
-            
-            # 提取当前文件名的数字前缀和剩余部分
-            match = re.match(r'^(\d+)(.*?)$', original_name)
-            if match:
-                prefix, rest = match.groups()
-                
-                # 创建新文件名（保持原有前缀的位数）
-                new_name = f"{current_prefix:0{len(prefix)}d}{rest}"
-                new_names.append(new_name)
-                
-                # 添加到预览表格，高亮显示变化
-                item = preview_tree.insert("", "end", values=(i+1, original_name, new_name))
-                
-                # 如果前缀变化了，设置不同的颜色
-                if prefix != f"{current_prefix:0{len(prefix)}d}":
-                    preview_tree.item(item, tags=("changed",))
-            else:
-                # 如果不符合预期格式，保持原名
-                new_names.append(original_name)
-                preview_tree.insert("", "end", values=(i+1, original_name, original_name))
+        # 计算重命名计划（预览和执行使用同一份缓存的结果）；记下生成计划时的文件，
+        # 预览窗口打开期间选择发生变化也不影响执行
+        files = list(self.selected_files)
+        plan_start = time.perf_counter()
+        plan = build_plan([file_info.name for file_info in files], start_prefix, mode)
+        plan_time = time.perf_counter() - plan_start
+        change_text = "递增为" if mode == "increment" else "递减为"
+        
+        print(f"\n预览重命名结果，起始索引 {start_prefix:02d} {change_text} {plan.first_prefix:02d}")
+        for message in plan.messages():
+            print(message)
+        
+        # 添加到预览表格，前缀变化的文件高亮显示
+        for i, (old_name, new_name, changed) in enumerate(zip(plan.old_names, plan.new_names, plan.changed)):
+            preview_tree.insert(
+                "", "end",
+                values=(i+1, old_name, new_name),
+                tags=("changed",) if changed else ()
+            )
         
         # 添加颜色标记
         preview_tree.tag_configure("changed", background="#FFEEEE")
@@ -618,7 +792,8 @@ class EagleRenamerApp:
         execute_btn = ttk.Button(
             button_frame, 
             text="执行重命名", 
-            command=lambda: [self.execute_rename_with_data(original_names, new_names), preview_window.destroy()]
+            command=lambda: [self.execute_rename_with_data(files, plan.old_names, plan.new_names, plan_time),
+                             preview_window.destroy()]
         )
         execute_btn.pack(side=tk.RIGHT, padx=5)
     
@@ -641,191 +816,244 @@ class EagleRenamerApp:
         start_prefix = self.start_index.get()
         mode = self.prefix_mode.get()
         
-        # 生成重命名数据
-        original_names = []
-        new_names = []
-        
         # 检查是否有文件可以重命名
         if not self.selected_files:
             messagebox.showwarning("警告", "没有文件可以重命名。")
             return
         
-        # 计算新前缀 - 修复递增逻辑
-        if mode == "increment":
-            # 递增模式：使用起始索引值+1
-            current_prefix = min(99, start_prefix + 1)  # 限制最大为99
-            change_text = "递增为"
-        else:
-            # 递减模式：使用起始索引值-1
-            current_prefix = max(1, start_prefix - 1)  # 最小为01
-            change_text = "递减为"
-        
-        print(f"\n执行重命名，起始索引 {start_prefix:02d} {change_text} {current_prefix:02d}")
+        # 计算重命名计划，刚预览过时直接使用缓存的结果
+        files = list(self.selected_files)
+        plan_start = time.perf_counter()
+        plan = build_plan([file_info.name for file_info in files], start_prefix, mode)
+        plan_time = time.perf_counter() - plan_start
+        change_text = "递增为" if mode == "increment" else "递减为"
         
-        # 提取文件组并进行重命名
-        last_group = None
-        
-        for i, file_info in enumerate(self.selected_files):
-            original_name = file_info["name"]
-            original_names.append(original_name)
-            
-            # 提取文件组名
-            match_group = re.match(r'^(\d+)([^0-9]+)', original_name)
-            file_group = match_group.group(2) if match_group else None
-            
-            if not file_group:
-                print(f"跳过 {original_name}（无法识别文件组）")
-                new_names.append(original_name)  # 保持原名
-                continue
-            
-            # 如果是新的文件组，根据递增/递减选项调整前缀数字
-            if last_group is not None and file_group != last_group:
-                # 无论递增或递减模式，新组前缀都递增
-                current_prefix = min(99, current_prefix + 1)  # 限制最大为99
-                print(f"\n检测到新文件组 '{file_group}'，前缀递增至 {current_prefix:02d}")
-            
-            last_group = file_group
-            
-            # 提取当前文件名的数字前缀和剩余部分
-            match = re.match(r'^(\d+)(.*?)$', original_name)
-            if match:
-                prefix, rest = match.groups()
-                
-                # 创建新文件名（保持原有前缀的位数）
-                new_name = f"{current_prefix:0{len(prefix)}d}{rest}"
-                new_names.append(new_name)
-            else:
-                # 如果不符合预期格式，保持原名
-                new_names.append(original_name)
+        print(f"\n执行重命名，起始索引 {start_prefix:02d} {change_text} {plan.first_prefix:02d}")
+        for message in plan.messages():
+            print(message)
         
         # 执行重命名
-        self.execute_rename_with_data(original_names, new_names)
+        self.execute_rename_with_data(files, plan.old_names, plan.new_names, plan_time)
     
-    def execute_rename_with_data(self, original_names, new_names):
-        """使用预生成的数据执行重命名"""
-        if len(original_names) != len(new_names) or len(original_names) != len(self.selected_files):
-            messagebox.showerror("错误", "重命名数据不匹配，操作取消。")
+    def execute_rename_with_data(self, files, original_names, new_names, plan_time=None):
+        """使用预生成的数据执行重命名
+        
+        files为生成计划时的文件列表，与original_names一一对应；
+        plan_time为生成重命名计划的耗时（秒），记入性能统计
+        """
+        files = list(files)
+        if (len(original_names) != len(new_names)
+                or [file_info.name for file_info in files] != list(original_names)):
+            messagebox.showerror("错误", "文件名在生成计划后已发生变化，操作取消。请重新预览。")
             return
         
-        # 创建进度条
-        progress_window = tk.Toplevel(self.root)
-        progress_window.title("重命名进行中")
-        progress_window.geometry("400x100")
-        progress_window.resizable(False, False)
-        progress_window.transient(self.root)
+        # 进度窗口由事件总线刷新，后台线程不直接访问控件
+        dialog = ProgressDialog(self.root, self.bus, "rename", "重命名进行中", "正在重命名文件，请稍候...")
         
-        progress_frame = ttk.Frame(progress_window, padding="20")
-        progress_frame.pack(fill=tk.BOTH, expand=True)
+        # Tk变量只能在界面线程中读取
+        try:
+            max_workers = max(1, self.apply_workers.get())
+        except tk.TclError:
+            max_workers = DEFAULT_APPLY_WORKERS
         
-        ttk.Label(progress_frame, text="正在重命名文件，请稍候...").pack()
+        eagle_folder = self.eagle_folder
+        watching = self.watcher is not None
         
-        progress_bar = ttk.Progressbar(progress_frame, orient="horizontal", length=350, mode="determinate")
-        progress_bar.pack(pady=10)
+        run = RunMetrics("execute_rename_with_data", library=eagle_folder, files=len(files), workers=max_workers)
+        if plan_time is not None:
+            run.add("生成计划", plan_time, len(files))
         
         # 在单独的线程中执行重命名
         def rename_thread():
             success_count = 0
             error_count = 0
+            renamed_files = []
+            log = self.bus.log
             
             try:
-                total = len(self.selected_files)
+                total = len(files)
+                images_folder = os.path.join(eagle_folder, "images")
                 
-                for i, (file_info, new_name) in enumerate(zip(self.selected_files, new_names)):
-                    try:
-                        # 更新进度条
-                        progress = int((i / total) * 100)
-                        progress_bar["value"] = progress
-                        progress_window.update()
-                        
-                        # 获取文件信息
-                        folder_path = file_info["folder"]
-                        metadata_file = file_info["metadata_file"]
-                        actual_file = file_info["actual_file"]
-                        old_name = file_info["name"]
-                        metadata = file_info["metadata"]
-                        
-                        # 1. 修改metadata.json中的name字段
-                        if os.path.exists(metadata_file):
-                            metadata["name"] = new_name
-                            
-                            # 备份原文件
-                            backup_file = f"{metadata_file}.bak"
-                            if os.path.exists(backup_file):
-                                os.remove(backup_file)
-                            shutil.copy2(metadata_file, backup_file)
-                            
-                            # 写入新内容
-                            with open(metadata_file, 'w', encoding='utf-8') as f:
-                                json.dump(metadata, f, ensure_ascii=False)
+                # 整个计划写入日志，中途退出时下次启动可以继续或撤销
+                entries = [
+                    JournalEntry(file_info.id, file_info.name, new_name, file_info.actual_file,
+                                 renamed_actual_file(file_info.actual_file, new_name))
+                    for file_info, new_name in zip(files, new_names)
+                ]
+                # 整批原始名称写入一个备份文件，代替每个文件旁的metadata.json.bak；
+                # 先备份再写日志，备份失败时不会留下没有备份的日志
+                with run.phase("备份", total):
+                    backup_path = write_batch_backup(eagle_folder, entries, max_workers=max_workers)
+                log(f"已备份原文件名到 {backup_path}")
+                
+                with run.phase("写入日志", total):
+                    journal = RenameJournal.create(eagle_folder, entries)
+                
+                # 修改metadata.json中的name字段并重命名实际文件，多个文件并发执行，
+                # 结果按顺序在本线程中汇总，检查点总是覆盖连续完成的前缀
+                results = iter_apply_entries(images_folder, entries, max_workers, run)
+                for i, (file_info, result) in enumerate(zip(files, results)):
+                    entry = result.entry
+                    if result.error is None:
+                        file_info.actual_file = result.actual_file
                         
-                        # 2. 如果有实际文件，重命名实际文件
-                        if actual_file and os.path.exists(os.path.join(folder_path, actual_file)):
-                            # 获取文件扩展名
-                            _, ext = os.path.splitext(actual_file)
-                            
-                            # 创建新文件名
-                            new_actual_file = f"{new_name}{ext}"
-                            
-                            # 重命名文件
-                            os.rename(
-                                os.path.join(folder_path, actual_file),
-                                os.path.join(folder_path, new_actual_file)
-                            )
-                            
-                            # 更新文件信息
-                            file_info["actual_file"] = new_actual_file
+                        # 记录新的文件状态，用于更新索引
+                        if result.metadata_stat is not None:
+                            file_info.metadata_mtime = result.metadata_stat.st_mtime_ns
+                            file_info.metadata_size = result.metadata_stat.st_size
                         
-                        # 更新文件信息
-                        file_info["name"] = new_name
+                        # 更新文件信息，排序键在界面线程中更新
+                        file_info.name = entry.new_name
                         
-                        print(f"重命名成功: {old_name} -> {new_name}")
+                        log(f"重命名成功: {entry.old_name} -> {entry.new_name}")
                         success_count += 1
-                        
-                    except Exception as e:
-                        print(f"重命名失败: {file_info['name']} -> {new_name}")
-                        print(f"错误: {str(e)}")
+                        renamed_files.append(file_info)
+                    else:
+                        log(f"重命名失败: {entry.old_name} -> {entry.new_name}")
+                        log(f"错误: {str(result.error)}")
                         error_count += 1
+                    
+                    journal.checkpoint(i + 1)
+                    self.bus.progress("rename", i + 1, total)
+                
+                journal.finish()
+                
+                # 重命名不会修改Eagle的mtime.json，需要把新文件名写入索引
+                if renamed_files:
+                    try:
+                        with run.phase("更新索引", len(renamed_files)):
+                            EagleIndex(eagle_folder).upsert(renamed_files)
+                    except (sqlite3.Error, OSError) as e:
+                        log(f"更新索引失败: {str(e)}")
+                
+                # 在界面线程中更新排序键、搜索索引和筛选结果
+                self.bus.call(self._names_changed, renamed_files)
                 
-                # 更新UI
-                progress_bar["value"] = 100
-                progress_window.update()
+                # 监视模式下其余变化由监视器同步，否则重新加载文件列表
+                if not watching:
+                    self.bus.call(self.root.after, 500, self.refresh_file_list)
                 
-                # 重新加载文件列表
-                self.root.after(500, self.refresh_file_list)
+                run.info["success"] = success_count
+                run.info["failed"] = error_count
+                self.bus.call(record_run, run, self.run_metrics)
                 
-                # 显示完成消息
-                messagebox.showinfo(
-                    "完成", 
+                # 关闭进度窗口并显示完成消息
+                self.bus.call(dialog.close)
+                self.bus.call(
+                    messagebox.showinfo,
+                    "完成",
                     f"重命名操作完成\n成功: {success_count} 个文件\n失败: {error_count} 个文件"
                 )
                 
-                # 关闭进度窗口
-                progress_window.destroy()
-                
             except Exception as e:
-                messagebox.showerror("错误", f"重命名过程中发生错误: {str(e)}")
-                progress_window.destroy()
+                self.bus.call(dialog.close)
+                self.bus.call(messagebox.showerror, "错误", f"重命名过程中发生错误: {str(e)}")
         
         # 启动线程
         threading.Thread(target=rename_thread).start()
     
+    def check_unfinished_journals(self):
+        """检查并处理上次中断的批量重命名"""
+        for path in RenameJournal.find_unfinished(include_active=True):
+            try:
+                journal = RenameJournal.load(path)
+            except (OSError, ValueError) as e:
+                print(f"无法读取重命名日志{path}: {str(e)}")
+                continue
+            
+            # 其他进程（例如eagle_cli.py）正在执行的重命名，两边同时写入同一批文件会互相破坏
+            if journal.is_active():
+                owner = journal.owner
+                print(f"Eagle库 {journal.eagle_folder} 的批量重命名正在由进程 {owner.get('pid')}"
+                      f"（{owner.get('host')}）执行，暂不处理")
+                continue
+            
+            answer = messagebox.askyesnocancel(
+                "未完成的重命名",
+                f"Eagle库 {journal.eagle_folder} 上次的批量重命名没有完成"
+                f"（已完成 {journal.done} / {len(journal.entries)}）。\n\n"
+                "是：继续完成剩余的文件\n否：撤销这次重命名\n取消：暂不处理"
+            )
+            if answer is None:
+                continue
+            
+            threading.Thread(target=self._recover_journal, args=(journal, answer)).start()
+    
+    def _recover_journal(self, journal, roll_forward):
+        """在后台线程中继续完成或撤销日志中的重命名"""
+        def on_error(entry, error):
+            self.bus.log(f"处理文件{entry.id}时发生错误: {str(error)}")
+        
+        if roll_forward:
+            self.bus.log(f"继续完成上次的批量重命名，从第 {journal.done + 1} 个文件开始...")
+            success, failed = journal.resume(on_error)
+            action = "继续完成"
+        else:
+            self.bus.log("正在撤销上次的批量重命名...")
+            success, failed = journal.rollback(on_error)
+            action = "撤销"
+        
+        self.bus.log(f"已{action}上次的批量重命名：成功 {success} 个，失败 {failed} 个")
+        self._reload_changed_files(journal.eagle_folder, [entry.id for entry in journal.entries])
+    
+    def restore_backup(self):
+        """选择一个批量备份，把其中的文件全部恢复为原始名称"""
+        path = filedialog.askopenfilename(
+            title="选择要恢复的批量备份",
+            initialdir=backup_dir(),
+            filetypes=[("批量备份", "*.jsonl.gz"), ("所有文件", "*.*")]
+        )
+        if not path:
+            return
+        
+        if not messagebox.askyesno("确认恢复", f"确定要把以下备份中的所有文件恢复为原始名称吗？\n\n{path}"):
+            return
+        
+        def restore_thread():
+            def on_error(entry, error):
+                self.bus.log(f"恢复文件{entry.id}时发生错误: {str(error)}")
+            
+            self.bus.log(f"正在从备份恢复: {path}")
+            try:
+                eagle_folder, success, failed, restored_ids = restore_batch_backup(path, on_error)
+            except (OSError, ValueError) as e:
+                self.bus.log(f"无法读取备份{path}: {str(e)}")
+                return
+            
+            self.bus.log(f"恢复完成：成功 {success} 个，失败 {failed} 个")
+            self._reload_changed_files(eagle_folder, restored_ids)
+        
+        threading.Thread(target=restore_thread).start()
+    
+    def _reload_changed_files(self, eagle_folder, file_ids):
+        """在后台线程中直接修改了文件后，使索引失效，当前正在显示这个库时重新加载列表"""
+        # mtime.json没有变化，从索引中移除这些文件，下次加载时重新解析
+        try:
+            EagleIndex(eagle_folder).forget(file_ids)
+        except (sqlite3.Error, OSError) as e:
+            self.bus.log(f"更新索引失败: {str(e)}")
+        
+        self.bus.call(self._refresh_if_showing, eagle_folder)
+    
+    def _refresh_if_showing(self, eagle_folder):
+        """当前正在显示eagle_folder时重新加载文件列表"""
+        if self.eagle_folder and os.path.abspath(self.eagle_folder) == eagle_folder:
+            self.refresh_file_list()
+    
     def refresh_file_list(self):
         """刷新文件列表"""
         if self.eagle_folder:
             # 保存当前选择
-            selected_ids = [file_info["id"] for file_info in self.selected_files]
-            
-            # 重新加载文件
-            self.load_eagle_files()
+            selected_ids = {file_info.id for file_info in self.selected_files}
             
-            # 恢复选择
-            children = self.file_tree.get_children()
-            for i, item_id in enumerate(children):
-                if i < len(self.eagle_files) and self.eagle_files[i]["id"] in selected_ids:
-                    self.file_tree.selection_add(item_id)
+            # 重新加载文件，加载完成后恢复选择
+            def restore_selection():
+                self.file_tree.select_ids(selected_ids)
+                
+                # 更新选择状态
+                self.on_file_select(None)
             
-            # 更新选择状态
-            self.on_file_select(None)
+            self.load_eagle_files(on_loaded=restore_selection)
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,444 @@
+"""
+Eagle资源库扫描引擎 - 使用os.scandir列目录，并用有界线程池并发解析metadata.json
+"""
+import os
+import re
+import json
+import time
+import codecs
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from eagle_store import EagleItem
+
+# 安装了更快的JSON库时自动使用，也可以通过set_json_loads()指定
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# 默认线程数：网络存储上主要耗时在I/O等待，线程数可以明显多于CPU核数
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 每个任务处理的文件夹数量，减少线程池调度开销
+CHUNK_SIZE = 32
+
+# 快速提取name和ext时先读取的字节数，Eagle把这两个字段写在文件开头
+HEAD_SIZE = 4096
+
+_CJK_RE = re.compile('[\u4e00-\u9fff]')
+_RAW_NAME_RE = re.compile(r'"name"\s*:\s*"(.*?)"')
+_FIELD_RE = re.compile(r'"(name|ext)"\s*:\s*"')
+
+
+def set_json_loads(loads):
+    """指定解析metadata.json使用的函数，例如orjson.loads"""
+    global json_loads
+    json_loads = loads
+
+
+def load_metadata(metadata_file):
+    """
+    完整读取并解析metadata.json，只在需要修改文件时调用
+
+    Args:
+        metadata_file: metadata.json路径
+
+    Returns:
+        dict: metadata
+    """
+    with open(metadata_file, 'r', encoding='utf-8') as f:
+        return json_loads(f.read())
+
+
+def fix_unicode_name(text):
+    """修复Eagle元数据中的Unicode编码问题"""
+    if not text or not isinstance(text, str):
+        return text
+
+    # 检查是否可能是Unicode转义序列形式
+    if '\\u' in repr(text) and not '\\u' in text:
+        # 原始的JSON解析已经将Unicode转义序列转换为Unicode字符
+        return text
+    elif '\\u' in text:
+        # 如果文本中直接包含'\u'序列，尝试解码
+        try:
+            # 将原始字符串中的Unicode转义序列直接解码
+            return text.encode('utf-8').decode('unicode_escape')
+        except Exception:
+            pass
+
+    return text
+
+
+def list_info_folders(images_folder):
+    """
+    列出images文件夹中所有以.info结尾的子文件夹
+
+    Args:
+        images_folder: Eagle库的images文件夹路径
+
+    Returns:
+        list: [(文件ID, 文件夹路径), ...]，顺序与目录返回顺序一致
+    """
+    folders = []
+    with os.scandir(images_folder) as it:
+        for entry in it:
+            # 先判断后缀，避免对无关条目调用is_dir
+            if entry.name.endswith(".info") and entry.is_dir():
+                folders.append((entry.name[:-5], entry.path))
+    return folders
+
+
+def read_library_mtimes(eagle_folder, folders):
+    """
+    读取Eagle库根目录的mtime.json（文件ID到修改时间的映射）
+
+    只有当mtime.json与images中的.info文件夹一一对应时才返回，
+    文件不存在、无法解析或内容不一致时返回None，调用方应改为完整扫描。
+
+    Args:
+        eagle_folder: Eagle库文件夹路径
+        folders: list_info_folders()返回的列表
+
+    Returns:
+        dict: {文件ID: 修改时间}，或None
+    """
+    try:
+        with open(os.path.join(eagle_folder, "mtime.json"), 'r', encoding='utf-8') as f:
+            mtimes = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(mtimes, dict):
+        return None
+
+    # "all"记录的是文件总数，不是文件ID
+    mtimes.pop("all", None)
+
+    if len(mtimes) != len(folders):
+        return None
+    for file_id, _ in folders:
+        value = mtimes.get(file_id)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return None
+    return mtimes
+
+
+def decode_item_name(raw_content, metadata):
+    """
+    从metadata中取出文件名，并处理原始内容中残留的Unicode转义序列
+
+    Args:
+        raw_content: metadata.json的原始文本
+        metadata: 解析后的metadata字典
+
+    Returns:
+        str: 文件名
+    """
+    file_name = metadata.get("name", "未知")
+
+    # 如果原始文件包含Unicode转义序列并且文件名看起来不正确
+    if '\\u' in raw_content and ('\\u' in file_name or not _CJK_RE.search(file_name)):
+        # 尝试直接从原始内容中提取name字段的值
+        name_match = _RAW_NAME_RE.search(raw_content)
+        if name_match:
+            # 提取匹配的name值并解码Unicode转义序列
+            raw_name = name_match.group(1)
+            try:
+                file_name = raw_name.encode('utf-8').decode('unicode_escape')
+            except Exception:
+                # 如果解码失败，保留原始名称
+                file_name = raw_name
+
+    return file_name
+
+
+def extract_name_fields(text):
+    """
+    不解析整个JSON，直接从文本中取出顶层的name和ext字段
+
+    只有能确定字段位于顶层时才返回结果：字段之前只能出现最外层的一个'{'，
+    不能出现'['。其他情况（包括字段不完整）返回None，由调用方完整解析。
+
+    Args:
+        text: metadata.json的文本（可以只是开头部分）
+
+    Returns:
+        tuple: (name, ext)，或None
+    """
+    fields = {}
+    for match in _FIELD_RE.finditer(text):
+        key = match.group(1)
+        if key in fields:
+            continue
+        prefix = text[:match.start()]
+        if prefix.count('{') != 1 or '[' in prefix:
+            return None
+        try:
+            value, _ = json.decoder.scanstring(text, match.end())
+        except ValueError:
+            # 字符串在已读取的部分中没有结束
+            return None
+        fields[key] = value
+        if len(fields) == 2:
+            name = fields["name"]
+            if '\\u' in name:
+                name = fix_unicode_name(name)
+            return name, fields["ext"]
+    return None
+
+
+def read_name_fields(metadata_file):
+    """
+    读取metadata.json中的name和ext，尽量只读取文件开头并跳过完整解析
+
+    Args:
+        metadata_file: metadata.json路径
+
+    Returns:
+        tuple: (name, ext)
+    """
+    with open(metadata_file, 'rb') as f:
+        head = f.read(HEAD_SIZE)
+        # 增量解码，截断在多字节字符中间时保留不完整的字节
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        text = decoder.decode(head)
+
+        fields = extract_name_fields(text)
+        if fields is None and len(head) == HEAD_SIZE:
+            text += decoder.decode(f.read(), final=True)
+            fields = extract_name_fields(text)
+
+    if fields is not None:
+        return fields
+
+    # 无法快速提取时完整解析
+    metadata = json_loads(text)
+    return decode_item_name(text, metadata), metadata.get("ext", "")
+
+
+def parse_item_folder(file_id, folder_path, images_folder=None):
+    """
+    解析单个.info文件夹，一次scandir同时找到metadata.json和实际文件
+
+    Args:
+        file_id: 文件ID（文件夹名去掉.info后缀）
+        folder_path: .info文件夹路径
+        images_folder: 所属的images文件夹，传入同一个字符串可让所有记录共用
+
+    Returns:
+        EagleItem: 文件信息；如果文件夹中没有metadata.json则返回None
+    """
+    metadata_file = None
+    metadata_stat = None
+    actual_files = []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            name = entry.name
+            if name == "metadata.json":
+                metadata_file = entry.path
+                # 在读取内容之前记录修改时间，读取期间被修改时下次扫描会重新解析
+                metadata_stat = entry.stat()
+            elif (not name.endswith('.json') and not name.endswith('.png')
+                  and not name.endswith('.json.bak') and entry.is_file()):
+                # 旧版本重命名时留下的metadata.json.bak不是实际文件
+                actual_files.append(name)
+
+    if metadata_file is None:
+        return None
+
+    # 扫描时只需要name和ext，完整的metadata在重命名时才读取
+    file_name, file_ext = read_name_fields(metadata_file)
+
+    return EagleItem(
+        file_id,
+        file_name,
+        file_ext.lower(),
+        actual_files[0] if actual_files else None,
+        images_folder or os.path.dirname(folder_path),
+        metadata_stat.st_mtime_ns,
+        metadata_stat.st_size
+    )
+
+
+def load_item_folder(file_id, folder_path, cached=None, eagle_mtime=None, images_folder=None):
+    """
+    加载单个.info文件夹，尽量使用索引中的记录
+
+    metadata.json的修改时间和大小与索引一致时只需一次stat，不一致时才重新解析。
+    mtime.json中的时间只用于更新索引记录，不能代替stat：本工具的重命名、恢复和
+    中断恢复只写metadata.json，不会修改Eagle的mtime.json。
+
+    Args:
+        file_id: 文件ID
+        folder_path: .info文件夹路径
+        cached: 索引中该文件的记录（EagleItem），没有时为None
+        eagle_mtime: mtime.json中该文件的修改时间，没有时为None
+        images_folder: 所属的images文件夹
+
+    Returns:
+        EagleItem: 文件信息；如果文件夹中没有metadata.json则返回None
+    """
+    if cached is not None:
+        try:
+            st = os.stat(os.path.join(folder_path, "metadata.json"))
+        except FileNotFoundError:
+            return None
+
+        if st.st_mtime_ns == cached.metadata_mtime and st.st_size == cached.metadata_size:
+            if cached.eagle_mtime == eagle_mtime:
+                return cached
+            # 返回新对象，索引同步时才能发现eagle_mtime的变化
+            return EagleItem(
+                file_id,
+                cached.name,
+                cached.ext,
+                cached.actual_file,
+                cached.images_folder,
+                cached.metadata_mtime,
+                cached.metadata_size,
+                eagle_mtime
+            )
+
+    item = parse_item_folder(file_id, folder_path, images_folder)
+    if item is not None:
+        item.eagle_mtime = eagle_mtime
+    return item
+
+
+def _parse_chunk(chunk, cached, mtimes, images_folder, metrics=None):
+    """在工作线程中解析一组文件夹，返回[(文件夹路径, 文件信息, 异常), ...]"""
+    results = []
+    durations = []
+    clock = time.perf_counter
+    for file_id, folder_path in chunk:
+        start = clock()
+        try:
+            item = load_item_folder(file_id, folder_path, cached.get(file_id), mtimes.get(file_id), images_folder)
+            results.append((folder_path, item, None))
+        except Exception as e:
+            results.append((folder_path, None, e))
+        durations.append(clock() - start)
+    if metrics is not None:
+        metrics.record_many("解析文件夹", durations)
+    return results
+
+
+def iter_eagle_items(folders, max_workers=None, on_error=None, cached=None, mtimes=None, metrics=None):
+    """
+    并发解析.info文件夹，按输入顺序逐个产出文件信息
+
+    同时在途的任务数量有上限，内存占用与库的大小无关。
+
+    Args:
+        folders: list_info_folders()返回的列表
+        max_workers: 线程数，默认DEFAULT_WORKERS
+        on_error: 解析失败时的回调 on_error(metadata文件路径, 异常)，在调用方线程中执行
+        cached: EagleIndex.load()返回的索引记录，提供时只重新解析有变化的文件
+        mtimes: read_library_mtimes()的结果，用于更新索引中记录的修改时间
+        metrics: RunMetrics，提供时记录每个文件夹的解析耗时
+
+    Yields:
+        EagleItem: 文件信息
+    """
+    max_workers = max_workers or DEFAULT_WORKERS
+    cached = cached or {}
+    mtimes = mtimes or {}
+    window = max_workers * 2
+    pending = deque()
+
+    # 所有记录共用同一个images文件夹路径字符串
+    images_folder = os.path.dirname(folders[0][1]) if folders else None
+
+    def drain_one():
+        for folder_path, item, error in pending.popleft().result():
+            if error is not None:
+                if on_error:
+                    on_error(os.path.join(folder_path, "metadata.json"), error)
+            elif item is not None:
+                yield item
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for start in range(0, len(folders), CHUNK_SIZE):
+            pending.append(executor.submit(_parse_chunk, folders[start:start + CHUNK_SIZE], cached, mtimes, images_folder,
+                                           metrics))
+            if len(pending) >= window:
+                yield from drain_one()
+        while pending:
+            yield from drain_one()
+    finally:
+        # 调用方提前结束迭代时取消尚未开始的任务
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def iter_batches(items, max_size=500, max_delay=0.05):
+    """
+    把逐个产出的文件信息按批次分组，便于界面分块显示
+
+    第一条记录到达后最多等待max_delay秒就产出一批，保证首批结果尽快显示。
+
+    Args:
+        items: 可迭代对象，例如iter_eagle_items()
+        max_size: 每批最多包含的记录数
+        max_delay: 一批最多等待的秒数
+
+    Yields:
+        list: 一批文件信息
+    """
+    batch = []
+    batch_start = None
+    for item in items:
+        if not batch:
+            batch_start = time.perf_counter()
+        batch.append(item)
+        if len(batch) >= max_size or time.perf_counter() - batch_start >= max_delay:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@contextmanager
+def _timed(metrics, phase):
+    """metrics不为None时记录这段代码的耗时"""
+    if metrics is None:
+        yield
+    else:
+        with metrics.phase(phase):
+            yield
+
+
+def scan_eagle_library(eagle_folder, max_workers=None, on_error=None, index=None, metrics=None):
+    """
+    扫描整个Eagle库
+
+    Args:
+        eagle_folder: Eagle库文件夹路径
+        max_workers: 线程数
+        on_error: 解析失败时的回调
+        index: EagleIndex对象，提供时进行增量扫描并把结果写回索引
+        metrics: RunMetrics，提供时记录各阶段的耗时
+
+    Returns:
+        list: EagleItem列表
+    """
+    images_folder = os.path.join(eagle_folder, "images")
+    with _timed(metrics, "列举文件夹"):
+        folders = list_info_folders(images_folder)
+    cached = None
+    mtimes = None
+    if index is not None:
+        with _timed(metrics, "读取索引"):
+            cached = index.load(images_folder)
+            mtimes = read_library_mtimes(eagle_folder, folders)
+    records = list(iter_eagle_items(folders, max_workers, on_error, cached, mtimes, metrics))
+    if index is not None:
+        with _timed(metrics, "更新索引"):
+            index.sync(records, cached)
+    return records
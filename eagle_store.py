@@ -0,0 +1,280 @@
+"""
+Eagle文件的紧凑存储 - 使用__slots__记录代替字典，并提供按ID的O(1)查找
+"""
+import os
+import sys
+
+from array import array
+
+from name_keys import natural_key, split_prefix_group
+
+# 可排序的字段及其排序键；另有"order"表示加入存储的顺序（即扫描顺序）
+SORT_FIELDS = {
+    "id": lambda item: item.id,
+    "name": lambda item: natural_key(item.name),
+    "ext": lambda item: item.ext,
+}
+
+
+class EagleItem:
+    """Eagle库中的一个文件"""
+
+    __slots__ = ("id", "name", "ext", "actual_file", "images_folder",
+                 "metadata_mtime", "metadata_size", "eagle_mtime")
+
+    def __init__(self, file_id, name, ext, actual_file, images_folder,
+                 metadata_mtime=None, metadata_size=None, eagle_mtime=None):
+        """
+        Args:
+            file_id: 文件ID（.info文件夹名去掉后缀）
+            name: 文件名（不含扩展名）
+            ext: 小写的扩展名
+            actual_file: .info文件夹中实际文件的文件名，没有时为None
+            images_folder: 所属库的images文件夹路径，同一个库的所有记录共用同一个字符串
+            metadata_mtime: metadata.json的修改时间（纳秒）
+            metadata_size: metadata.json的大小
+            eagle_mtime: mtime.json中记录的修改时间
+        """
+        self.id = file_id
+        self.name = name
+        # 扩展名种类很少，驻留后所有记录共用同一个字符串对象
+        self.ext = sys.intern(ext)
+        self.actual_file = actual_file
+        self.images_folder = images_folder
+        self.metadata_mtime = metadata_mtime
+        self.metadata_size = metadata_size
+        self.eagle_mtime = eagle_mtime
+
+    @property
+    def folder(self):
+        """.info文件夹路径"""
+        return os.path.join(self.images_folder, f"{self.id}.info")
+
+    @property
+    def metadata_file(self):
+        """metadata.json路径"""
+        return os.path.join(self.images_folder, f"{self.id}.info", "metadata.json")
+
+    def update_from(self, other):
+        """用另一条记录的内容原地更新，保持已有引用有效"""
+        for attr in self.__slots__:
+            setattr(self, attr, getattr(other, attr))
+
+    def __repr__(self):
+        return f"EagleItem({self.id!r}, {self.name!r}, {self.ext!r})"
+
+
+class PrefixGroupIndex:
+    """
+    按显示顺序建立的前缀和文件组索引
+
+    记录每个数字前缀第一次出现的位置，以及相邻同组文件组成的段，
+    查找"从前缀NN开始"和"某个文件所在的整组"都不需要遍历列表。
+    """
+
+    def __init__(self, items):
+        """
+        Args:
+            items: 按显示顺序排列的EagleItem
+        """
+        self._first = {}  # 数字前缀的开头部分 -> 第一个位置
+        self._run_of = array('l')  # 每个位置所在段的编号
+        self._run_starts = array('l')  # 每段的起始位置
+        last_group = None
+        for position, item in enumerate(items):
+            digits, group = split_prefix_group(item.name)
+            if digits:
+                # "05"既能用"05"也能用"0"查到，与str.startswith的结果一致
+                for length in range(1, len(digits) + 1):
+                    self._first.setdefault(digits[:length], position)
+            if group is None or group != last_group:
+                self._run_starts.append(position)
+            self._run_of.append(len(self._run_starts) - 1)
+            last_group = group
+
+    def first_with_prefix(self, prefix):
+        """
+        查找第一个文件名以指定数字开头的文件
+
+        Args:
+            prefix: 数字字符串，例如"05"
+
+        Returns:
+            int: 文件的位置，没有时返回-1
+        """
+        return self._first.get(prefix, -1)
+
+    def group_run(self, position):
+        """
+        获取某个位置所在文件组段的范围
+
+        Returns:
+            tuple: (起始位置, 结束位置)，包含结束位置
+        """
+        run = self._run_of[position]
+        start = self._run_starts[run]
+        if run + 1 < len(self._run_starts):
+            end = self._run_starts[run + 1] - 1
+        else:
+            end = len(self._run_of) - 1
+        return start, end
+
+
+class EagleItemStore:
+    """
+    按显示顺序保存EagleItem
+
+    记录本身只保存一份，排序只重排引用列表；按ID查找记录和位置都通过字典完成。
+    每个字段的排序键只计算一次并缓存，记录变化时调用invalidate()使其失效。
+    """
+
+    def __init__(self, items=()):
+        self._items = []
+        self._by_id = {}
+        # 文件ID到显示位置的映射，重排后在下一次查找时重建
+        self._positions = None
+        # 前缀和文件组索引，顺序或文件名变化后在下一次查找时重建
+        self._prefix_index = None
+        # {字段: {记录: 排序键}}
+        self._sort_keys = {}
+        # {记录: 加入顺序}
+        self._load_order = {}
+        self._next_order = 0
+        # 当前显示顺序对应的(字段, 是否逆序)，顺序被打乱后为None
+        self._sorted_by = ("order", False)
+        self.extend(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, position):
+        return self._items[position]
+
+    def __contains__(self, file_id):
+        return file_id in self._by_id
+
+    def get(self, file_id, default=None):
+        """按文件ID查找记录"""
+        return self._by_id.get(file_id, default)
+
+    def position(self, file_id):
+        """
+        按文件ID查找记录的显示位置
+
+        Returns:
+            int: 记录的位置，记录不存在时返回-1
+        """
+        if self._positions is None:
+            self._positions = {item.id: i for i, item in enumerate(self._items)}
+        return self._positions.get(file_id, -1)
+
+    def prefix_index(self):
+        """获取当前显示顺序的前缀和文件组索引"""
+        if self._prefix_index is None:
+            self._prefix_index = PrefixGroupIndex(self._items)
+        return self._prefix_index
+
+    def append(self, item):
+        """在末尾添加一条记录"""
+        if self._positions is not None:
+            self._positions[item.id] = len(self._items)
+        self._items.append(item)
+        self._by_id[item.id] = item
+        self._prefix_index = None
+        self._load_order[item] = self._next_order
+        self._next_order += 1
+        if self._sorted_by != ("order", False):
+            self._sorted_by = None
+
+    def extend(self, items):
+        """在末尾添加多条记录"""
+        for item in items:
+            self.append(item)
+
+    def remove(self, file_id):
+        """
+        删除一条记录
+
+        Returns:
+            int: 被删除记录原来的位置，记录不存在时返回-1
+        """
+        position = self.position(file_id)
+        if position < 0:
+            return -1
+        item = self._by_id.pop(file_id)
+        del self._items[position]
+        del self._load_order[item]
+        for keys in self._sort_keys.values():
+            keys.pop(item, None)
+        self._positions = None
+        self._prefix_index = None
+        return position
+
+    def invalidate(self, item):
+        """记录的内容（例如文件名）已改变，丢弃它的排序键"""
+        for keys in self._sort_keys.values():
+            keys.pop(item, None)
+        self._prefix_index = None
+        if self._sorted_by is not None and self._sorted_by[0] != "order":
+            self._sorted_by = None
+
+    def sort_by(self, field, reverse=False):
+        """
+        按字段原地重排显示顺序
+
+        已按同一字段排序时只反转列表，不重新比较。
+
+        Args:
+            field: SORT_FIELDS中的字段名，或"order"表示加入顺序
+            reverse: 是否逆序
+        """
+        if self._sorted_by == (field, reverse):
+            return
+        if self._sorted_by == (field, not reverse):
+            self._items.reverse()
+        else:
+            self._items.sort(key=self._keys_for(field).__getitem__, reverse=reverse)
+        self._sorted_by = (field, reverse)
+        self._positions = None
+        self._prefix_index = None
+
+    def _keys_for(self, field):
+        """返回字段的排序键缓存，补全缺少的记录"""
+        if field == "order":
+            return self._load_order
+        keys = self._sort_keys.setdefault(field, {})
+        if len(keys) != len(self._items):
+            key_func = SORT_FIELDS[field]
+            for item in self._items:
+                if item not in keys:
+                    keys[item] = key_func(item)
+        return keys
+
+    def sort(self, key, reverse=False):
+        """原地重排显示顺序"""
+        self._items.sort(key=key, reverse=reverse)
+        self._positions = None
+        self._prefix_index = None
+        self._sorted_by = None
+
+    def reverse(self):
+        """原地反转显示顺序"""
+        self._items.reverse()
+        self._positions = None
+        self._prefix_index = None
+        if self._sorted_by is not None:
+            self._sorted_by = (self._sorted_by[0], not self._sorted_by[1])
+
+    def clear(self):
+        """清空所有记录"""
+        self._items = []
+        self._by_id = {}
+        self._positions = None
+        self._prefix_index = None
+        self._sort_keys = {}
+        self._load_order = {}
+        self._next_order = 0
+        self._sorted_by = ("order", False)
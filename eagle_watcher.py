@@ -0,0 +1,253 @@
+"""
+Eagle库监视器 - 检测单个.info文件夹的新增、删除和修改
+
+Linux上使用inotify，其他平台或inotify不可用时（例如监视数量超过系统上限）退回定时轮询metadata.json的状态。
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+
+from eagle_scanner import list_info_folders, load_item_folder
+
+# inotify事件标志
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+# images文件夹：关注.info子文件夹的增删
+IMAGES_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+# .info文件夹：关注其中文件的写入、重命名和增删
+ITEM_MASK = (IN_CLOSE_WRITE | IN_MODIFY | IN_ATTRIB | IN_CREATE | IN_DELETE
+             | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def stat_snapshot(folders):
+    """
+    记录每个.info文件夹中metadata.json的状态
+
+    Args:
+        folders: list_info_folders()返回的列表
+
+    Returns:
+        dict: {文件ID: (修改时间, 大小)}
+    """
+    snapshot = {}
+    for file_id, folder_path in folders:
+        try:
+            st = os.stat(os.path.join(folder_path, "metadata.json"))
+        except OSError:
+            continue
+        snapshot[file_id] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+
+class _Inotify:
+    """通过ctypes调用Linux inotify接口的简单封装"""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._ctypes = ctypes
+
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = self._ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read_events(self, timeout):
+        """等待并读取事件，返回[(wd, mask, name), ...]"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LibraryWatcher:
+    """
+    监视Eagle库images文件夹，在后台线程中把变化解析成文件信息后回调
+
+    回调 on_changes([(类型, 文件ID, EagleItem), ...]) 在监视线程中执行，类型为
+    "added"、"removed"或"modified"，"removed"时记录为None。
+    """
+
+    def __init__(self, images_folder, on_changes, snapshot=None, interval=2.0, use_inotify=True, on_log=None):
+        """
+        Args:
+            images_folder: Eagle库的images文件夹路径
+            on_changes: 变化回调
+            snapshot: 初始状态 {文件ID: (修改时间, 大小)}，不提供时启动时自行统计
+            interval: 轮询模式下两次检查之间的秒数
+            use_inotify: 是否尝试使用inotify
+            on_log: 日志回调 on_log(消息)，同样在监视线程中执行
+        """
+        self.images_folder = images_folder
+        self.on_changes = on_changes
+        self.snapshot = dict(snapshot) if snapshot is not None else None
+        self.interval = interval
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+        self.on_log = on_log
+        self.mode = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动监视线程"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止监视（不等待线程结束）"""
+        self._stop_event.set()
+
+    def _run(self):
+        folders = list_info_folders(self.images_folder)
+        if self.snapshot is None:
+            self.snapshot = stat_snapshot(folders)
+
+        if self.use_inotify:
+            try:
+                inotify = _Inotify()
+            except (OSError, AttributeError):
+                inotify = None
+            if inotify is not None:
+                try:
+                    wd_map = self._watch_all(inotify, folders)
+                except OSError as e:
+                    # 监视数量超过fs.inotify.max_user_watches等情况
+                    inotify.close()
+                    self._log(f"inotify不可用({e.strerror})，改为定时轮询")
+                else:
+                    self.mode = "inotify"
+                    try:
+                        self._run_inotify(inotify, wd_map)
+                    finally:
+                        inotify.close()
+                    return
+
+        self.mode = "polling"
+        self._run_polling()
+
+    def _watch_all(self, inotify, folders):
+        """为images文件夹和每个.info文件夹添加监视，返回{wd: 文件ID}，images文件夹对应None"""
+        wd_map = {inotify.add_watch(self.images_folder, IMAGES_MASK): None}
+        for file_id, folder_path in folders:
+            try:
+                wd_map[inotify.add_watch(folder_path, ITEM_MASK)] = file_id
+            except OSError as e:
+                if e.errno in (errno.ENOSPC, errno.ENOMEM):
+                    raise
+        return wd_map
+
+    def _run_inotify(self, inotify, wd_map):
+        dirty = set()
+        dirty_since = 0.0
+        while not self._stop_event.is_set():
+            events = inotify.read_events(0.2)
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    # 事件队列溢出，做一次完整对比
+                    self._emit(self._poll_changes())
+                    continue
+
+                file_id = wd_map.get(wd)
+                if mask & IN_IGNORED:
+                    wd_map.pop(wd, None)
+                    continue
+
+                if file_id is None:
+                    # images文件夹中的.info子文件夹被创建、删除或移动
+                    if not name.endswith(".info"):
+                        continue
+                    file_id = name[:-5]
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        try:
+                            wd_map[inotify.add_watch(os.path.join(self.images_folder, name), ITEM_MASK)] = file_id
+                        except OSError:
+                            pass
+                if not dirty:
+                    dirty_since = time.monotonic()
+                dirty.add(file_id)
+
+            # 事件平息后（或最多积累0.5秒）再统一处理，合并同一文件的多次写入
+            if dirty and (not events or time.monotonic() - dirty_since >= 0.5):
+                self._emit(self._resolve(dirty))
+                dirty = set()
+
+    def _run_polling(self):
+        while not self._stop_event.wait(self.interval):
+            self._emit(self._poll_changes())
+
+    def _poll_changes(self):
+        """重新统计所有metadata.json的状态，与上次的快照对比"""
+        current = stat_snapshot(list_info_folders(self.images_folder))
+        dirty = {file_id for file_id, state in current.items() if self.snapshot.get(file_id) != state}
+        dirty.update(file_id for file_id in self.snapshot if file_id not in current)
+        return self._resolve(dirty)
+
+    def _resolve(self, file_ids):
+        """重新加载有变化的文件，返回变化列表并更新快照"""
+        changes = []
+        for file_id in file_ids:
+            folder_path = os.path.join(self.images_folder, f"{file_id}.info")
+            try:
+                item = load_item_folder(file_id, folder_path, images_folder=self.images_folder) \
+                    if os.path.isdir(folder_path) else None
+            except Exception as e:
+                # 文件可能正在被写入，下一次变化时会重新处理
+                self._log(f"处理文件{folder_path}时发生错误: {str(e)}")
+                continue
+
+            if item is None:
+                if self.snapshot.pop(file_id, None) is not None:
+                    changes.append(("removed", file_id, None))
+            else:
+                kind = "modified" if file_id in self.snapshot else "added"
+                self.snapshot[file_id] = (item.metadata_mtime, item.metadata_size)
+                changes.append((kind, file_id, item))
+        return changes
+
+    def _log(self, message):
+        if self.on_log:
+            self.on_log(message)
+
+    def _emit(self, changes):
+        if changes and not self._stop_event.is_set():
+            self.on_changes(changes)
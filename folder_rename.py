@@ -1,6 +1,23 @@
 import os
 import sys
 import re
+import time
+import glob
+import argparse
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from rename_order import plan_renames, apply_chains
+from dir_snapshot import DirectorySnapshot
+from name_keys import file_name_key
+from metrics import RunMetrics
+
+# 一个文件夹的重命名结果：重命名（或预演时将要重命名）、跳过和失败的文件数量
+RenameResult = namedtuple("RenameResult", ["renamed", "skipped", "failed"])
+
+# 批量模式中一个文件夹的处理结果：error为无法处理时的原因，messages为该文件夹的日志
+FolderResult = namedtuple("FolderResult", ["folder", "result", "error", "messages"])
 
 def get_folder_path():
     """
@@ -35,13 +52,9 @@ def extract_number_prefix(filename):
     Returns:
         tuple: (前缀数字, 剩余部分) 如果没有前缀数字则返回 (None, 原文件名)
     """
-    # 匹配文件名前面的两位数字
-    match = re.match(r'^(\d{2})(.*)$', filename)
-    if match:
-        number = int(match.group(1))
-        rest = match.group(2)
-        return number, rest
-    return None, filename
+    # 匹配文件名前面的两位数字（拆分结果有缓存）
+    key = file_name_key(filename)
+    return key.prefix, key.rest
 
 def get_file_group(filename):
     """
@@ -53,53 +66,58 @@ def get_file_group(filename):
     Returns:
         str: 文件组名称，如果无法提取则返回None
     """
-    # 先提取前缀数字后的部分
-    prefix, rest = extract_number_prefix(filename)
-    
-    # 如果没有数字前缀或提取失败，返回None
-    if rest == filename:
-        return None
-    
-    # 尝试从剩余部分提取主要部分（在第一个数字之前的非数字字符）
-    # 例如从"薛芳菲沈玉容旧家00.mp4"提取"薛芳菲沈玉容旧家"
-    group_match = re.match(r'^([^0-9]+)', rest)
-    if group_match:
-        # 去除前后空格
-        group_name = group_match.group(1).strip()
-        if group_name:
-            return group_name
-    
-    return None
+    # 前缀数字后、第一个数字之前的非数字字符（去除前后空格）
+    # 例如从"01薛芳菲沈玉容旧家00.mp4"提取"薛芳菲沈玉容旧家"；没有数字前缀时为None
+    return file_name_key(filename).group
 
-def rename_files_with_new_prefix(folder_path, files, start_index, mode="increment"):
+def rename_files_with_new_prefix(folder_path, files, start_index, mode="increment", dry_run=False, log=print,
+                                 dir_names=None, metrics=None, progress=None, keys=None):
     """
     从指定索引开始重命名文件，修改前缀数字
+
+    先计算全部文件的新名称，再按plan_renames得到的顺序一次执行，
+    新名称正被其他待改名文件占用时不会冲突。
     
     Args:
         folder_path: 文件夹路径
-        files: 文件列表
+        files: 文件夹中的全部名称（排好序）
         start_index: 从哪个文件开始修改
         mode: 前缀变化模式，"increment"为递增，"decrement"为递减
+        dry_run: 为True时只输出将要进行的重命名，不修改文件
+        log: 输出日志的函数，默认直接print
+        dir_names: 文件夹中子文件夹名称的集合（DirectorySnapshot.dir_names），提供时不再对每一项调用os.path.isdir
+        metrics: RunMetrics，提供时记录生成计划、计划重命名顺序和每个文件重命名的耗时
+        progress: 进度回调 progress(已完成数量, 总数)，每个文件处理完后调用
+        keys: 文件名到拆分结果的映射（DirectorySnapshot.keys），提供时不再重新拆分文件名
+    
+    Returns:
+        RenameResult: 重命名结果，无法开始时返回None
     """
+    if metrics is None:
+        metrics = RunMetrics("rename_files_with_new_prefix")
+    clock = time.perf_counter
+    if keys is None:
+        keys = {}
     # 筛选出从开始索引到最后的文件
     files_to_rename = files[start_index:]
     
     if not files_to_rename:
-        print("没有找到需要重命名的文件。")
-        return
+        log("没有找到需要重命名的文件。")
+        return None
     
     # 获取起始文件的组名和前缀
     start_file = files_to_rename[0]
-    start_prefix, _ = extract_number_prefix(start_file)
-    current_group = get_file_group(start_file)
+    start_key = keys.get(start_file) or file_name_key(start_file)
+    start_prefix = start_key.prefix
+    current_group = start_key.group
     
     if start_prefix is None:
-        print(f"无法识别起始文件 '{start_file}' 的前缀，无法继续。")
-        return
+        log(f"无法识别起始文件 '{start_file}' 的前缀，无法继续。")
+        return None
     
     if current_group is None:
-        print(f"无法识别起始文件 '{start_file}' 的组名，无法继续。")
-        return
+        log(f"无法识别起始文件 '{start_file}' 的组名，无法继续。")
+        return None
     
     # 计算第一个组的新前缀
     if mode == "increment":
@@ -109,68 +127,324 @@ def rename_files_with_new_prefix(folder_path, files, start_index, mode="incremen
         # 递减模式：将前缀减1
         new_prefix = max(0, start_prefix - 1)  # 允许最小为00
     
-    # 对这些文件进行重命名
+    # 计算这些文件的新名称
     current_prefix = new_prefix
     renamed_count = 0
+    skipped_count = 0
+    failed_count = 0
     last_group = None
+    renames = []
     
     # 显示前缀变化信息
     change_text = "递增" if mode == "increment" else "递减"
-    print(f"\n开始重命名文件，起始前缀从 {start_prefix:02d} {change_text}为 {current_prefix:02d}")
+    log(f"\n开始重命名文件，起始前缀从 {start_prefix:02d} {change_text}为 {current_prefix:02d}")
     
-    for filename in files_to_rename:
-        file_path = os.path.join(folder_path, filename)
-        
-        # 跳过文件夹
-        if os.path.isdir(file_path):
-            continue
+    with metrics.phase("生成计划", len(files_to_rename)):
+        for filename in files_to_rename:
+            file_path = os.path.join(folder_path, filename)
             
-        # 提取当前文件的组名
-        file_group = get_file_group(filename)
-        
-        # 如果无法识别文件组，跳过此文件
-        if file_group is None:
-            print(f"跳过 {filename}（无法识别文件组）")
-            continue
-        
-        # 提取当前文件名的数字前缀和剩余部分
-        _, rest = extract_number_prefix(filename)
-        
-        # 如果是新的文件组（和前一个文件组不同），根据递增/递减选项调整前缀数字
-        if last_group is not None and file_group != last_group:
-            if mode == "increment":
-                current_prefix = min(99, current_prefix + 1)  # 限制最大为99
-                print(f"\n检测到新文件组 '{file_group}'，前缀递增至 {current_prefix:02d}")
+            # 跳过文件夹
+            if dir_names is not None:
+                is_dir = filename in dir_names
             else:
-                # 递减模式下，新文件组的前缀反而递增
-                current_prefix = min(99, current_prefix + 1)  # 限制最大为99
-                print(f"\n检测到新文件组 '{file_group}'，前缀递增至 {current_prefix:02d}")
-        
-        last_group = file_group
-        
-        # 创建新文件名（保持两位数字前缀格式）
-        new_filename = f"{current_prefix:02d}{rest}"
-        new_file_path = os.path.join(folder_path, new_filename)
-        
-        # 如果新文件名与原文件名相同，则跳过
-        if new_filename == filename:
-            print(f"跳过 {filename}（文件名未改变）")
+                is_dir = os.path.isdir(file_path)
+            if is_dir:
+                continue
+                
+            # 提取当前文件的组名（与排序共用同一份拆分结果）
+            key = keys.get(filename) or file_name_key(filename)
+            file_group = key.group
+            
+            # 如果无法识别文件组，跳过此文件
+            if file_group is None:
+                log(f"跳过 {filename}（无法识别文件组）")
+                skipped_count += 1
+                continue
+            
+            # 当前文件名去掉数字前缀后的剩余部分
+            rest = key.rest
+            
+            # 如果是新的文件组（和前一个文件组不同），根据递增/递减选项调整前缀数字
+            if last_group is not None and file_group != last_group:
+                if mode == "increment":
+                    current_prefix = min(99, current_prefix + 1)  # 限制最大为99
+                    log(f"\n检测到新文件组 '{file_group}'，前缀递增至 {current_prefix:02d}")
+                else:
+                    # 递减模式下，新文件组的前缀反而递增
+                    current_prefix = min(99, current_prefix + 1)  # 限制最大为99
+                    log(f"\n检测到新文件组 '{file_group}'，前缀递增至 {current_prefix:02d}")
+            
+            last_group = file_group
+            
+            # 创建新文件名（保持两位数字前缀格式）
+            new_filename = f"{current_prefix:02d}{rest}"
+            
+            # 如果新文件名与原文件名相同，则跳过
+            if new_filename == filename:
+                log(f"跳过 {filename}（文件名未改变）")
+                skipped_count += 1
+                continue
+            
+            renames.append((filename, new_filename))
+    
+    # 目标名称被不改名的文件占用时不能执行
+    with metrics.phase("计划重命名顺序", len(renames)):
+        chains, conflicts = plan_renames(renames, files)
+    for conflict in conflicts:
+        log(f"无法重命名 {conflict.old_name}（{conflict.reason}）")
+        failed_count += 1
+    
+    if dry_run:
+        # 预演时按执行顺序输出，不修改文件
+        for steps in chains:
+            for step in steps:
+                if not step.final:
+                    log(f"将临时重命名: {step.source} -> {step.target}")
+                elif step.source != step.old_name:
+                    log(f"将重命名: {step.old_name} -> {step.new_name}（经临时名称 {step.source}）")
+                    renamed_count += 1
+                else:
+                    log(f"将重命名: {step.old_name} -> {step.new_name}")
+                    renamed_count += 1
+    else:
+        total = len(renames) - len(conflicts)
+        if progress is not None:
+            progress(0, total)
+        start = clock()
+        for position, outcome in enumerate(apply_chains(folder_path, chains)):
+            if outcome.error is None:
+                metrics.record("重命名文件", clock() - start)
+                log(f"已重命名: {outcome.old_name} -> {outcome.new_name}")
+                renamed_count += 1
+            else:
+                log(f"重命名 {outcome.old_name} 失败: {outcome.error}")
+                failed_count += 1
+            # 处理完这一项后再报告，进度条只显示已完成的数量
+            if progress is not None:
+                progress(position + 1, total)
+            start = clock()
+    
+    if dry_run:
+        log(f"\n预演完成！将重命名 {renamed_count} 个文件。")
+    else:
+        log(f"\n重命名完成！共重命名 {renamed_count} 个文件。")
+    return RenameResult(renamed_count, skipped_count, failed_count)
+
+def find_start_index(files, prefix=None, index=None):
+    """
+    查找开始修改的文件，规则与交互模式相同
+
+    Args:
+        files: 排好序的文件列表
+        prefix: 两位数字前缀，选择第一个以它开头的文件
+        index: 从1开始的序号
+
+    Returns:
+        int: 文件在列表中的位置，找不到时返回None
+    """
+    if index is not None:
+        return index - 1 if 1 <= index <= len(files) else None
+    for i, filename in enumerate(files):
+        if filename.startswith(prefix):
+            return i
+    return None
+
+
+def scan_tree(root):
+    """
+    递归列出root及其所有子文件夹，每个文件夹只用os.scandir读取一次
+
+    文件类型来自DirEntry（大多数系统上不需要额外的stat），不进入指向文件夹的符号链接。
+
+    Returns:
+        tuple: (快照列表, 错误列表)，快照列表为按先序排列的DirectorySnapshot（不含文件大小和修改时间）；
+               错误列表每项为(文件夹路径, 原因)
+    """
+    snapshots = []
+    errors = []
+    stack = [root]
+    while stack:
+        folder_path = stack.pop()
+        try:
+            snapshot = DirectorySnapshot.scan(folder_path, with_stat=False)
+        except OSError as e:
+            errors.append((folder_path, f"无法读取文件夹内容：{e}"))
             continue
-        
-        # 执行重命名
+        snapshots.append(snapshot)
+        # 倒序入栈，子文件夹按名称顺序处理
+        stack.extend(os.path.join(folder_path, entry.name) for entry in reversed(snapshot.entries)
+                     if entry.is_dir and not entry.is_link)
+    return snapshots, errors
+
+
+def process_folder(folder_path, prefix=None, index=None, mode="increment", dry_run=False,
+                   snapshot=None, required=True):
+    """
+    批量模式中处理一个文件夹，在进程池的工作进程中运行
+
+    日志不直接输出，而是随结果一起返回，由主进程按文件夹顺序输出，避免多个进程的输出交错。
+
+    Args:
+        snapshot: 文件夹的DirectorySnapshot（由scan_tree提供），为None时读取文件夹
+        required: 为False时找不到起始文件不算失败（递归模式中大部分文件夹可能没有匹配的文件）
+
+    Returns:
+        FolderResult: 处理结果，required为False且没有要处理的文件时result和error都为None
+    """
+    messages = []
+    log = messages.append
+    if snapshot is None:
         try:
-            os.rename(file_path, new_file_path)
-            print(f"已重命名: {filename} -> {new_filename}")
-            renamed_count += 1
-        except Exception as e:
-            print(f"重命名 {filename} 失败: {e}")
-    
-    print(f"\n重命名完成！共重命名 {renamed_count} 个文件。")
+            snapshot = DirectorySnapshot.scan(folder_path, with_stat=False)
+        except OSError as e:
+            return FolderResult(folder_path, None, f"无法读取文件夹内容：{e}", messages)
+    files = snapshot.names
+
+    start_index = find_start_index(files, prefix, index)
+    if start_index is None:
+        if not required:
+            return FolderResult(folder_path, None, None, messages)
+        if index is not None:
+            error = f"序号 {index} 超出范围（共 {len(files)} 项）"
+        else:
+            error = f"找不到前缀为 '{prefix}' 的文件"
+        return FolderResult(folder_path, None, error, messages)
+
+    log(f"从文件 \"{files[start_index]}\" 开始修改")
+    try:
+        result = rename_files_with_new_prefix(folder_path, files, start_index, mode, dry_run, log,
+                                              snapshot.dir_names, keys=snapshot.keys)
+    except Exception as e:
+        return FolderResult(folder_path, None, f"处理时发生错误：{e}", messages)
+    if result is None:
+        return FolderResult(folder_path, None, "无法识别起始文件的前缀或组名", messages)
+    return FolderResult(folder_path, result, None, messages)
+
+
+def expand_folders(patterns):
+    """
+    展开文件夹通配符（Windows的命令行不会自动展开），去重并保持顺序
+
+    Returns:
+        list: 存在的文件夹路径
+    """
+    folders = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            key = os.path.normcase(os.path.abspath(path))
+            if os.path.isdir(path) and key not in seen:
+                seen.add(key)
+                folders.append(path)
+    return folders
+
+
+def batch_main(argv):
+    """
+    非交互的批量模式：处理多个文件夹，最后输出汇总
+
+    Returns:
+        int: 退出码，0为全部成功，1为有文件或文件夹失败，2为参数错误或没有匹配的文件夹
+    """
+    parser = argparse.ArgumentParser(
+        prog="folder_rename.py",
+        description="批量修改多个文件夹中文件名的两位数字前缀，按文件组递增")
+    parser.add_argument("folders", nargs="+", help="文件夹路径，可以使用通配符，例如 \"D:/剧集/*\"")
+    start = parser.add_mutually_exclusive_group(required=True)
+    start.add_argument("--prefix", help="从每个文件夹中第一个以该两位前缀开头的文件开始，例如 01")
+    start.add_argument("--index", type=int, help="从每个文件夹中的第几个文件开始（从1开始）")
+    parser.add_argument("--mode", choices=("increment", "decrement"), default="increment", help="前缀变化方式")
+    parser.add_argument("--dry-run", action="store_true", help="只输出将要进行的重命名，不修改文件")
+    parser.add_argument("--recursive", "-r", action="store_true",
+                        help="同时处理所有子文件夹，每个文件夹单独编号，没有匹配文件的文件夹直接跳过")
+    parser.add_argument("--jobs", type=int, default=None, help="同时处理的文件夹数量，默认为CPU核数")
+    parser.add_argument("--quiet", action="store_true", help="只输出每个文件夹的结果和汇总")
+    args = parser.parse_args(argv)
+
+    if args.prefix is not None and not re.match(r'^\d{2}$', args.prefix):
+        parser.error("--prefix必须是两位数字，例如 01")
+
+    folders = expand_folders(args.folders)
+    if not folders:
+        print("错误：没有匹配的文件夹。", file=sys.stderr)
+        return 2
+
+    failed_folders = []
+    if args.recursive:
+        # 先在主进程中扫描整个目录树，工作进程直接使用扫描结果，不再重复读取文件夹
+        tasks = []
+        for root in folders:
+            tree, errors = scan_tree(root)
+            failed_folders.extend(FolderResult(path, None, error, []) for path, error in errors)
+            for snapshot in tree:
+                # 只有子文件夹的文件夹没有可以重命名的文件
+                if len(snapshot.dir_names) < len(snapshot):
+                    tasks.append((snapshot.path, args.prefix, args.index, args.mode, args.dry_run,
+                                  snapshot, False))
+        scanned = len(tasks)
+    else:
+        tasks = [(folder, args.prefix, args.index, args.mode, args.dry_run) for folder in folders]
+        scanned = len(folders)
+
+    jobs = max(1, min(args.jobs or os.cpu_count() or 1, len(tasks)))
+    print(f"共 {scanned} 个文件夹，使用 {jobs} 个进程{'（预演）' if args.dry_run else ''}")
+
+    if jobs == 1:
+        results = (process_folder(*task) for task in tasks)
+        executor = None
+    else:
+        # 各文件夹互不影响，在多个进程中并行处理；同一文件夹内按顺序重命名，结果按输入顺序输出
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        # 递归模式中文件夹数量可能很多，分批提交减少进程间通信
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        results = executor.map(process_folder, *zip(*tasks), chunksize=chunksize)
+
+    totals = RenameResult(0, 0, 0)
+    processed = 0
+    no_match = 0
+    try:
+        for folder_result in results:
+            if folder_result.result is None and folder_result.error is None:
+                # 递归模式中没有匹配文件的文件夹
+                no_match += 1
+                continue
+            if not args.quiet:
+                print(f"\n===== {folder_result.folder} =====")
+                for message in folder_result.messages:
+                    print(message)
+            if folder_result.error is not None:
+                failed_folders.append(folder_result)
+                print(f"[失败] {folder_result.folder}: {folder_result.error}")
+                continue
+            result = folder_result.result
+            processed += 1
+            totals = RenameResult(*(total + count for total, count in zip(totals, result)))
+            status = "失败" if result.failed else "完成"
+            print(f"[{status}] {folder_result.folder}: 重命名 {result.renamed}，跳过 {result.skipped}，失败 {result.failed}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    action = "将重命名" if args.dry_run else "重命名"
+    print(f"\n汇总：{processed + no_match + len(failed_folders)} 个文件夹，成功 {processed} 个，"
+          f"无法处理 {len(failed_folders)} 个" + (f"，没有匹配文件 {no_match} 个" if args.recursive else ""))
+    print(f"共{action} {totals.renamed} 个文件，跳过 {totals.skipped} 个，失败 {totals.failed} 个")
+    for folder_result in failed_folders:
+        print(f"  无法处理: {folder_result.folder}（{folder_result.error}）")
+
+    return 1 if failed_folders or totals.failed else 0
+
 
 def main():
     """
     程序主入口函数
+
+    带命令行参数时进入批量模式，否则逐项询问
     """
+    if len(sys.argv) > 1:
+        sys.exit(batch_main(sys.argv[1:]))
+    
     print("文件夹重命名工具已启动")
     
     # 获取用户输入的文件夹路径
@@ -179,17 +453,14 @@ def main():
     
     # 获取并显示文件夹内容
     try:
-        # 先获取原始文件列表
-        files = os.listdir(folder_path)
-        
-        # 根据文件名排序（确保数字顺序正确）
-        files = sorted(files)
+        # 一次读取文件夹，列表显示和重命名都使用同一份快照（已按文件名排序）
+        snapshot = DirectorySnapshot.scan(folder_path, with_stat=False)
+        files = snapshot.names
         
         print(f"\n文件夹内容（共{len(files)}项）：")
-        for i, item in enumerate(files):
-            item_path = os.path.join(folder_path, item)
-            item_type = "文件夹" if os.path.isdir(item_path) else "文件"
-            print(f"  {i+1}. {item} ({item_type})")
+        for i, entry in enumerate(snapshot):
+            item_type = "文件夹" if entry.is_dir else "文件"
+            print(f"  {i+1}. {entry.name} ({item_type})")
     except Exception as e:
         print(f"无法读取文件夹内容：{e}")
         return
@@ -271,8 +542,16 @@ def main():
     else:
         print(f"\n将从文件 \"{selected_file}\" 开始，将前缀递减为 {new_start_prefix:02d}，且在不同组之间递增前缀（{new_start_prefix:02d}→{min(99, new_start_prefix+1):02d}→{min(99, new_start_prefix+2):02d}→...）。")
     
+    # 等待输入期间文件夹可能有变化，计划基于读取时的快照，变化后需要重新选择
+    if not snapshot.is_current():
+        print("错误：文件夹内容在读取后发生了变化，请重新运行。")
+        return
+    
     # 直接执行重命名操作
-    rename_files_with_new_prefix(folder_path, files, start_file_index, mode)
+    rename_files_with_new_prefix(folder_path, files, start_file_index, mode, dir_names=snapshot.dir_names,
+                                 keys=snapshot.keys)
 
 if __name__ == "__main__":
+    # 打包成可执行文件后进程池需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,24 +1,17 @@
-import os
 import sys
 import re
+import threading
+import collections
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 from tkinter.scrolledtext import ScrolledText
-
-class RedirectText:
-    def __init__(self, text_widget):
-        self.text_widget = text_widget
-        self.buffer = ""
-
-    def write(self, string):
-        self.buffer += string
-        self.text_widget.configure(state=tk.NORMAL)
-        self.text_widget.insert(tk.END, string)
-        self.text_widget.see(tk.END)
-        self.text_widget.configure(state=tk.DISABLED)
-    
-    def flush(self):
-        pass
+from ui_events import UIEventBus, ProgressDialog
+from log_sink import LogSink
+from metrics import RunMetrics, record_run
+from metrics_panel import show_metrics
+from dir_snapshot import DirectorySnapshot
+from name_keys import file_name_key
+from folder_rename import rename_files_with_new_prefix
 
 class FileRenamerApp:
     def __init__(self, root):
@@ -31,6 +24,13 @@ class FileRenamerApp:
         self.start_file = tk.StringVar()
         self.mode = tk.StringVar(value="increment")
         self.files = []
+        # 当前文件夹的快照，列表显示和重命名共用，文件夹没有变化时不重新读取
+        self.snapshot = None
+        # 最近几次重命名的分阶段性能统计
+        self.run_metrics = collections.deque(maxlen=20)
+        
+        # 后台线程通过事件总线报告进度和输出日志
+        self.bus = UIEventBus(self.root)
         
         self.create_widgets()
         
@@ -88,6 +88,7 @@ class FileRenamerApp:
         button_frame.pack(fill=tk.X, padx=5, pady=10)
         
         ttk.Button(button_frame, text="执行重命名", command=self.rename_files).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="性能统计", command=lambda: show_metrics(self.root, self.run_metrics)).pack(side=tk.RIGHT, padx=5)
         
         # 日志输出区域
         log_frame = ttk.LabelFrame(main_frame, text="操作日志", padding="10")
@@ -96,9 +97,10 @@ class FileRenamerApp:
         self.log_text = ScrolledText(log_frame, state=tk.DISABLED, wrap=tk.WORD, font=("Microsoft YaHei", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
-        # 重定向stdout到文本框
+        # 重定向stdout到文本框，定时批量刷新，完整日志写入日志文件
         self.old_stdout = sys.stdout
-        sys.stdout = RedirectText(self.log_text)
+        self.log_sink = LogSink(self.log_text, "folder_rename")
+        sys.stdout = self.log_sink
     
     def browse_folder(self):
         folder_path = filedialog.askdirectory(title="选择文件夹")
@@ -106,34 +108,52 @@ class FileRenamerApp:
             self.folder_path.set(folder_path)
             self.load_files()
     
-    def load_files(self):
+    def load_files(self, force=False):
+        """
+        加载文件夹内容
+
+        Args:
+            force: 为True时总是重新读取；否则文件夹修改时间没有变化时沿用已加载的快照
+        """
         folder_path = self.folder_path.get()
         if not folder_path:
             messagebox.showerror("错误", "请先选择一个文件夹！")
             return
         
-        if not os.path.exists(folder_path) or not os.path.isdir(folder_path):
-            messagebox.showerror("错误", "无效的文件夹路径！")
+        snapshot = self.snapshot
+        if not force and snapshot is not None and snapshot.path == folder_path and snapshot.is_current():
+            print(f"文件夹 '{folder_path}' 没有变化，沿用已加载的 {len(snapshot)} 个项目")
             return
         
+        run = RunMetrics("load_files", folder=folder_path)
         try:
-            # 获取文件列表
-            self.files = sorted(os.listdir(folder_path))
-            
-            # 清空并重新填充列表框
-            self.file_listbox.delete(0, tk.END)
-            for i, item in enumerate(self.files):
-                item_path = os.path.join(folder_path, item)
-                item_type = "文件夹" if os.path.isdir(item_path) else "文件"
-                self.file_listbox.insert(tk.END, f"{i+1}. {item} ({item_type})")
-            
-            print(f"已加载文件夹 '{folder_path}' 中的 {len(self.files)} 个项目")
-            
-            # 清空选定的起始文件
-            self.start_file.set("")
-            self.start_file_entry.config(state="readonly")
+            # 一次读取文件夹，得到每一项的名称和类型；列表不显示大小和修改时间，不读取
+            with run.phase("列举文件夹"):
+                snapshot = DirectorySnapshot.scan(folder_path, with_stat=False)
+        except (FileNotFoundError, NotADirectoryError):
+            messagebox.showerror("错误", "无效的文件夹路径！")
+            return
         except Exception as e:
             messagebox.showerror("错误", f"读取文件夹内容失败: {e}")
+            return
+        
+        self.snapshot = snapshot
+        self.files = snapshot.names
+        
+        # 清空并重新填充列表框
+        with run.phase("刷新列表", len(snapshot)):
+            self.file_listbox.delete(0, tk.END)
+            for i, entry in enumerate(snapshot):
+                item_type = "文件夹" if entry.is_dir else "文件"
+                self.file_listbox.insert(tk.END, f"{i+1}. {entry.name} ({item_type})")
+        
+        print(f"已加载文件夹 '{folder_path}' 中的 {len(self.files)} 个项目")
+        run.info["files"] = len(snapshot)
+        record_run(run, self.run_metrics)
+        
+        # 清空选定的起始文件
+        self.start_file.set("")
+        self.start_file_entry.config(state="readonly")
     
     def on_file_select(self, event):
         # 获取选择的项目索引
@@ -188,131 +208,62 @@ class FileRenamerApp:
             messagebox.showerror("错误", f"找不到文件: {actual_start_file}")
             return
         
-        # 执行重命名操作
-        self.rename_files_with_new_prefix(folder_path, self.files, start_index, mode)
+        # 重命名计划基于已加载的快照，文件夹在加载后有变化时需要重新选择
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.path != folder_path or not snapshot.is_current():
+            messagebox.showwarning("提示", "文件夹内容在加载后发生了变化，已重新加载，请重新选择起始文件。")
+            self.load_files(force=True)
+            return
+        
+        # 在后台线程中执行重命名，进度和日志通过事件总线显示
+        dialog = ProgressDialog(self.root, self.bus, "rename", "重命名进行中", "正在重命名文件，请稍候...")
+        files = snapshot.names
+        run = RunMetrics("rename_files_with_new_prefix", folder=folder_path, files=len(files) - start_index)
         
-        # 重新加载文件列表以显示修改后的结果
-        self.load_files()
+        def rename_thread():
+            try:
+                result = rename_files_with_new_prefix(
+                    folder_path, files, start_index, mode,
+                    log=self.bus.log,
+                    dir_names=snapshot.dir_names,
+                    keys=snapshot.keys,
+                    metrics=run,
+                    progress=lambda done, total: self.bus.progress("rename", done, total)
+                )
+            except Exception as e:
+                self.bus.call(dialog.close)
+                self.bus.call(messagebox.showerror, "错误", f"重命名过程中发生错误: {e}")
+                return
+            
+            if result is not None:
+                run.info.update(result._asdict())
+            self.bus.call(record_run, run, self.run_metrics)
+            self.bus.call(dialog.close)
+            # 重新加载文件列表以显示修改后的结果（修改时间精度可能不足以反映刚才的变化）
+            self.bus.call(self.load_files, True)
+            if result is not None:
+                # 操作完成后弹出提示
+                message = f"重命名完成！共重命名 {result.renamed} 个文件。"
+                if result.failed:
+                    message += f"\n{result.failed} 个文件无法重命名，详见日志。"
+                self.bus.call(messagebox.showinfo, "完成", message)
+        
+        threading.Thread(target=rename_thread).start()
+    
+    def _name_key(self, filename):
+        """文件名的拆分结果，优先使用已加载快照中的结果"""
+        if self.snapshot is not None:
+            return self.snapshot.key(filename)
+        return file_name_key(filename)
     
     def extract_number_prefix(self, filename):
         """从文件名中提取前缀数字（两位数字格式）"""
-        match = re.match(r'^(\d{2})(.*)$', filename)
-        if match:
-            number = int(match.group(1))
-            rest = match.group(2)
-            return number, rest
-        return None, filename
+        key = self._name_key(filename)
+        return key.prefix, key.rest
     
     def get_file_group(self, filename):
         """从文件名中提取文件组信息"""
-        prefix, rest = self.extract_number_prefix(filename)
-        
-        if rest == filename:
-            return None
-        
-        group_match = re.match(r'^([^0-9]+)', rest)
-        if group_match:
-            group_name = group_match.group(1).strip()
-            if group_name:
-                return group_name
-        
-        return None
-    
-    def rename_files_with_new_prefix(self, folder_path, files, start_index, mode="increment"):
-        """从指定索引开始重命名文件，修改前缀数字"""
-        # 筛选出从开始索引到最后的文件
-        files_to_rename = files[start_index:]
-        
-        if not files_to_rename:
-            print("没有找到需要重命名的文件。")
-            return
-        
-        # 获取起始文件的组名和前缀
-        start_file = files_to_rename[0]
-        start_prefix, _ = self.extract_number_prefix(start_file)
-        current_group = self.get_file_group(start_file)
-        
-        if start_prefix is None:
-            print(f"无法识别起始文件 '{start_file}' 的前缀，无法继续。")
-            return
-        
-        if current_group is None:
-            print(f"无法识别起始文件 '{start_file}' 的组名，无法继续。")
-            return
-        
-        # 计算第一个组的新前缀
-        if mode == "increment":
-            # 递增模式：在原有前缀上加1
-            new_prefix = min(99, start_prefix + 1)  # 限制最大为99
-        else:
-            # 递减模式：将前缀减1
-            new_prefix = max(0, start_prefix - 1)  # 允许最小为00
-        
-        # 对这些文件进行重命名
-        current_prefix = new_prefix
-        renamed_count = 0
-        last_group = None
-        
-        # 显示前缀变化信息
-        change_text = "递增" if mode == "increment" else "递减"
-        print(f"\n开始重命名文件，起始前缀从 {start_prefix:02d} {change_text}为 {current_prefix:02d}")
-        
-        for filename in files_to_rename:
-            file_path = os.path.join(folder_path, filename)
-            
-            # 跳过文件夹
-            if os.path.isdir(file_path):
-                continue
-                
-            # 提取当前文件的组名
-            file_group = self.get_file_group(filename)
-            
-            # 如果无法识别文件组，跳过此文件
-            if file_group is None:
-                print(f"跳过 {filename}（无法识别文件组）")
-                continue
-            
-            # 提取当前文件名的数字前缀和剩余部分
-            _, rest = self.extract_number_prefix(filename)
-            
-            # 如果是新的文件组（和前一个文件组不同），根据递增/递减选项调整前缀数字
-            if last_group is not None and file_group != last_group:
-                if mode == "increment":
-                    current_prefix = min(99, current_prefix + 1)  # 限制最大为99
-                    print(f"\n检测到新文件组 '{file_group}'，前缀递增至 {current_prefix:02d}")
-                else:
-                    # 递减模式下，新文件组的前缀反而递增
-                    current_prefix = min(99, current_prefix + 1)  # 限制最大为99
-                    print(f"\n检测到新文件组 '{file_group}'，前缀递增至 {current_prefix:02d}")
-            
-            last_group = file_group
-            
-            # 创建新文件名（保持两位数字前缀格式）
-            new_filename = f"{current_prefix:02d}{rest}"
-            new_file_path = os.path.join(folder_path, new_filename)
-            
-            # 如果新文件名与原文件名相同，则跳过
-            if new_filename == filename:
-                print(f"跳过 {filename}（文件名未改变）")
-                continue
-            
-            # 检查目标文件是否已存在
-            if os.path.exists(new_file_path):
-                print(f"跳过 {filename}（目标文件 {new_filename} 已存在）")
-                continue
-            
-            # 执行重命名
-            try:
-                os.rename(file_path, new_file_path)
-                print(f"已重命名: {filename} -> {new_filename}")
-                renamed_count += 1
-            except Exception as e:
-                print(f"重命名 {filename} 失败: {e}")
-        
-        print(f"\n重命名完成！共重命名 {renamed_count} 个文件。")
-        
-        # 操作完成后弹出提示
-        messagebox.showinfo("完成", f"重命名完成！共重命名 {renamed_count} 个文件。")
+        return self._name_key(filename).group
 
 def main():
     root = tk.Tk()
@@ -328,6 +279,7 @@ def main():
     
     # 恢复stdout
     sys.stdout = app.old_stdout
+    app.log_sink.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
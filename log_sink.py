@@ -0,0 +1,164 @@
+"""
+日志输出 - 代替逐次写入Text控件的RedirectText
+
+print()只把文本加入缓冲区，界面线程每FLUSH_MS毫秒把缓冲区一次性插入日志控件，
+控件中最多保留MAX_LINES行；完整的日志由后台线程写入用户缓存目录中的日志文件。
+write()可以在任意线程中调用。
+"""
+import os
+import glob
+import time
+import queue
+import atexit
+import threading
+import tkinter as tk
+from collections import deque
+
+from eagle_index import user_cache_dir
+
+# 每个程序最多保留的日志文件数量
+MAX_LOG_FILES = 20
+
+
+def log_dir():
+    """日志文件所在的目录（不存在时自动创建）"""
+    path = os.path.join(user_cache_dir(), "logs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class LogFileWriter:
+    """在后台线程中把日志顺序写入文件"""
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        # 程序退出时写完剩余的日志
+        atexit.register(self.close)
+
+    def write(self, text):
+        self._queue.put(text)
+
+    def close(self):
+        """写完已提交的日志并关闭文件，可以重复调用"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                chunks = [self._queue.get()]
+                # 一次取出所有已提交的文本，合并为一次写入
+                while True:
+                    try:
+                        chunks.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in chunks
+                f.write("".join(chunk for chunk in chunks if chunk is not None))
+                f.flush()
+                if stop:
+                    return
+
+
+def open_log_file(name):
+    """
+    为本次运行创建日志文件，并删除超出MAX_LOG_FILES的旧日志
+
+    Args:
+        name: 程序名，作为日志文件名的前缀
+
+    Returns:
+        LogFileWriter: 日志文件，无法创建时为None
+    """
+    try:
+        folder = log_dir()
+        path = os.path.join(folder, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.log")
+        old_logs = sorted(glob.glob(os.path.join(folder, f"{name}-*.log")), key=os.path.getmtime)
+        for old_path in old_logs[:-(MAX_LOG_FILES - 1)]:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+        return LogFileWriter(path)
+    except OSError:
+        return None
+
+
+class LogSink:
+    """带缓冲和行数上限的日志输出，可以直接赋值给sys.stdout"""
+
+    # 刷新日志控件的间隔（毫秒）
+    FLUSH_MS = 100
+    # 日志控件中最多保留的行数
+    MAX_LINES = 5000
+
+    def __init__(self, text_widget, name, max_lines=None):
+        """
+        Args:
+            text_widget: 显示日志的Text控件（state为DISABLED）
+            name: 程序名，用于日志文件名
+            max_lines: 日志控件中最多保留的行数，默认MAX_LINES
+        """
+        self.text_widget = text_widget
+        self.max_lines = max_lines or self.MAX_LINES
+        self._lock = threading.Lock()
+        # 尚未显示的完整行，超过上限时丢弃最早的行（日志文件中仍然完整）
+        self._lines = deque(maxlen=self.max_lines)
+        self._partial = ""  # 最后一行中还没有换行的部分
+        self._line_count = 1  # 控件中的行数（Text控件末尾总有一个空行）
+        self.log_file = open_log_file(name)
+        self.text_widget.after(self.FLUSH_MS, self._poll)
+
+    @property
+    def log_path(self):
+        """日志文件路径，没有日志文件时为None"""
+        return self.log_file.path if self.log_file else None
+
+    def write(self, string):
+        if not string:
+            return
+        if self.log_file is not None:
+            self.log_file.write(string)
+        with self._lock:
+            lines = (self._partial + string).split("\n")
+            self._partial = lines.pop()
+            self._lines.extend(lines)
+
+    def flush(self):
+        # 由定时器统一刷新，这里不访问控件，可以在任意线程中调用
+        pass
+
+    def _poll(self):
+        try:
+            self.flush_to_widget()
+        finally:
+            self.text_widget.after(self.FLUSH_MS, self._poll)
+
+    def flush_to_widget(self):
+        """把缓冲区中的完整行插入日志控件，只能在界面线程中调用"""
+        with self._lock:
+            if not self._lines:
+                return
+            lines = list(self._lines)
+            self._lines.clear()
+
+        widget = self.text_widget
+        widget.configure(state=tk.NORMAL)
+        widget.insert(tk.END, "\n".join(lines) + "\n")
+        self._line_count += len(lines)
+        # 超出上限时删除最早的行
+        excess = self._line_count - self.max_lines
+        if excess > 0:
+            widget.delete("1.0", f"{excess + 1}.0")
+            self._line_count -= excess
+        widget.see(tk.END)
+        widget.configure(state=tk.DISABLED)
+
+    def close(self):
+        """写完日志文件"""
+        if self.log_file is not None:
+            self.log_file.close()
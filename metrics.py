@@ -0,0 +1,214 @@
+"""
+性能统计 - 记录一次操作中各个阶段的次数、总耗时和单项耗时分位数
+
+每次加载或重命名创建一个RunMetrics，各阶段用phase()记录整段耗时，或用
+record()/record_many()记录每个文件的耗时；可以在任意线程中调用。结束后
+用save()追加到用户缓存目录中的历史记录，便于比较不同时间、不同存储的性能。
+"""
+import os
+import json
+import math
+import time
+import random
+import threading
+from array import array
+from contextlib import contextmanager
+
+from eagle_index import user_cache_dir
+
+# 每个阶段最多保留的单项耗时样本数，超过后随机替换，内存占用固定
+MAX_SAMPLES = 100000
+
+# 每个操作的历史记录文件超过此大小后改名为<操作名>.1.jsonl（替换更早的一份），
+# 每个操作最多占用约两倍的空间
+MAX_HISTORY_BYTES = 1024 * 1024
+
+
+def metrics_dir():
+    """性能统计历史记录所在的目录（不存在时自动创建）"""
+    path = os.path.join(user_cache_dir(), "metrics")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def percentile(sorted_samples, fraction):
+    """已排序样本的分位数（最近秩），没有样本时为None"""
+    if not sorted_samples:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_samples)) - 1)
+    return sorted_samples[index]
+
+
+class _Phase:
+    """一个阶段的统计"""
+    __slots__ = ("count", "total", "samples", "seen")
+
+    def __init__(self):
+        self.count = 0  # 处理的项目数量
+        self.total = 0.0  # 总耗时（秒）
+        self.samples = array('d')  # 单项耗时样本
+        self.seen = 0  # 记录过的单项耗时数量
+
+
+class RunMetrics:
+    """一次操作的分阶段性能统计"""
+
+    def __init__(self, name, **info):
+        """
+        Args:
+            name: 操作名称，例如"load_eagle_files"
+            **info: 附加信息，例如库路径和文件数量，原样写入导出结果
+        """
+        self.name = name
+        self.info = info
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.elapsed = None
+        self._phases = {}  # 按第一次记录的顺序排列
+        self._lock = threading.Lock()
+
+    def _get(self, phase):
+        stats = self._phases.get(phase)
+        if stats is None:
+            stats = self._phases[phase] = _Phase()
+        return stats
+
+    @contextmanager
+    def phase(self, phase, count=1):
+        """
+        记录一段代码的耗时
+
+        Args:
+            phase: 阶段名
+            count: 这段代码处理的项目数量，用于计算吞吐量
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start, count)
+
+    def add(self, phase, seconds, count=1):
+        """记录一个阶段的整段耗时，不作为单项耗时样本"""
+        with self._lock:
+            stats = self._get(phase)
+            stats.count += count
+            stats.total += seconds
+
+    def record(self, phase, seconds):
+        """记录一个项目的耗时"""
+        self.record_many(phase, (seconds,))
+
+    def record_many(self, phase, durations):
+        """记录多个项目的耗时，工作线程中先在本地收集再一次记录，减少加锁次数"""
+        with self._lock:
+            stats = self._get(phase)
+            samples = stats.samples
+            for seconds in durations:
+                stats.count += 1
+                stats.total += seconds
+                stats.seen += 1
+                if len(samples) < MAX_SAMPLES:
+                    samples.append(seconds)
+                else:
+                    # 蓄水池抽样，保持样本对全部项目的代表性
+                    slot = random.randrange(stats.seen)
+                    if slot < MAX_SAMPLES:
+                        samples[slot] = seconds
+
+    def finish(self):
+        """记录总耗时"""
+        self.elapsed = time.perf_counter() - self._start
+
+    def summary(self):
+        """
+        各阶段的统计结果
+
+        Returns:
+            list: [{"phase", "count", "total", "per_second", "p50", "p95"}, ...]，
+                  时间单位为秒，没有单项样本时分位数为None；
+                  多个线程并发记录的单项耗时会累加，total可能超过实际经过的时间
+        """
+        with self._lock:
+            phases = [(phase, stats.count, stats.total, sorted(stats.samples))
+                      for phase, stats in self._phases.items()]
+        rows = []
+        for phase, count, total, samples in phases:
+            rows.append({
+                "phase": phase,
+                "count": count,
+                "total": total,
+                "per_second": count / total if total > 0 else None,
+                "p50": percentile(samples, 0.50),
+                "p95": percentile(samples, 0.95),
+            })
+        return rows
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started": self.started,
+            "elapsed": self.elapsed,
+            "info": self.info,
+            "phases": self.summary(),
+        }
+
+    def export(self, path):
+        """把统计结果写入JSON文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def save(self):
+        """
+        把统计结果追加到历史记录（每个操作一个JSONL文件）
+
+        文件超过MAX_HISTORY_BYTES时先轮换，历史记录不会无限增长。
+
+        Returns:
+            str: 历史记录文件路径，写入失败时为None
+        """
+        try:
+            folder = metrics_dir()
+            path = os.path.join(folder, f"{self.name}.jsonl")
+            try:
+                if os.path.getsize(path) >= MAX_HISTORY_BYTES:
+                    os.replace(path, os.path.join(folder, f"{self.name}.1.jsonl"))
+            except FileNotFoundError:
+                pass
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+            return path
+        except OSError:
+            return None
+
+    def report(self):
+        """
+        生成文字报告
+
+        Yields:
+            str: 每个阶段一行
+        """
+        for row in self.summary():
+            line = f"{row['phase']}: {row['count']} 项，共 {row['total']:.3f} 秒"
+            if row["per_second"] is not None and row["count"] > 1:
+                line += f"，每秒 {row['per_second']:,.0f} 项"
+            if row["p50"] is not None:
+                line += f"，p50 {row['p50'] * 1000:.2f} 毫秒，p95 {row['p95'] * 1000:.2f} 毫秒"
+            yield line
+
+
+def record_run(run, runs, log=print):
+    """
+    一次操作结束：保存性能统计，加入最近的记录并输出到日志
+
+    Args:
+        run: RunMetrics
+        runs: 最近操作的列表（通常是有长度上限的deque），run追加到末尾
+        log: 输出日志的函数，默认直接print
+    """
+    run.finish()
+    runs.append(run)
+    run.save()
+    log(f"性能统计（{run.name}，总耗时 {run.elapsed:.2f} 秒）:")
+    for line in run.report():
+        log(f"  {line}")
@@ -0,0 +1,123 @@
+"""
+性能统计窗口 - 显示最近几次操作的分阶段耗时，并可导出为JSON
+"""
+import os
+import time
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from metrics import metrics_dir
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return ""
+    if seconds < 1:
+        return f"{seconds * 1000:.2f} 毫秒"
+    return f"{seconds:.3f} 秒"
+
+
+class MetricsWindow:
+    """性能统计窗口"""
+
+    COLUMNS = ("阶段", "数量", "总耗时", "每秒", "p50", "p95")
+
+    def __init__(self, root, runs):
+        """
+        Args:
+            root: 父窗口
+            runs: RunMetrics列表，最新的在最后
+        """
+        self.runs = list(reversed(runs))
+
+        self.window = tk.Toplevel(root)
+        self.window.title("性能统计")
+        self.window.geometry("760x400")
+        self.window.transient(root)
+
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        # 选择要查看的操作
+        top_row = ttk.Frame(frame)
+        top_row.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(top_row, text="操作:").pack(side=tk.LEFT, padx=(0, 5))
+        self.run_var = tk.StringVar()
+        self.run_box = ttk.Combobox(top_row, textvariable=self.run_var, state="readonly", width=60,
+                                    values=[self._run_title(run) for run in self.runs])
+        self.run_box.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.run_box.bind("<<ComboboxSelected>>", lambda event: self.show_run(self.run_box.current()))
+
+        self.tree = ttk.Treeview(frame, columns=self.COLUMNS, show="headings")
+        for column in self.COLUMNS:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=100, anchor="e")
+        self.tree.column("阶段", width=200, anchor="w")
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.info_var = tk.StringVar(value="")
+        ttk.Label(frame, textvariable=self.info_var).pack(fill=tk.X, pady=5)
+
+        button_row = ttk.Frame(frame)
+        button_row.pack(fill=tk.X)
+        ttk.Button(button_row, text="关闭", command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_row, text="导出JSON...", command=self.export).pack(side=tk.RIGHT, padx=5)
+
+        if self.runs:
+            self.run_box.current(0)
+            self.show_run(0)
+        else:
+            self.info_var.set("还没有统计数据，加载或重命名文件后再查看。")
+
+    @staticmethod
+    def _run_title(run):
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run.started))
+        return f"{started}  {run.name}"
+
+    def show_run(self, position):
+        """显示一次操作的统计"""
+        if position < 0:
+            return
+        run = self.runs[position]
+        self.tree.delete(*self.tree.get_children())
+        for row in run.summary():
+            self.tree.insert("", tk.END, values=(
+                row["phase"],
+                row["count"],
+                _format_seconds(row["total"]),
+                f"{row['per_second']:,.0f}" if row["per_second"] is not None else "",
+                _format_seconds(row["p50"]),
+                _format_seconds(row["p95"]),
+            ))
+        info = "，".join(f"{key}: {value}" for key, value in run.info.items())
+        if run.elapsed is not None:
+            info = f"总耗时 {run.elapsed:.3f} 秒" + (f"，{info}" if info else "")
+        self.info_var.set(info)
+
+    def export(self):
+        """把当前查看的统计导出为JSON文件"""
+        position = self.run_box.current()
+        if position < 0:
+            return
+        run = self.runs[position]
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(run.started))
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="导出性能统计",
+            initialdir=metrics_dir(),
+            initialfile=f"{run.name}-{stamp}.json",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            run.export(path)
+            print(f"性能统计已导出到 {os.path.abspath(path)}")
+        except OSError as e:
+            messagebox.showerror("错误", f"导出失败: {str(e)}", parent=self.window)
+
+
+def show_metrics(root, runs):
+    """打开性能统计窗口，runs为最近操作的RunMetrics列表（最新的在最后）"""
+    return MetricsWindow(root, list(runs))
@@ -0,0 +1,84 @@
+"""
+文件名排序键 - 按自然顺序比较文件名中的数字
+"""
+import re
+from collections import namedtuple
+
+_DIGITS_PATTERN = re.compile(r'(\d+)')
+# 数字前缀和紧随其后的文件组名，例如"03薛芳菲沈玉容旧家01"中的"03"和"薛芳菲沈玉容旧家"
+PREFIX_GROUP_PATTERN = re.compile(r'^(\d*)([^0-9]*)')
+# 文件夹重命名使用的两位数字前缀
+_TWO_DIGIT_PREFIX_PATTERN = re.compile(r'^(\d{2})(.*)$')
+_GROUP_PATTERN = re.compile(r'^([^0-9]+)')
+
+# 文件名拆分结果：
+#   prefix: 两位数字前缀（整数），没有时为None
+#   rest: 去掉两位前缀后的部分，没有前缀时为原文件名
+#   group: 前缀后、第一个数字前的文件组名（去掉首尾空格），无法识别时为None
+#   sort_key: 自然排序键
+FileNameKey = namedtuple("FileNameKey", ["prefix", "rest", "group", "sort_key"])
+
+
+def natural_key(name):
+    """
+    生成自然排序键，使"2集"排在"10集"之前
+
+    Args:
+        name: 文件名
+
+    Returns:
+        tuple: 文本和数字交替组成的元组，偶数位置是小写文本，奇数位置是整数
+    """
+    parts = _DIGITS_PATTERN.split(name.lower())
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+def split_prefix_group(name):
+    """
+    拆分文件名开头的数字前缀和文件组名
+
+    Args:
+        name: 文件名
+
+    Returns:
+        tuple: (数字前缀字符串, 文件组名)，没有数字前缀时均为None，前缀后没有非数字部分时文件组名为None
+    """
+    digits, group = PREFIX_GROUP_PATTERN.match(name).groups()
+    if not digits:
+        return None, None
+    return digits, group or None
+
+
+def file_name_key(name):
+    """
+    把文件名拆分为两位数字前缀和文件组名，并生成自然排序键
+
+    DirectorySnapshot为每个名称调用一次并保存结果（DirectorySnapshot.keys），
+    排序、识别文件组和计算新文件名都使用同一份结果。
+
+    Args:
+        name: 文件名
+
+    Returns:
+        FileNameKey: 拆分结果
+    """
+    prefix = None
+    rest = name
+    group = None
+    match = _TWO_DIGIT_PREFIX_PATTERN.match(name)
+    if match:
+        prefix = int(match.group(1))
+        rest = match.group(2)
+        group_match = _GROUP_PATTERN.match(rest)
+        if group_match:
+            group = group_match.group(1).strip() or None
+
+    # 自然排序键依次比较开头的数字（完整数值，"11"排在"100"之前）、文件组名和后面的数字，
+    # 最后用原文件名区分只有大小写不同的名称
+    return FileNameKey(prefix, rest, group, (natural_key(name), name))
+
+
+def file_sort_key(name):
+    """文件夹内容的自然排序键，用于sorted(names, key=file_sort_key)"""
+    return file_name_key(name).sort_key
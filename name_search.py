@@ -0,0 +1,104 @@
+"""
+文件名搜索 - 基于字符二元组倒排索引的子串查找
+
+中文文件名没有空格分词，按相邻两个字符建立索引。查询时取查询文本中
+文件最少的二元组作为候选，再用子串比较确认，速度与库的大小基本无关。
+"""
+from array import array
+
+
+def _bigrams(text):
+    """文本中所有不重复的相邻两个字符"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class NgramIndex:
+    """文件ID到文件名的二元组倒排索引"""
+
+    def __init__(self):
+        # 每次加入文件都分配一个新的序号，删除时只把名称置为None
+        self._ids = []  # 序号 -> 文件ID
+        self._names = []  # 序号 -> 小写文件名，已删除时为None
+        self._ordinals = {}  # 文件ID -> 序号
+        self._postings = {}  # 二元组 -> 序号数组（可能包含已删除的序号）
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def add(self, file_id, name):
+        """加入一个文件，已存在时替换原来的文件名"""
+        if file_id in self._ordinals:
+            self.remove(file_id)
+        name = name.lower()
+        ordinal = len(self._names)
+        self._ids.append(file_id)
+        self._names.append(name)
+        self._ordinals[file_id] = ordinal
+
+        postings = self._postings
+        for gram in _bigrams(name):
+            ordinals = postings.get(gram)
+            if ordinals is None:
+                postings[gram] = array('l', (ordinal,))
+            else:
+                ordinals.append(ordinal)
+
+    def remove(self, file_id):
+        """移除一个文件，不存在时忽略"""
+        ordinal = self._ordinals.pop(file_id, None)
+        if ordinal is None:
+            return
+        self._names[ordinal] = None
+        self._dead += 1
+        # 已删除的记录超过一半时重建，避免倒排表无限增长
+        if self._dead > len(self._ordinals):
+            self._compact()
+
+    def _compact(self):
+        live = [(self._ids[ordinal], self._names[ordinal]) for ordinal in sorted(self._ordinals.values())]
+        self._ids = []
+        self._names = []
+        self._ordinals = {}
+        self._postings = {}
+        self._dead = 0
+        for file_id, name in live:
+            self.add(file_id, name)
+
+    def search(self, query, within=None):
+        """
+        查找文件名包含query的文件（不区分大小写）
+
+        Args:
+            query: 查询文本
+            within: 候选文件ID集合，例如上一次较短查询的结果；提供时只在其中确认
+
+        Returns:
+            set: 匹配的文件ID集合
+        """
+        query = query.lower()
+        if not query:
+            return set(self._ordinals if within is None else within)
+
+        names = self._names
+        if len(query) == 1:
+            # 单个字符没有二元组，直接比较所有文件名
+            candidates = range(len(names))
+        else:
+            postings = [self._postings.get(gram) for gram in _bigrams(query)]
+            if not all(postings):
+                return set()
+            candidates = min(postings, key=len)
+
+        if within is not None and len(within) < len(candidates):
+            ordinals = self._ordinals
+            return {file_id for file_id in within
+                    if file_id in ordinals and query in names[ordinals[file_id]]}
+
+        ids = self._ids
+        result = set()
+        for ordinal in candidates:
+            name = names[ordinal]
+            if name is not None and query in name:
+                result.add(ids[ordinal])
+        return result
@@ -0,0 +1,138 @@
+"""
+重命名顺序 - 一次完成一批可能互相占用名称的重命名
+
+整体平移前缀时，"01甲.mp4"改为"02甲.mp4"的同时，原来的"02甲.mp4"也要改为"03甲.mp4"。
+按文件顺序逐个重命名会撞上还没有改名的文件（Windows上直接失败，其他系统上会覆盖）。
+这里先得到完整的 原名→新名 映射，找出其中的链和环：链从末端开始改，环中只有一个文件
+先改为临时名称，最后再改为新名称。
+"""
+import os
+from collections import namedtuple
+
+# 一步重命名：把source改为target；old_name和new_name是这一步所属的 原名→新名，
+# final为False表示改为临时名称的中间步骤
+RenameStep = namedtuple("RenameStep", ["source", "target", "old_name", "new_name", "final"])
+
+# 一个文件的重命名结果，error为None表示成功
+RenameOutcome = namedtuple("RenameOutcome", ["old_name", "new_name", "error"])
+
+# 不能执行的重命名及原因
+RenameConflict = namedtuple("RenameConflict", ["old_name", "new_name", "reason"])
+
+
+def _temp_name(name, occupied, key):
+    """在文件夹中找一个未被占用的临时名称"""
+    candidate = f"{name}.renaming"
+    number = 1
+    while key(candidate) in occupied:
+        number += 1
+        candidate = f"{name}.renaming{number}"
+    return candidate
+
+
+def plan_renames(renames, existing, key=os.path.normcase):
+    """
+    计算一批重命名的安全执行顺序
+
+    Args:
+        renames: [(原名, 新名), ...]，原名互不相同且都在existing中
+        existing: 文件夹中现有的全部名称（包括不改名的文件和子文件夹）
+        key: 比较名称时使用的函数，默认os.path.normcase（Windows上不区分大小写）
+
+    Returns:
+        tuple: (chains, conflicts)
+            chains: 按执行顺序排列的链，每条链是RenameStep列表，链内的步骤必须依次执行
+            conflicts: RenameConflict列表，目标名称被不改名的文件占用，或与其他文件的新名称相同
+    """
+    occupied = {key(name) for name in existing}
+    pending = {}
+    for old_name, new_name in renames:
+        pending[key(old_name)] = (old_name, new_name)
+
+    # 去掉目标被占用的重命名；去掉后原文件不再移动，可能又占用别的目标，所以重复检查
+    conflicts = []
+    while True:
+        claimed = {}
+        blocked = []
+        for old_key, (old_name, new_name) in pending.items():
+            new_key = key(new_name)
+            if new_key in claimed:
+                blocked.append((old_key, f"与 {claimed[new_key]} 的新文件名相同"))
+            elif new_key in occupied and new_key not in pending:
+                blocked.append((old_key, f"目标文件 {new_name} 已存在"))
+            else:
+                claimed[new_key] = old_name
+        if not blocked:
+            break
+        for old_key, reason in blocked:
+            old_name, new_name = pending.pop(old_key)
+            conflicts.append(RenameConflict(old_name, new_name, reason))
+
+    # 每个目标最多被一个文件使用，所以重命名关系只由互不相交的链和环组成
+    chains = []
+    for start_key in list(pending):
+        if start_key not in pending:
+            continue
+        path = [start_key]
+        next_key = key(pending[start_key][1])
+        while next_key in pending and next_key != start_key:
+            path.append(next_key)
+            next_key = key(pending[next_key][1])
+
+        steps = []
+        if next_key == start_key:
+            # 环：先把起点改为临时名称，腾出的名称供环中其余文件使用
+            old_name, new_name = pending[start_key]
+            temp = _temp_name(old_name, occupied, key)
+            occupied.add(key(temp))
+            steps.append(RenameStep(old_name, temp, old_name, new_name, False))
+            for path_key in reversed(path[1:]):
+                source, target = pending[path_key]
+                steps.append(RenameStep(source, target, source, target, True))
+            steps.append(RenameStep(temp, new_name, old_name, new_name, True))
+        else:
+            # 链：末端的目标是空闲的，从末端开始改
+            for path_key in reversed(path):
+                source, target = pending[path_key]
+                steps.append(RenameStep(source, target, source, target, True))
+        for path_key in path:
+            del pending[path_key]
+        chains.append(steps)
+    return chains, conflicts
+
+
+def apply_chains(folder_path, chains, rename=os.rename):
+    """
+    依次执行plan_renames得到的链
+
+    某一步失败时跳过同一条链中剩下的步骤（否则会撞上没有移走的文件），其他链照常执行。
+
+    Args:
+        folder_path: 文件夹路径
+        chains: plan_renames返回的链
+        rename: 重命名函数，默认os.rename
+
+    Yields:
+        RenameOutcome: 每个文件的结果，按实际执行的顺序
+    """
+    for steps in chains:
+        failed = None
+        reported = set()
+        for step in steps:
+            if failed is not None:
+                if step.final and step.old_name not in reported:
+                    reported.add(step.old_name)
+                    reason = f"前一步重命名失败（{failed}），已跳过"
+                    if step.source != step.old_name:
+                        reason += f"，文件暂时保留为 {step.source}"
+                    yield RenameOutcome(step.old_name, step.new_name, reason)
+                continue
+            try:
+                rename(os.path.join(folder_path, step.source), os.path.join(folder_path, step.target))
+            except OSError as e:
+                failed = step.old_name
+                reported.add(step.old_name)
+                yield RenameOutcome(step.old_name, step.new_name, str(e))
+                continue
+            if step.final:
+                yield RenameOutcome(step.old_name, step.new_name, None)
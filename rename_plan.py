@@ -0,0 +1,120 @@
+"""
+Eagle重命名计划 - 根据选中的文件名、起始索引和前缀变化方式计算新文件名
+
+计划与界面无关，结果不可变，并按(文件名序列, 起始索引, 模式)缓存，
+预览和执行使用同一份计算结果。
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from name_keys import PREFIX_GROUP_PATTERN
+
+PlanEntry = namedtuple("PlanEntry", ["old_name", "new_name", "group", "changed"])
+
+
+class RenamePlan(namedtuple("RenamePlan", [
+        "old_names", "new_names", "groups", "changed",
+        "start_prefix", "first_prefix", "mode", "group_changes"])):
+    """
+    不可变的重命名计划，按列保存每个文件的结果
+
+    Attributes:
+        old_names: 原文件名元组，与选中的文件一一对应
+        new_names: 新文件名元组，无法识别文件组时与原文件名相同
+        groups: 文件组名元组，无法识别时为None
+        changed: 前缀是否改变的元组
+        start_prefix: 起始索引
+        first_prefix: 第一组使用的新前缀
+        mode: "increment"或"decrement"
+        group_changes: ((位置, 文件组名, 新前缀), ...)，每个新文件组开始的位置
+    """
+    __slots__ = ()
+
+    @property
+    def entries(self):
+        """逐个文件的PlanEntry"""
+        return [PlanEntry(*row) for row in zip(self.old_names, self.new_names, self.groups, self.changed)]
+
+    @property
+    def changed_count(self):
+        return sum(self.changed)
+
+    def messages(self):
+        """
+        按顺序生成计划过程中的提示信息（跳过的文件和新文件组）
+
+        Yields:
+            str: 提示信息
+        """
+        changes = {position: (group, prefix) for position, group, prefix in self.group_changes}
+        for position, (name, group) in enumerate(zip(self.old_names, self.groups)):
+            if group is None:
+                yield f"跳过 {name}（无法识别文件组）"
+            elif position in changes:
+                group, prefix = changes[position]
+                yield f"\n检测到新文件组 '{group}'，前缀递增至 {prefix:02d}"
+
+
+def first_prefix_for(start_prefix, mode):
+    """第一组使用的新前缀：递增模式为起始索引+1（最大99），递减模式为起始索引-1（最小01）"""
+    if mode == "increment":
+        return min(99, start_prefix + 1)
+    return max(1, start_prefix - 1)
+
+
+def build_plan(names, start_prefix, mode="increment"):
+    """
+    计算重命名计划
+
+    每遇到一个新的文件组，前缀在上一组的基础上加1（无论递增或递减模式），
+    新前缀保持原前缀的位数。
+
+    Args:
+        names: 按顺序排列的原文件名
+        start_prefix: 起始索引
+        mode: "increment"为递增，"decrement"为递减
+
+    Returns:
+        RenamePlan: 计划，相同参数的重复调用返回同一个对象
+    """
+    return _build_plan(tuple(names), start_prefix, mode)
+
+
+@lru_cache(maxsize=8)
+def _build_plan(names, start_prefix, mode):
+    current_prefix = first_prefix = first_prefix_for(start_prefix, mode)
+    new_names = []
+    groups = []
+    changed = []
+    group_changes = []
+    last_group = None
+    # 同一前缀宽度的格式化结果在一组内不变，缓存起来
+    formatted = {}
+    match = PREFIX_GROUP_PATTERN.match
+
+    for position, name in enumerate(names):
+        digits, group = match(name).groups()
+        if not digits or not group:
+            new_names.append(name)
+            groups.append(None)
+            changed.append(False)
+            continue
+
+        # 新的文件组，前缀递增
+        if group != last_group:
+            if last_group is not None:
+                current_prefix = min(99, current_prefix + 1)
+                group_changes.append((position, group, current_prefix))
+            formatted = {}
+            last_group = group
+
+        width = len(digits)
+        new_digits = formatted.get(width)
+        if new_digits is None:
+            new_digits = formatted[width] = f"{current_prefix:0{width}d}"
+        new_names.append(new_digits + name[width:])
+        groups.append(group)
+        changed.append(new_digits != digits)
+
+    return RenamePlan(tuple(names), tuple(new_names), tuple(groups), tuple(changed),
+                      start_prefix, first_prefix, mode, tuple(group_changes))
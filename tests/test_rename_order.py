@@ -0,0 +1,132 @@
+"""rename_order的测试：链、环和目标被占用时的执行顺序"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rename_order import plan_renames, apply_chains  # noqa: E402
+
+
+def make_files(folder, names):
+    """创建内容为自身文件名的文件，便于检查重命名后的对应关系"""
+    for name in names:
+        with open(os.path.join(folder, name), 'w', encoding='utf-8') as f:
+            f.write(name)
+
+
+def read_files(folder):
+    """{文件名: 内容}"""
+    result = {}
+    for name in os.listdir(folder):
+        with open(os.path.join(folder, name), 'r', encoding='utf-8') as f:
+            result[name] = f.read()
+    return result
+
+
+def test_chain_renames_from_the_free_end(tmp_path):
+    existing = ["01甲.mp4", "02甲.mp4"]
+    renames = [("01甲.mp4", "02甲.mp4"), ("02甲.mp4", "04甲.mp4")]
+
+    chains, conflicts = plan_renames(renames, existing)
+
+    assert conflicts == []
+    assert len(chains) == 1
+    steps = [(step.source, step.target) for step in chains[0]]
+    # 02→04先执行，腾出02后才能执行01→02
+    assert steps == [("02甲.mp4", "04甲.mp4"), ("01甲.mp4", "02甲.mp4")]
+    assert all(step.final for step in chains[0])
+
+    make_files(str(tmp_path), existing)
+    outcomes = list(apply_chains(str(tmp_path), chains))
+    assert all(outcome.error is None for outcome in outcomes)
+    assert read_files(str(tmp_path)) == {"02甲.mp4": "01甲.mp4", "04甲.mp4": "02甲.mp4"}
+
+
+def test_cycle_uses_one_temporary_name(tmp_path):
+    existing = ["01a.txt", "02a.txt", "03a.txt"]
+    renames = [("01a.txt", "02a.txt"), ("02a.txt", "03a.txt"), ("03a.txt", "01a.txt")]
+
+    chains, conflicts = plan_renames(renames, existing)
+
+    assert conflicts == []
+    assert len(chains) == 1
+    steps = chains[0]
+    temporary = [step for step in steps if not step.final]
+    assert len(temporary) == 1
+    temp_name = temporary[0].target
+    assert temp_name not in existing
+    # 临时名称是第一步，并在最后一步改为最终名称
+    assert steps[0] is temporary[0]
+    assert (steps[-1].source, steps[-1].target) == (temp_name, temporary[0].new_name)
+
+    make_files(str(tmp_path), existing)
+    outcomes = list(apply_chains(str(tmp_path), chains))
+    # 每个文件只报告一次结果
+    assert sorted(outcome.old_name for outcome in outcomes) == existing
+    assert all(outcome.error is None for outcome in outcomes)
+    assert read_files(str(tmp_path)) == {"02a.txt": "01a.txt", "03a.txt": "02a.txt", "01a.txt": "03a.txt"}
+
+
+def test_temporary_name_avoids_existing_names():
+    existing = ["01a.txt", "02a.txt", "01a.txt.renaming", "02a.txt.renaming"]
+    renames = [("01a.txt", "02a.txt"), ("02a.txt", "01a.txt")]
+
+    chains, _ = plan_renames(renames, existing)
+
+    temp_name = chains[0][0].target
+    assert temp_name not in existing
+
+
+def test_target_occupied_by_unchanged_file_is_a_conflict(tmp_path):
+    existing = ["01a.txt", "02a.txt", "05b.txt"]
+    # 02a.txt不改名，01a.txt不能改为02a.txt
+    renames = [("01a.txt", "02a.txt"), ("05b.txt", "06b.txt")]
+
+    chains, conflicts = plan_renames(renames, existing)
+
+    assert [(conflict.old_name, conflict.new_name) for conflict in conflicts] == [("01a.txt", "02a.txt")]
+    assert [[(step.source, step.target) for step in steps] for steps in chains] == [[("05b.txt", "06b.txt")]]
+
+    make_files(str(tmp_path), existing)
+    list(apply_chains(str(tmp_path), chains))
+    assert read_files(str(tmp_path)) == {"01a.txt": "01a.txt", "02a.txt": "02a.txt", "06b.txt": "05b.txt"}
+
+
+def test_conflict_propagates_along_the_chain():
+    existing = ["01a.txt", "02a.txt", "03a.txt"]
+    # 03a.txt不改名；02→03被阻止后02不再移动，01→02也随之冲突
+    renames = [("01a.txt", "02a.txt"), ("02a.txt", "03a.txt")]
+
+    chains, conflicts = plan_renames(renames, existing)
+
+    assert chains == []
+    assert sorted(conflict.old_name for conflict in conflicts) == ["01a.txt", "02a.txt"]
+
+
+def test_duplicate_targets_are_conflicts():
+    existing = ["01a.txt", "01b.txt"]
+    renames = [("01a.txt", "02x.txt"), ("01b.txt", "02x.txt")]
+
+    chains, conflicts = plan_renames(renames, existing)
+
+    assert len(chains) == 1
+    assert [conflict.old_name for conflict in conflicts] == ["01b.txt"]
+
+
+def test_failed_step_skips_the_rest_of_its_chain(tmp_path):
+    existing = ["01a.txt", "02a.txt", "05b.txt"]
+    renames = [("01a.txt", "02a.txt"), ("02a.txt", "03a.txt"), ("05b.txt", "06b.txt")]
+    chains, _ = plan_renames(renames, existing)
+
+    def rename(source, target):
+        if os.path.basename(source) == "02a.txt":
+            raise OSError("模拟失败")
+        os.rename(source, target)
+
+    make_files(str(tmp_path), existing)
+    outcomes = {outcome.old_name: outcome for outcome in apply_chains(str(tmp_path), chains, rename)}
+
+    assert outcomes["02a.txt"].error == "模拟失败"
+    assert "已跳过" in outcomes["01a.txt"].error
+    assert outcomes["05b.txt"].error is None
+    assert read_files(str(tmp_path)) == {"01a.txt": "01a.txt", "02a.txt": "02a.txt", "06b.txt": "05b.txt"}
@@ -0,0 +1,187 @@
+"""
+界面事件总线 - 后台线程只投递事件，由界面线程定时取出并处理
+
+Tk控件只能在创建它的线程中访问。后台线程通过UIEventBus报告进度、输出日志
+和请求在界面线程中调用函数，界面线程每POLL_MS毫秒处理一次：同一任务的多次
+进度合并为一次刷新，连续的日志合并为一次写入。
+"""
+import sys
+import time
+import queue
+import threading
+import tkinter as tk
+from collections import namedtuple
+from tkinter import ttk
+
+# 一次进度刷新：已完成数量、总数、已用秒数、每秒完成数量、预计剩余秒数（无法估计时为None）
+Progress = namedtuple("Progress", ["done", "total", "elapsed", "rate", "eta"])
+
+
+def format_duration(seconds):
+    """把秒数格式化为"分:秒"或"时:分:秒" """
+    seconds = int(seconds + 0.5)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def format_progress(progress):
+    """进度的文字说明，例如"120 / 1000  每秒 35 个  剩余 00:25" """
+    text = f"{progress.done} / {progress.total}"
+    if progress.rate:
+        text += f"  每秒 {progress.rate:,.0f} 个"
+    if progress.eta is not None:
+        text += f"  剩余 {format_duration(progress.eta)}"
+    return text
+
+
+class UIEventBus:
+    """后台线程到界面线程的事件队列"""
+
+    # 处理事件的间隔（毫秒），也是进度刷新的最短间隔
+    POLL_MS = 50
+
+    def __init__(self, root, poll_ms=None):
+        """
+        Args:
+            root: Tk根窗口，事件在它所在的线程中处理
+            poll_ms: 处理事件的间隔（毫秒），默认POLL_MS
+        """
+        self.root = root
+        self.poll_ms = poll_ms or self.POLL_MS
+        self._queue = queue.Queue()  # 日志和函数调用，保持投递顺序
+        self._lock = threading.Lock()
+        self._latest = {}  # 任务名 -> 最近一次报告的(已完成数量, 总数)
+        self._tasks = {}  # 任务名 -> (开始时间, 进度回调)
+        self.root.after(self.poll_ms, self._poll)
+
+    # 以下方法可以在任意线程中调用
+
+    def progress(self, task, done, total):
+        """报告任务进度，两次处理之间只保留最后一次"""
+        with self._lock:
+            self._latest[task] = (done, total)
+
+    def log(self, message):
+        """输出一行日志，在界面线程中写入sys.stdout"""
+        self._queue.put((None, message))
+
+    def call(self, func, *args, **kwargs):
+        """在界面线程中调用func，例如关闭进度窗口或显示完成提示"""
+        self._queue.put((func, (args, kwargs)))
+
+    # 以下方法只能在界面线程中调用
+
+    def track(self, task, on_progress):
+        """
+        开始显示一个任务的进度
+
+        Args:
+            task: 任务名，与progress()中的一致
+            on_progress: 进度回调 on_progress(Progress)
+        """
+        with self._lock:
+            self._latest.pop(task, None)
+        self._tasks[task] = (time.perf_counter(), on_progress)
+
+    def untrack(self, task):
+        """停止显示任务进度，之后报告的进度被忽略"""
+        self._tasks.pop(task, None)
+        with self._lock:
+            self._latest.pop(task, None)
+
+    def _poll(self):
+        try:
+            self.drain()
+        finally:
+            self.root.after(self.poll_ms, self._poll)
+
+    def drain(self):
+        """处理所有已投递的事件"""
+        lines = []
+        while True:
+            try:
+                func, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if func is None:
+                lines.append(payload)
+                continue
+            # 先写出之前的日志，保持与函数调用的先后顺序
+            if lines:
+                self._write_log(lines)
+                lines = []
+            args, kwargs = payload
+            func(*args, **kwargs)
+        if lines:
+            self._write_log(lines)
+
+        with self._lock:
+            latest, self._latest = self._latest, {}
+        now = time.perf_counter()
+        for task, (done, total) in latest.items():
+            tracked = self._tasks.get(task)
+            if tracked is None:
+                continue
+            started, on_progress = tracked
+            elapsed = now - started
+            rate = done / elapsed if elapsed > 0 else 0.0
+            eta = (total - done) / rate if rate > 0 else None
+            on_progress(Progress(done, total, elapsed, rate, eta))
+
+    @staticmethod
+    def _write_log(lines):
+        sys.stdout.write("\n".join(lines) + "\n")
+
+
+class ProgressDialog:
+    """带进度条、速度和剩余时间的进度窗口，由UIEventBus驱动"""
+
+    def __init__(self, root, bus, task, title, text):
+        """
+        Args:
+            root: 父窗口
+            bus: UIEventBus
+            task: 任务名，后台线程用bus.progress(task, ...)报告进度
+            title: 窗口标题
+            text: 窗口中的说明文字
+        """
+        self.bus = bus
+        self.task = task
+
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.geometry("400x120")
+        self.window.resizable(False, False)
+        self.window.transient(root)
+        # 后台任务不能中途取消，忽略窗口的关闭按钮，任务结束后由close()关闭
+        self.window.protocol("WM_DELETE_WINDOW", lambda: None)
+
+        frame = ttk.Frame(self.window, padding="20")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(frame, text=text).pack()
+
+        self.bar = ttk.Progressbar(frame, orient="horizontal", length=350, mode="determinate")
+        self.bar.pack(pady=(10, 5))
+
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(frame, textvariable=self.status_var).pack()
+
+        bus.track(task, self.update)
+
+    def update(self, progress):
+        """刷新进度条和状态文字"""
+        # 窗口已被销毁（例如被窗口管理器强制关闭）时不再刷新
+        if not self.window.winfo_exists():
+            return
+        self.bar["value"] = progress.done * 100 / progress.total if progress.total else 0
+        self.status_var.set(format_progress(progress))
+
+    def close(self):
+        """停止显示进度并关闭窗口，可以重复调用"""
+        self.bus.untrack(self.task)
+        if self.window.winfo_exists():
+            self.window.destroy()
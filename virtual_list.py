@@ -0,0 +1,330 @@
+"""
+虚拟列表 - 只为可见区域创建表格行的Treeview
+
+数据保存在外部的序列中（例如EagleItemStore），表格中始终只有一屏的行，
+滚动时只更新这些行的内容；选择状态按记录ID保存，与表格行无关。
+因此排序、选择和滚动的开销与数据量基本无关。
+"""
+import tkinter as tk
+from tkinter import ttk
+
+# event.state中的Shift键标志
+_SHIFT_MASK = 0x0001
+
+
+class VirtualTreeview(ttk.Frame):
+    """
+    带滚动条的虚拟列表
+
+    用户改变选择后在本控件上触发<<ListSelect>>事件。
+    """
+
+    # 尚未显示时使用的默认行高和表头高度（像素）
+    DEFAULT_ROW_HEIGHT = 20
+    DEFAULT_HEADER_HEIGHT = 25
+
+    def __init__(self, master, columns, row_values, item_id=lambda item: item.id, **kwargs):
+        """
+        Args:
+            master: 父控件
+            columns: 列名元组
+            row_values: 生成一行显示内容的函数 row_values(位置, 记录) -> 元组
+            item_id: 获取记录唯一ID的函数，选择状态按ID保存
+            **kwargs: 传给内部Treeview的其他参数
+        """
+        super().__init__(master)
+        self.row_values = row_values
+        self.item_id = item_id
+        self.items = ()
+        # 第一行可见记录在序列中的位置
+        self.offset = 0
+
+        self._slots = []  # 当前表格中的行，依次对应offset开始的记录
+        self._selected = set()  # 选中记录的ID
+        self._anchor = None  # Shift范围选择的起点位置
+        self._pressed_on_row = False  # 当前的鼠标按下是否从数据行开始，只有这时拖动才改变选择
+        self._cursor = None  # 键盘操作的当前位置
+        self._row_height = self.DEFAULT_ROW_HEIGHT
+        self._header_height = self.DEFAULT_HEADER_HEIGHT
+
+        # 选择完全由本控件管理，不使用Treeview自带的选择绑定
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="none", **kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", lambda event: self.refresh())
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<Control-Button-1>", self._on_control_click)
+        self.tree.bind("<Shift-Button-1>", self._on_shift_click)
+        self.tree.bind("<B1-Motion>", self._on_drag)
+        self.tree.bind("<ButtonRelease-1>", self._on_release)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", self._on_mousewheel)
+        self.tree.bind("<Button-5>", self._on_mousewheel)
+        self.tree.bind("<Up>", lambda event: self._move_cursor(-1, event))
+        self.tree.bind("<Down>", lambda event: self._move_cursor(1, event))
+        self.tree.bind("<Shift-Up>", lambda event: self._move_cursor(-1, event))
+        self.tree.bind("<Shift-Down>", lambda event: self._move_cursor(1, event))
+        self.tree.bind("<Prior>", lambda event: self._move_cursor(-self._capacity(), event))
+        self.tree.bind("<Next>", lambda event: self._move_cursor(self._capacity(), event))
+        self.tree.bind("<Home>", lambda event: self._move_cursor(-len(self.items), event))
+        self.tree.bind("<End>", lambda event: self._move_cursor(len(self.items), event))
+        self.tree.bind("<Control-a>", self._on_select_all)
+
+    # ---- 与Treeview一致的表头设置 ----
+
+    def heading(self, column, **kwargs):
+        return self.tree.heading(column, **kwargs)
+
+    def column(self, column, **kwargs):
+        return self.tree.column(column, **kwargs)
+
+    # ---- 数据 ----
+
+    def set_items(self, items):
+        """
+        设置数据序列
+
+        Args:
+            items: 支持len()、按位置取值和position(ID)查找位置的序列（例如EagleItemStore），
+                之后数据有变化时调用refresh()
+        """
+        self.items = items
+        self.offset = 0
+        self._anchor = None
+        self._cursor = None
+        self.refresh()
+
+    def refresh(self):
+        """按当前滚动位置重新填充可见的行"""
+        total = len(self.items)
+        capacity = self._capacity()
+        self.offset = max(0, min(self.offset, total - capacity))
+        count = min(capacity, total - self.offset)
+
+        if len(self._slots) > count:
+            self.tree.delete(*self._slots[count:])
+            del self._slots[count:]
+        while len(self._slots) < count:
+            self._slots.append(self.tree.insert("", "end"))
+
+        selected_slots = []
+        for i, slot in enumerate(self._slots):
+            position = self.offset + i
+            item = self.items[position]
+            self.tree.item(slot, values=self.row_values(position, item))
+            if self.item_id(item) in self._selected:
+                selected_slots.append(slot)
+        self.tree.selection_set(selected_slots)
+
+        self._measure()
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + count) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _measure(self):
+        """根据实际显示的第一行更新行高和表头高度"""
+        if self._slots:
+            bbox = self.tree.bbox(self._slots[0])
+            if bbox and bbox[3] > 0:
+                self._header_height = bbox[1]
+                self._row_height = bbox[3]
+
+    def _capacity(self):
+        """当前高度下能完整显示的行数"""
+        height = self.tree.winfo_height()
+        if height <= 1:
+            # 尚未显示，先按默认高度填充一屏
+            return 40
+        return max(1, (height - self._header_height) // self._row_height)
+
+    # ---- 滚动 ----
+
+    def yview(self, *args):
+        """滚动条的回调，参数与Treeview.yview相同"""
+        total = len(self.items)
+        if not args:
+            if not total:
+                return 0.0, 1.0
+            return self.offset / total, min(total, self.offset + self._capacity()) / total
+
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= max(1, self._capacity() - 1)
+            self.offset += amount
+        self.refresh()
+
+    def see(self, position):
+        """滚动到指定位置的记录可见"""
+        capacity = self._capacity()
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + capacity:
+            self.offset = position - capacity + 1
+        self.refresh()
+
+    def _on_mousewheel(self, event):
+        if event.num == 4:
+            amount = -3
+        elif event.num == 5:
+            amount = 3
+        elif abs(event.delta) >= 120:
+            # Windows每格120
+            amount = -3 * (event.delta // 120)
+        else:
+            # macOS每格为较小的整数
+            amount = -event.delta
+        self.yview("scroll", amount, "units")
+        return "break"
+
+    # ---- 选择 ----
+
+    def selection_items(self):
+        """
+        获取选中的记录
+
+        Returns:
+            list: 按显示顺序排列的选中记录
+        """
+        if not self._selected:
+            return []
+        # 通过ID到位置的映射定位，耗时只与选中数量有关
+        positions = sorted(p for p in map(self.items.position, self._selected) if p >= 0)
+        return [self.items[p] for p in positions]
+
+    def select_ids(self, ids):
+        """把选择设置为指定ID的记录（不触发<<ListSelect>>）"""
+        self._selected = set(ids)
+        self.refresh()
+
+    def select_range(self, start, end):
+        """把选择设置为位置start到end（包含）之间的记录（不触发<<ListSelect>>）"""
+        if start > end:
+            start, end = end, start
+        item_id = self.item_id
+        self._selected = {item_id(self.items[i]) for i in range(max(0, start), min(len(self.items), end + 1))}
+        self._anchor = start
+        self._cursor = start
+        self.refresh()
+
+    def clear_selection(self):
+        """清除选择（不触发<<ListSelect>>）"""
+        self._selected = set()
+        self._anchor = None
+        self._cursor = None
+        self.refresh()
+
+    def discard(self, item_id):
+        """从选择中移除指定ID，例如记录已被删除"""
+        self._selected.discard(item_id)
+
+    def _position_at(self, y):
+        """鼠标纵坐标对应的记录位置，不在数据行上时返回None"""
+        slot = self.tree.identify_row(y)
+        if not slot or slot not in self._slots:
+            return None
+        return self.offset + self._slots.index(slot)
+
+    def _notify(self):
+        self.refresh()
+        self.event_generate("<<ListSelect>>")
+
+    def _on_click(self, event):
+        position = self._position_at(event.y)
+        self._pressed_on_row = position is not None
+        if position is None:
+            # 点击表头等区域，交给Treeview处理
+            return None
+        self.tree.focus_set()
+        self._selected = {self.item_id(self.items[position])}
+        self._anchor = position
+        self._cursor = position
+        self._notify()
+        return "break"
+
+    def _on_control_click(self, event):
+        position = self._position_at(event.y)
+        self._pressed_on_row = position is not None
+        if position is None:
+            return None
+        self.tree.focus_set()
+        file_id = self.item_id(self.items[position])
+        if file_id in self._selected:
+            self._selected.discard(file_id)
+        else:
+            self._selected.add(file_id)
+        self._anchor = position
+        self._cursor = position
+        self._notify()
+        return "break"
+
+    def _on_shift_click(self, event):
+        position = self._position_at(event.y)
+        self._pressed_on_row = position is not None
+        if position is None:
+            return None
+        if self._anchor is None:
+            return self._on_click(event)
+        self._select_to(position)
+        return "break"
+
+    def _on_release(self, event):
+        self._pressed_on_row = False
+        return None
+
+    def _on_drag(self, event):
+        # 在表头上按下（例如拖动列分隔线调整列宽）时交给Treeview处理
+        if not self._pressed_on_row or self._anchor is None:
+            return None
+        # 拖动到列表外时自动滚动
+        if event.y < self._header_height:
+            self.yview("scroll", -1, "units")
+            position = self.offset
+        elif event.y >= self.tree.winfo_height():
+            self.yview("scroll", 1, "units")
+            position = min(len(self.items), self.offset + self._capacity()) - 1
+        else:
+            position = self._position_at(event.y)
+            if position is None:
+                return "break"
+        self._select_to(position)
+        return "break"
+
+    def _select_to(self, position):
+        """选择从_anchor到position的范围"""
+        start, end = sorted((self._anchor, position))
+        item_id = self.item_id
+        self._selected = {item_id(self.items[i]) for i in range(start, end + 1)}
+        self._cursor = position
+        self._notify()
+
+    def _move_cursor(self, amount, event):
+        if not self.items:
+            return "break"
+        if self._cursor is None:
+            position = self.offset
+        else:
+            position = max(0, min(len(self.items) - 1, self._cursor + amount))
+
+        if event.state & _SHIFT_MASK and self._anchor is not None:
+            self.see(position)
+            self._select_to(position)
+        else:
+            self._selected = {self.item_id(self.items[position])}
+            self._anchor = position
+            self._cursor = position
+            self.see(position)
+            self._notify()
+        return "break"
+
+    def _on_select_all(self, event):
+        item_id = self.item_id
+        self._selected = {item_id(item) for item in self.items}
+        self._notify()
+        return "break"